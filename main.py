@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 import curses
 from pathlib import Path
 
@@ -7,12 +8,29 @@ from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 from mahjong.game import Game
+from mahjong.session import Session
 
 
-def main(stdscr):
+def main(stdscr, args):
     game = Game(stdscr)
-    game.run()
+    session = Session(base=args.base, per_tai=args.per_tai, rounds=args.rounds) if args.session else None
+    if args.use_async:
+        game.run_async(args.turn_timeout, session)
+    elif session is not None:
+        game.run_session(session)
+    else:
+        game.run()
 
 
 if __name__ == "__main__":
-    curses.wrapper(main)
+    parser = argparse.ArgumentParser(description="終端機麻將")
+    parser.add_argument("--session", action="store_true", help="連續打完一將（圈風、輪莊、連莊、累計分數）")
+    parser.add_argument("--rounds", type=int, default=4, help="一將打幾圈（1–4，預設 4）")
+    parser.add_argument("--base", type=int, default=100, help="底（預設 100）")
+    parser.add_argument("--per-tai", type=int, default=20, help="每台（預設 20）")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="以 asyncio 驅動牌局（mahjong.aioflow），可搭配 --turn-timeout")
+    parser.add_argument("--turn-timeout", type=float, default=None,
+                        help="每個決策的時限（秒，需要 --async）；逾時由 AI 代打")
+    args = parser.parse_args()
+    curses.wrapper(main, args)
@@ -0,0 +1,195 @@
+"""
+analysis_service.py — HTTP 手牌分析服務（掛在 server.py 的 aiohttp app 上）
+
+POST /analyze
+    {"hand": "11 12 13 ...", "queries": ["waits", "advice", "shanten", "score"],
+     "score": {"winning_tile": 45, "melds": [["pong", 41]], "flowers": [51], "seat": 0, "dealer": 0, ...}}
+回傳 mahjong.analysis.evaluate() 的結果；格式錯誤回 400，排隊太多回 503，
+這一筆算不出來回 500（同一批的其他查詢照常回答）。
+
+處理流程：
+  1. 正規化：mahjong.analysis.normalize_request() 把手牌排序、查詢去重排序，
+     轉成 JSON 字串當快取鍵，同一手牌不論輸入順序都命中同一筆。
+  2. LRU 快取：命中直接回傳，不經過工作行程。
+  3. 合併：同一個鍵已經在計算中的請求共用同一個 Future。
+  4. 微批次：新的查詢先進佇列，等 batch_window 秒或湊滿 max_batch 筆，
+     整批交給 ProcessPoolExecutor 一次算完，減少行程間往返的次數。
+     同時送進行程池的批次數有上限，事件迴圈只負責收發，不做計算。
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.analysis import normalize_request, evaluate_batch
+
+
+_dumps = functools.partial(json.dumps, ensure_ascii=False)
+
+
+class AnalysisService:
+    """手牌分析：LRU 快取 + 同鍵合併 + 微批次 + 行程池"""
+
+    def __init__(self, workers: int | None = None, cache_size: int = 4096, max_batch: int = 64,
+                 batch_window: float = 0.002, max_pending: int = 10000):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self.cache: OrderedDict[str, dict] = OrderedDict()
+        self.inflight: dict[str, asyncio.Future] = {}    # 鍵 -> 計算中的結果
+        self.queue: list[tuple[str, dict]] = []           # 等待送進行程池的 (鍵, 查詢)
+        self.pool: ProcessPoolExecutor | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._batches: set[asyncio.Task] = set()          # 進行中的批次（留住參考，close 時取消並等待）
+        # 統計
+        self.requests = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.evaluated = 0
+        self.rejected = 0
+        self.failed = 0
+
+    # ── 生命週期 ─────────────────────────────────────
+
+    async def start(self, app=None):
+        self.pool = ProcessPoolExecutor(self.workers)
+        self._wakeup = asyncio.Event()
+        # 每個工作行程最多兩批在排隊，其餘留在 queue 裡繼續累積
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        self._task = asyncio.create_task(self._batcher())
+
+    async def close(self, app=None):
+        tasks = list(self._batches)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for future in self.inflight.values():
+            if not future.done():
+                future.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def attach(self, app: web.Application):
+        app.router.add_post('/analyze', self.handle)
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.close)
+
+    # ── 查詢 ─────────────────────────────────────────
+
+    async def analyze(self, request: dict) -> dict:
+        """回答一筆已正規化的查詢。"""
+        self.requests += 1
+        key = json.dumps(request, sort_keys=True)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if len(self.inflight) >= self.max_pending:
+                self.rejected += 1
+                raise web.HTTPServiceUnavailable(text="分析佇列已滿，請稍後再試")
+            future = self.inflight[key] = asyncio.get_running_loop().create_future()
+            self.queue.append((key, request))
+            self._wakeup.set()
+        # shield：某個請求被取消（客戶端斷線）時，不影響共用同一結果的其他請求
+        return await asyncio.shield(future)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        try:
+            data = await request.json()
+            query = normalize_request(data)
+        except json.JSONDecodeError:
+            return web.json_response({'error': '請送出 JSON'}, status=400, dumps=_dumps)
+        except (ValueError, TypeError) as e:
+            return web.json_response({'error': str(e)}, status=400, dumps=_dumps)
+        try:
+            result = await self.analyze(query)
+        except web.HTTPException:
+            raise
+        except Exception as e:
+            return web.json_response({'error': f'分析失敗：{e}'}, status=500, dumps=_dumps)
+        return web.json_response(result, dumps=_dumps)
+
+    # ── 批次 ─────────────────────────────────────────
+
+    async def _batcher(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # 稍等一下讓同時到達的查詢湊成一批
+            if len(self.queue) < self.max_batch:
+                await asyncio.sleep(self.batch_window)
+            while self.queue:
+                await self._slots.acquire()
+                batch = self.queue[:self.max_batch]
+                del self.queue[:self.max_batch]
+                task = asyncio.create_task(self._run_batch(batch))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, dict]]):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, evaluate_batch, [q for _, q in batch])
+        except Exception as e:
+            for key, _ in batch:
+                future = self.inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.batches += 1
+        self.evaluated += len(batch)
+        for (key, _), result in zip(batch, results):
+            future = self.inflight.pop(key, None)
+            if isinstance(result, Exception):
+                # 只有這一筆失敗，不放進快取
+                self.failed += 1
+                if future is not None and not future.done():
+                    future.set_exception(result)
+                continue
+            self._remember(key, result)
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    def _remember(self, key: str, result: dict):
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    # ── 指標 ─────────────────────────────────────────
+
+    def register_metrics(self, metrics):
+        metrics.counter('analysis_requests_total', lambda: self.requests)
+        metrics.counter('analysis_cache_hits_total', lambda: self.hits)
+        metrics.counter('analysis_coalesced_total', lambda: self.coalesced)
+        metrics.counter('analysis_evaluated_total', lambda: self.evaluated)
+        metrics.counter('analysis_batches_total', lambda: self.batches)
+        metrics.counter('analysis_failed_total', lambda: self.failed)
+        metrics.counter('analysis_rejected_total', lambda: self.rejected)
+        metrics.gauge('analysis_pending', lambda: len(self.inflight))
+        metrics.gauge('analysis_cache_size', lambda: len(self.cache))
@@ -0,0 +1,239 @@
+"""
+backpressure.py — 每條連線的有界外送佇列與進站速率限制
+
+外送：每條連線一個 Outbox（有界 deque）與一個專屬的送出 task。
+  - 廣播只是把訊息放進每位成員的 Outbox，不等任何一條連線送完，
+    慢的客戶端不會拖住同桌或其他牌桌。
+  - 送出 task 會看 engineio 傳輸層還有多少封包沒寫出去，超過水位就先停下，
+    讓積壓留在有界的 Outbox 裡，而不是無限制地堆進傳輸層。
+  - Outbox 滿了依策略處理：drop_oldest 丟最舊的訊息（客戶端會從序號缺口
+    發現並 resync），disconnect 直接斷線。
+  - 傳輸層卡住超過 slow_timeout 秒視為慢速客戶端，斷線。
+
+送給多人的同一則訊息先編碼成一個 Frame（Socket.IO 封包只做一次 JSON 序列化），
+各條連線的 Outbox 放的是同一個 Frame 物件的參考，人數再多也不會重複序列化或複製內容。
+Frame 以 engineio 的公開 API（AsyncServer.send）送出；只有查傳輸層積壓時會讀
+engineio 的內部結構（sockets[...].queue），pyproject 鎖定 python-engineio 4.x，
+取不到時警告一次並視為沒有積壓（只剩 Outbox 的上限與策略在保護記憶體）。
+
+進站：每條連線一個 TokenBucket，超過速率的事件直接拒絕；連續違規太多次就斷線。
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import sys
+import time
+import warnings
+from collections import deque
+
+from socketio import packet as sio_packet
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+class TokenBucket:
+    """權杖桶：每秒補 rate 個權杖，最多存 burst 個"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Frame:
+    """已編碼的 Socket.IO 事件（預設 namespace），可以原封不動送給任意多條連線"""
+
+    __slots__ = ("event", "packets", "size")
+
+    def __init__(self, sio, event: str, data):
+        self.event = event
+        encoded = sio.packet_class(sio_packet.EVENT, namespace='/', data=[event, data]).encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        self.packets = encoded      # 編碼好的 Engine.IO 訊息（字串，二進位附件為 bytes）
+        self.size = sum(len(p) for p in encoded)
+
+
+class Outbox:
+    """單一連線的有界外送佇列"""
+
+    def __init__(self, router: OutboundRouter, sid: str):
+        self.router = router
+        self.sid = sid
+        self.queue: deque[tuple[str, dict] | Frame] = deque()
+        self.ready = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def put(self, item: tuple[str, dict] | Frame) -> bool:
+        """放入一則訊息（(event, data) 或 Frame）。回傳 False 表示佇列已滿且策略為斷線。"""
+        if len(self.queue) >= self.router.maxlen:
+            if self.router.policy == DISCONNECT:
+                return False
+            self.queue.popleft()
+            self.router.dropped += 1
+        self.queue.append(item)
+        self.ready.set()
+        return True
+
+    async def _run(self):
+        router = self.router
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.queue:
+                # 傳輸層積壓過多就先等，期間新訊息留在有界佇列裡
+                stalled_since = None
+                while router.transport_backlog(self.sid) > router.high_water:
+                    now = time.monotonic()
+                    stalled_since = stalled_since or now
+                    if now - stalled_since > router.slow_timeout:
+                        router.slow_consumers += 1
+                        router.kick(self.sid)
+                        return
+                    await asyncio.sleep(0.01)
+                item = self.queue.popleft()
+                try:
+                    if isinstance(item, Frame):
+                        await router.send_packets(self.sid, item.packets)
+                    else:
+                        await router.sio.emit(item[0], item[1], to=self.sid)
+                except Exception as e:
+                    # 一則送不出去（例如資料無法編碼）只丟掉這則；
+                    # 送出 task 結束的話，這條連線之後的訊息都會默默留在佇列裡
+                    router.send_errors += 1
+                    print(f"[外送] 送給 {self.sid} 失敗，略過這則：{e!r}", file=sys.stderr)
+
+
+class OutboundRouter:
+    """管理所有連線的 Outbox；server.py 透過它送出所有訊息"""
+
+    def __init__(self, sio, maxlen: int = 256, policy: str = DROP_OLDEST,
+                 high_water: int = 64, slow_timeout: float = 10.0):
+        self.sio = sio
+        self.maxlen = maxlen
+        self.policy = policy
+        self.high_water = high_water
+        self.slow_timeout = slow_timeout
+        self.outboxes: dict[str, Outbox] = {}
+        self.dropped = 0
+        self.slow_consumers = 0
+        self.overflows = 0
+        self.send_errors = 0
+        self.backlog_supported = True
+        self._kicks: set[asyncio.Task] = set()
+
+    def open(self, sid: str):
+        self.outboxes[sid] = Outbox(self, sid)
+
+    def close(self, sid: str):
+        outbox = self.outboxes.pop(sid, None)
+        if outbox is not None:
+            outbox.task.cancel()
+
+    def send(self, sid: str, event: str, data: dict):
+        self._put(sid, (event, data))
+
+    def frame(self, event: str, data) -> Frame:
+        return Frame(self.sio, event, data)
+
+    def send_frame(self, sid: str, frame: Frame):
+        self._put(sid, frame)
+
+    def broadcast(self, sids, event: str, data: dict, skip_sid: str | None = None):
+        """送給 sids 中的每一位（skip_sid 除外）；訊息只編碼一次。"""
+        frame = None
+        for sid in sids:
+            if sid != skip_sid:
+                frame = frame or self.frame(event, data)
+                self._put(sid, frame)
+
+    def _put(self, sid: str, item: tuple[str, dict] | Frame):
+        outbox = self.outboxes.get(sid)
+        if outbox is not None and not outbox.put(item):
+            self.overflows += 1
+            self.kick(sid)
+
+    async def send_packets(self, sid: str, packets: list):
+        """把已編碼的訊息交給 engineio 送出（連線已不在時略過）。"""
+        eio_sid = self.sio.manager.eio_sid_from_sid(sid, '/')
+        if eio_sid is None:
+            return
+        for p in packets:
+            await self.sio.eio.send(eio_sid, p)
+
+    def kick(self, sid: str):
+        """在背景斷開連線（不在呼叫者的流程中等待；task 留在 _kicks 直到完成）。"""
+        self.close(sid)
+        task = asyncio.create_task(self.sio.disconnect(sid))
+        self._kicks.add(task)
+        task.add_done_callback(self._kicks.discard)
+
+    def depth(self) -> int:
+        return sum(len(o.queue) for o in self.outboxes.values())
+
+    def transport_backlog(self, sid: str) -> int:
+        """engineio 傳輸層尚未寫出的封包數；連線已不在或這個版本的 engineio 沒有對應的內部結構時為 0。"""
+        if not self.backlog_supported:
+            return 0
+        sockets = getattr(self.sio.eio, 'sockets', None)
+        if not isinstance(sockets, dict):
+            return self._backlog_unsupported()
+        socket = sockets.get(self.sio.manager.eio_sid_from_sid(sid, '/'))
+        if socket is None:
+            return 0
+        qsize = getattr(getattr(socket, 'queue', None), 'qsize', None)
+        if qsize is None:
+            return self._backlog_unsupported()
+        return qsize()
+
+    def _backlog_unsupported(self) -> int:
+        self.backlog_supported = False
+        warnings.warn("這個版本的 engineio 查不到傳輸層積壓，外送只受 Outbox 上限保護",
+                      RuntimeWarning, stacklevel=3)
+        return 0
+
+
+class RateLimiter:
+    """每條連線一個 TokenBucket 的進站速率限制"""
+
+    def __init__(self, rate: float = 20.0, burst: float = 40.0, max_violations: int = 50):
+        self.rate = rate
+        self.burst = burst
+        self.max_violations = max_violations
+        self.buckets: dict[str, TokenBucket] = {}
+        self.violations: dict[str, int] = {}
+        self.rejected = 0
+        self.on_abuse = None   # 連續違規太多次時呼叫 on_abuse(sid)
+
+    def forget(self, sid: str):
+        self.buckets.pop(sid, None)
+        self.violations.pop(sid, None)
+
+    def limited(self, handler):
+        """包住 Socket.IO 事件處理函式：超過速率時不執行，回傳錯誤。"""
+        @functools.wraps(handler)
+        async def wrapper(sid, *args, **kwargs):
+            bucket = self.buckets.get(sid)
+            if bucket is None:
+                bucket = self.buckets[sid] = TokenBucket(self.rate, self.burst)
+            if bucket.allow():
+                self.violations.pop(sid, None)
+                return await handler(sid, *args, **kwargs)
+
+            self.rejected += 1
+            count = self.violations[sid] = self.violations.get(sid, 0) + 1
+            if count >= self.max_violations and self.on_abuse is not None:
+                self.on_abuse(sid)
+            return {'error': 'rate_limited'}
+        return wrapper
@@ -0,0 +1,126 @@
+"""
+bench_ai.py — SimpleAI 與批次版本（mahjong.batch_ai）的差異測試與基準測試（需要 numpy）
+
+手牌來源：
+  - 自我對戰中實際出現的打牌與反應決策
+  - 隨機抽的手牌（2–17 張）與 HandSampler 產生的聽牌
+
+對每一副手牌比較 SimpleAI.choose_discard / choose_pong / choose_reaction 與
+discard_batch / pong_batch / reaction_batch 的結果，有任何不一致就列出並以結束碼 1 離開。
+
+用法：
+    python scripts/bench_ai.py --hands 20000
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.ai import SimpleAI
+from mahjong.batch_ai import counts_of, discard_batch, pong_batch, reaction_batch
+from mahjong.env import action_of
+from mahjong.flow import Decision, HandState, legal_reactions, play_hand, simple_ai_agent
+from mahjong.player import Player
+from mahjong.sampler import HandSampler, to_tiles
+from mahjong.tile import TILE_CODES, TILE_INDEX, Tile
+
+
+def selfplay_decisions(hands: int, rng: random.Random) -> tuple[list, list]:
+    """自我對戰中的 (手牌, 打出的牌) 與 (手牌, 打出的牌, 可行動, 回答, 是否下家)。"""
+    discards, reactions = [], []
+    state = HandState()
+    for i in range(hands):
+        state.reset(i % 4)
+        state.deal(rng)
+        flow = play_hand(state)
+        try:
+            decision = next(flow)
+            while True:
+                hand = list(state.players[decision.player_idx].hand_tiles)
+                answer = simple_ai_agent(state, decision)
+                if decision.kind == Decision.DISCARD:
+                    discards.append((hand, answer))
+                elif decision.kind == Decision.REACTION:
+                    is_next = any(action == "吃" for action, _ in decision.options)
+                    reactions.append((hand, decision.tile, decision.options, answer, is_next))
+                decision = flow.send(answer)
+        except StopIteration:
+            pass
+    return discards, reactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SimpleAI 批次版本的差異測試與基準測試")
+    parser.add_argument('--hands', type=int, default=20000, help="隨機手牌數")
+    parser.add_argument('--games', type=int, default=100, help="自我對戰局數")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    discards, reactions = selfplay_decisions(args.games, rng)
+
+    pool = [Tile(c) for c in TILE_CODES for _ in range(4)]
+    hands = [sorted(rng.sample(pool, rng.choice((2, 5, 8, 11, 14, 17))), key=lambda t: t.code)
+             for _ in range(args.hands)]
+    hands += [to_tiles(row) for row in HandSampler(seed=args.seed).tenpai(args.hands // 4)["hand"]]
+    discards += [(hand, SimpleAI.choose_discard(hand)) for hand in hands]
+    for hand in hands:
+        tile = Tile(rng.choice(TILE_CODES))
+        is_next = rng.random() < 0.5
+        player = Player()
+        player.hand_tiles = hand
+        options = legal_reactions(player, tile, is_next)
+        if options:
+            reactions.append((hand, tile, options, SimpleAI.choose_reaction(hand, tile, options), is_next))
+    pong_tiles = [Tile(rng.choice(TILE_CODES)) for _ in hands]
+
+    failures = []
+
+    counts = counts_of([hand for hand, _ in discards])
+    expected = [TILE_INDEX[tile.code] for _, tile in discards]
+    for (hand, _), want, got in zip(discards, expected, discard_batch(counts)):
+        if want != got:
+            failures.append(f"打牌不一致：{[t.code for t in hand]} SimpleAI={TILE_CODES[want]} 批次={TILE_CODES[got]}")
+
+    counts = counts_of([r[0] for r in reactions])
+    tiles = np.array([TILE_INDEX[r[1].code] for r in reactions])
+    can_hu = np.array([any(action == "胡" for action, _ in r[2]) for r in reactions])
+    is_next = np.array([r[4] for r in reactions])
+    got = reaction_batch(counts, tiles, can_hu, is_next)
+    for (hand, tile, options, answer, _), g in zip(reactions, got):
+        want = action_of(Decision(Decision.REACTION, 0, tile, options), answer)
+        if want != g:
+            failures.append(f"反應不一致：{[t.code for t in hand]} + {tile.code} SimpleAI={want} 批次={g}")
+
+    counts = counts_of(hands)
+    tiles = np.array([TILE_INDEX[t.code] for t in pong_tiles])
+    for hand, tile, g in zip(hands, pong_tiles, pong_batch(counts, tiles)):
+        if SimpleAI.choose_pong(hand, tile) != g:
+            failures.append(f"碰牌不一致：{[t.code for t in hand]} + {tile.code}")
+
+    print(f"打牌 {len(discards)}、反應 {len(reactions)}、碰牌 {len(hands)} 筆")
+    t0 = time.perf_counter()
+    for hand in hands:
+        SimpleAI.choose_discard(hand)
+    t1 = time.perf_counter()
+    discard_batch(counts)
+    t2 = time.perf_counter()
+    print(f"{(t1 - t0) / len(hands) * 1e6:8.2f} µs/副  SimpleAI.choose_discard")
+    print(f"{(t2 - t1) / len(hands) * 1e6:8.2f} µs/副  discard_batch（{len(hands)} 副一批）")
+
+    if failures:
+        print(f"差異測試失敗：{len(failures)} 筆")
+        for line in failures[:20]:
+            print("  " + line)
+        sys.exit(1)
+    print("差異測試通過")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+bench_rules.py — 規則引擎的基準測試與差異測試（需要 numpy）
+
+以 mahjong.sampler.HandSampler 產生胡牌與聽牌手牌，然後：
+
+  - 差異測試：RuleEngine.is_hu / get_ting_tiles 與 scoring.is_complete / waits
+    對同一副牌必須得到相同答案；取樣出的胡牌必須能胡、聽牌加上 wait 必須能胡。
+    另外每副聽牌再隨機加一張牌，多半不是胡牌，用來檢查「不能胡」的一側。
+  - 基準測試：各個函式每次呼叫的平均時間。
+
+有任何不一致就列出前幾筆並以結束碼 1 離開。
+
+用法：
+    python scripts/bench_rules.py --hands 20000
+    python scripts/bench_rules.py --suits 1,0,0,1 --melded 0,3 --hands 5000
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.rule_engine import RuleEngine
+from mahjong.sampler import HandSampler, to_codes
+from mahjong.scoring import is_complete, waits
+from mahjong.tables import get_tables
+from mahjong.tile import Tile, TILE_CODES
+
+
+def _timeit(label: str, fn, inputs: list) -> list:
+    t0 = time.perf_counter()
+    results = [fn(x) for x in inputs]
+    elapsed = time.perf_counter() - t0
+    print(f"{elapsed / len(inputs) * 1e6:8.1f} µs/次  {label}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="規則引擎基準測試與差異測試")
+    parser.add_argument('--hands', type=int, default=20000, help="胡牌與聽牌各產生幾副")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--suits', default="1,1,1,1", help="萬,筒,條,字 的權重")
+    parser.add_argument('--pong-ratio', type=float, default=0.3)
+    parser.add_argument('--melded', default="0,0", help="亮出的面子數範圍，例如 0,3")
+    args = parser.parse_args()
+
+    sampler = HandSampler(
+        suit_weights=tuple(float(w) for w in args.suits.split(",")),
+        pong_ratio=args.pong_ratio,
+        melded=tuple(int(m) for m in args.melded.split(",")),
+        seed=args.seed,
+    )
+
+    t0 = time.perf_counter()
+    winning = sampler.winning(args.hands)
+    tenpai = sampler.tenpai(args.hands)
+    elapsed = time.perf_counter() - t0
+    print(f"取樣 {2 * args.hands} 副：{elapsed * 1000:.1f} ms（{2 * args.hands / elapsed / 1e6:.2f} M 副/秒）")
+
+    rng = random.Random(args.seed)
+    win_codes = [to_codes(row) for row in winning["hand"]]
+    tenpai_codes = [to_codes(row) for row in tenpai["hand"]]
+    wait_codes = [TILE_CODES[i] for i in tenpai["wait"]]
+    # 聽牌隨機再加一張（多半不能胡）
+    extra_codes = [codes + [rng.choice(TILE_CODES)] for codes in tenpai_codes]
+
+    win_tiles = [[Tile(c) for c in codes] for codes in win_codes]
+    tenpai_tiles = [[Tile(c) for c in codes] for codes in tenpai_codes]
+    extra_tiles = [[Tile(c) for c in codes] for codes in extra_codes]
+
+    tables = get_tables()
+    print(f"查表：{tables.path if tables else '未使用（mahjong build-tables 可建表）'}")
+    print()
+    engine_win = _timeit("RuleEngine.is_hu（胡牌）", lambda h: RuleEngine.is_hu(h, None), win_tiles)
+    engine_extra = _timeit("RuleEngine.is_hu（隨機加一張）", lambda h: RuleEngine.is_hu(h, None), extra_tiles)
+    engine_waits = _timeit("RuleEngine.get_ting_tiles", RuleEngine.get_ting_tiles, tenpai_tiles)
+    fast_win = _timeit("scoring.is_complete（胡牌）", is_complete, win_codes)
+    fast_extra = _timeit("scoring.is_complete（隨機加一張）", is_complete, extra_codes)
+    fast_waits = _timeit("scoring.waits", waits, tenpai_codes)
+
+    failures = []
+    for i in range(args.hands):
+        if not (engine_win[i] and fast_win[i]):
+            failures.append(f"胡牌被判為不能胡：{win_codes[i]}")
+        if engine_extra[i] != fast_extra[i]:
+            failures.append(f"is_hu 不一致：{extra_codes[i]} RuleEngine={engine_extra[i]} scoring={fast_extra[i]}")
+        engine_set = sorted({t.code for t in engine_waits[i]})
+        if engine_set != fast_waits[i]:
+            failures.append(f"聽牌不一致：{tenpai_codes[i]} RuleEngine={engine_set} scoring={fast_waits[i]}")
+        elif wait_codes[i] not in fast_waits[i]:
+            failures.append(f"漏聽 {wait_codes[i]}：{tenpai_codes[i]}")
+
+    print()
+    print(f"隨機加一張的胡牌率：{sum(fast_extra) / args.hands:.1%}")
+    if failures:
+        print(f"差異測試失敗：{len(failures)} 筆")
+        for line in failures[:20]:
+            print("  " + line)
+        sys.exit(1)
+    print(f"差異測試通過（{3 * args.hands} 副）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+check_scoring.py — scoring 的胡牌判斷與 RuleEngine.is_hu 的差異測試（不需要 numpy）
+
+scoring.is_complete / decompose 以分花色、記憶化的拆牌判斷胡牌型，
+必須和逐張回溯的 RuleEngine.is_hu 對每一副牌都得到相同答案：
+
+  - 窮舉：單一花色（數牌與字牌）所有 3n+2 張的組合，檢查花色內的拆牌。
+  - 隨機：由面子與對眼組成的多花色胡牌，再隨機換掉幾張牌
+    （多半不能胡），特別包含字牌「順子」與好幾個花色各有一對的情形。
+
+decompose 不查表；is_complete 有查表檔（mahjong build-tables）時走查表，所以兩者都比。
+有任何不一致就列出前幾筆並以結束碼 1 離開。
+
+用法：
+    python scripts/check_scoring.py
+    python scripts/check_scoring.py --max-suit-tiles 14 --hands 200000
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import combinations_with_replacement
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.rule_engine import RuleEngine
+from mahjong.scoring import decompose, is_complete
+from mahjong.tile import Tile, TILE_CODES
+
+_NUMBER_SUITS = ([11 + i for i in range(9)], [21 + i for i in range(9)], [31 + i for i in range(9)])
+_HONORS = [41 + i for i in range(7)]
+
+
+def _single_suit_hands(values: list[int], max_tiles: int):
+    """values 中所有 3n+2 張（每種最多 4 張）的組合。"""
+    for size in range(2, max_tiles + 1, 3):
+        for hand in combinations_with_replacement(values, size):
+            if all(hand.count(v) <= 4 for v in set(hand)):
+                yield list(hand)
+
+
+def _random_hand(rng: random.Random) -> list[int]:
+    """隨機的 3n+2 張：先組成胡牌型，再有一半的機會弄壞它。"""
+    counts = dict.fromkeys(TILE_CODES, 0)
+    hand: list[int] = []
+
+    def take(codes: list[int]) -> bool:
+        if any(counts[c] + codes.count(c) > 4 for c in set(codes)):
+            return False
+        for c in codes:
+            counts[c] += 1
+        hand.extend(codes)
+        return True
+
+    if rng.random() < 0.1:
+        # 四個花色各一對：8 張 ≡ 2 (mod 3)，但每個花色都像是有對眼
+        for suit in (*_NUMBER_SUITS, _HONORS):
+            while not take([rng.choice(suit)] * 2):
+                pass
+        size = 8 + 3 * rng.randint(0, 3)
+    else:
+        while not take([rng.choice(TILE_CODES)] * 2):
+            pass
+        size = 2 + 3 * rng.randint(0, 5)
+    while len(hand) < size:
+        kind = rng.random()
+        if kind < 0.45:
+            suit = rng.choice(_NUMBER_SUITS)
+            start = rng.randrange(7)
+            take(suit[start:start + 3])
+        elif kind < 0.55:
+            start = rng.randrange(5)            # 字牌「順子」（不合法）
+            take(_HONORS[start:start + 3])
+        else:
+            take([rng.choice(TILE_CODES)] * 3)
+
+    if rng.random() < 0.5:
+        # 換掉 1–3 張；一半換成手上已有的牌，容易多出對子
+        for _ in range(rng.randint(1, 3)):
+            i = rng.randrange(len(hand))
+            counts[hand[i]] -= 1
+            while True:
+                code = rng.choice(hand) if rng.random() < 0.5 else rng.choice(TILE_CODES)
+                if counts[code] < 4:
+                    break
+            counts[code] += 1
+            hand[i] = code
+    return sorted(hand)
+
+
+def _check(codes: list[int], failures: list[str]):
+    expected = RuleEngine.is_hu([Tile(c) for c in codes], None)
+    complete = is_complete(codes)
+    decomposed = bool(decompose(codes))
+    if not expected == complete == decomposed:
+        failures.append(f"{codes} RuleEngine.is_hu={expected} is_complete={complete} decompose={decomposed}")
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="scoring 與 RuleEngine.is_hu 的差異測試")
+    parser.add_argument('--max-suit-tiles', type=int, default=11, help="窮舉單一花色時最多幾張（3n+2）")
+    parser.add_argument('--hands', type=int, default=50000, help="隨機多花色手牌的數量")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failures: list[str] = []
+    t0 = time.perf_counter()
+    checked = wins = 0
+    for values in (_NUMBER_SUITS[0], _HONORS):
+        for codes in _single_suit_hands(values, args.max_suit_tiles):
+            wins += _check(codes, failures)
+            checked += 1
+    print(f"單一花色窮舉：{checked} 副（胡牌 {wins}），{time.perf_counter() - t0:.1f} 秒")
+
+    t0 = time.perf_counter()
+    rng = random.Random(args.seed)
+    wins = 0
+    for _ in range(args.hands):
+        wins += _check(_random_hand(rng), failures)
+    print(f"隨機多花色：{args.hands} 副（胡牌 {wins}），{time.perf_counter() - t0:.1f} 秒")
+
+    if failures:
+        print(f"差異測試失敗：{len(failures)} 筆")
+        for line in failures[:20]:
+            print("  " + line)
+        sys.exit(1)
+    print("差異測試通過")
+
+
+if __name__ == '__main__':
+    main()
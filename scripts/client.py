@@ -1,54 +1,329 @@
+"""
+client.py — 非同步 Socket.IO 客戶端
+
+以 asyncio 驅動連線與鍵盤輸入（curses 非阻塞讀鍵），畫面沿用 mahjong.ui 的桌面繪製。
+斷線時自動以指數退避重連，重連後用 token 認回原座位，並依事件序號向伺服器補抓
+漏掉的事件；超出伺服器保留範圍時才改用完整快照。
+叢集模式下伺服器可能回覆 redirect（牌桌在別的節點、或節點關閉前交接），客戶端就改連過去。
+伺服器驅動的牌局（start_hand）輪到自己時會收到 'decision'，畫面顯示手牌與選項，輸入後以 'answer' 回覆。
+
+用法：python scripts/client.py [--table lobby] [--url http://localhost:5001]
+操作：輸入牌的代碼（例如 15 = 五萬）後按 Enter 打出，q 離開。
+      有題目時：打牌輸入牌的代碼；自摸輸入 1 胡、0 不胡；吃碰槓胡與暗槓輸入選項編號，直接 Enter 表示不要。
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import curses
+import os
+import random
+import sys
+import uuid
+
 import socketio
-import time
+from socketio.exceptions import ConnectionError as SioConnectionError, SocketIOError
 
-# 建立 Socket.IO 客戶端
-sio = socketio.Client()
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
-@sio.event
-def connect():
-    print("\n[系統] 成功連線到伺服器！")
+from mahjong.flow import Decision, NO_ANSWER
+from mahjong.tile import Tile
+from mahjong.player import Player
+from mahjong import ui
 
-@sio.event
-def disconnect():
-    print("\n[系統] 與伺服器斷開連線。")
 
-@sio.event
-def server_message(data):
-    """接收伺服器的系統訊息"""
-    print(f"\n[系統廣播] {data['msg']}")
-    print("你要打哪張牌？(輸入代碼) > ", end="", flush=True) # 恢復輸入提示
+class TableView:
+    """客戶端看到的牌桌狀態（只由伺服器事件推導）"""
 
-@sio.event
-def player_discarded(data):
-    """接收其他玩家打牌的廣播"""
-    # \r 是為了把游標拉回行首，才不會把原本打到一半的字覆蓋掉
-    print(f"\r[牌桌動態] 玩家 {data['player_id'][:4]}... 打出了 【{data['tile']}】！")
-    print("你要打哪張牌？(輸入代碼) > ", end="", flush=True) # 恢復輸入提示
+    def __init__(self):
+        self.seat = -1
+        self.seq = 0
+        self.players = [Player() for _ in range(4)]
+        self.last_seat: int | None = None
+        self.pending: dict[int, dict] = {}   # 序號跳號時暫存的事件
 
-if __name__ == '__main__':
-    print("正在尋找麻將大廳...")
-    try:
-        # 連線到本機的伺服器
-        sio.connect('http://localhost:5001')
-    except Exception as e:
-        print(f"連線失敗，請確認 server.py 是否已啟動。錯誤：{e}")
-        exit()
-
-    # 遊戲的「發送」主迴圈 (不會卡住接收訊息，因為接收是在背景執行的)
-    time.sleep(1) # 稍微等一下連線訊息印完
-    while True:
+    def load_snapshot(self, snap: dict):
+        self.seq = snap['seq']
+        for p, codes in zip(self.players, snap['discards']):
+            p.discarded_tiles = [Tile(c) for c in codes]
+        self.pending = {s: e for s, e in self.pending.items() if s > self.seq}
+        self._drain()
+
+    def receive(self, event: dict) -> bool:
+        """收下一筆事件。回傳 False 表示序號有缺口，需要向伺服器補抓。"""
+        if event['seq'] <= self.seq:
+            return True   # 重複（例如自己的 ack 與補抓結果重疊）
+        self.pending[event['seq']] = event
+        self._drain()
+        return not self.pending
+
+    def _drain(self):
+        while self.seq + 1 in self.pending:
+            event = self.pending.pop(self.seq + 1)
+            self.seq = event['seq']
+            if event['type'] == 'discard':
+                self.players[event['seat']].discarded_tiles.append(Tile(event['tile']))
+                self.last_seat = event['seat']
+
+
+def describe_prompt(prompt: dict) -> str:
+    """把伺服器的題目（mahjong.aioflow.describe）轉成一行說明。"""
+    kind = prompt['kind']
+    tile = Tile(prompt['tile']) if prompt['tile'] is not None else None
+    if kind == Decision.DISCARD:
+        drawn = f"（摸到 {tile}）" if tile else ""
+        return f"輪到你打牌{drawn}：輸入要打的牌的代碼"
+    if kind == Decision.SELF_DRAW:
+        return f"自摸 {tile}！輸入 1 胡、0 不胡"
+    if kind == Decision.CONCEALED_KONG:
+        options = "  ".join(f"{i}={Tile(code)}" for i, code in enumerate(prompt['options']))
+        return f"可以暗槓：{options}（直接 Enter 不槓）"
+    options = "  ".join(
+        f"{i}={action}" + (f"({' '.join(str(Tile(c)) for c in extra)})" if extra else "")
+        for i, (action, extra) in enumerate(prompt['options']))
+    return f"別人打出 {tile}：{options}（直接 Enter 不要）"
+
+
+class AsyncClient:
+    def __init__(self, stdscr, url: str, table_id: str):
+        self.stdscr = stdscr
+        self.url = url
+        self.table_id = table_id
+        self.token = uuid.uuid4().hex   # 重連時用來認回座位
+        self.view = TableView()
+        self.status = "正在尋找麻將大廳..."
+        self.message = ""
+        self.input_buf = ""
+        self.prompt: dict | None = None   # 等待回答的題目
+        self.sio = socketio.AsyncClient(
+            reconnection=True,
+            reconnection_delay=0.5,
+            reconnection_delay_max=8,
+            randomization_factor=0.5,
+        )
+        self.sio.on('connect', self._on_connect)
+        self.sio.on('disconnect', self._on_disconnect)
+        self.sio.on('server_message', self._on_server_message)
+        self.sio.on('player_discarded', self._on_event)
+        self.sio.on('table_event', self._on_event)
+        self.sio.on('decision', self._on_decision)
+        self.sio.on('redirect', self._on_redirect)
+
+    # ── 連線 ─────────────────────────────────────────
+
+    async def connect(self):
+        """第一次連線（之後的斷線重連由 socketio 內建的退避機制負責）。"""
+        delay = 0.5
+        while True:
+            try:
+                await self.sio.connect(self.url)
+                return
+            except SioConnectionError as e:
+                self.status = f"連線失敗，{delay:.1f} 秒後重試（{e}）"
+                self.render()
+                await asyncio.sleep(delay * (1 + random.random() * 0.5))
+                delay = min(delay * 2, 8.0)
+
+    async def _call(self, event: str, data: dict) -> dict:
+        """呼叫伺服器；被限速（{'error': 'rate_limited'}）時以指數退避重試。"""
+        delay = 0.5
+        while True:
+            reply = await self.sio.call(event, data)
+            if not (isinstance(reply, dict) and reply.get('error') == 'rate_limited'):
+                return reply
+            self.status = f"伺服器忙碌，{delay:.1f} 秒後重試"
+            self.render()
+            await asyncio.sleep(delay * (1 + random.random() * 0.5))
+            delay = min(delay * 2, 8.0)
+
+    async def _on_connect(self):
+        self.status = "已連線"
+        if self.view.seat < 0:
+            reply = await self._call('join_table', {'table_id': self.table_id, 'token': self.token})
+            self.view.seat = reply['seat']
+            if 'redirect' in reply:
+                self._move(reply['redirect'])
+            elif 'error' in reply:
+                self.status = f"無法入座：{reply['error']}"
+            elif self.view.seat < 0:
+                self.status = f"牌桌 {self.table_id} 已滿"
+            else:
+                self.view.load_snapshot(reply['snapshot'])
+        else:
+            await self._resync()
+        self.render()
+
+    def _move(self, url: str):
+        """改連到 url（在背景進行，不在事件處理函式中等待斷線）。"""
+        async def move():
+            self.status = f"牌桌在 {url}，改連過去..."
+            self.render()
+            self.url = url
+            await self.sio.disconnect()
+            await self.connect()
+        asyncio.create_task(move())
+
+    async def _on_redirect(self, data):
+        if data.get('table_id') == self.table_id:
+            self._move(data['url'])
+
+    async def _on_disconnect(self, *args):
+        self.status = "與伺服器斷開連線，重新連線中..."
+        self.render()
+
+    async def _resync(self):
+        reply = await self._call('resync', {
+            'table_id': self.table_id,
+            'token': self.token,
+            'last_seq': self.view.seq,
+        })
+        if 'redirect' in reply:
+            self._move(reply['redirect'])
+            return
+        if reply['seat'] < 0:
+            # 座位保留時間已過，只能重新入座
+            self.view = TableView()
+            reply = await self._call('join_table', {'table_id': self.table_id, 'token': self.token})
+            self.view.seat = reply['seat']
+            if reply['seat'] >= 0:
+                self.view.load_snapshot(reply['snapshot'])
+            return
+        if 'snapshot' in reply:
+            self.view.load_snapshot(reply['snapshot'])
+        else:
+            for event in reply['events']:
+                self.view.receive(event)
+
+    # ── 伺服器事件 ───────────────────────────────────
+
+    async def _on_server_message(self, data):
+        self.message = data['msg']
+        self.render()
+
+    async def _on_event(self, data):
+        # 逾時由 AI 代答、或這局已經結束：題目作廢
+        if data.get('type') == 'hand_over' or (data.get('seat') == self.view.seat and data.get('substituted')):
+            self.prompt = None
+        if data.get('type') == 'hand_over':
+            self.message = "這局流局" if data['winner'] is None else f"這局由玩家 {data['winner']} 胡牌"
+        if 'seq' in data and not self.view.receive(data):
+            await self._resync()
+        self.render()
+
+    async def _on_decision(self, prompt):
+        self.prompt = prompt
+        self.message = describe_prompt(prompt)
+        self.render()
+
+    async def answer(self, value: int):
+        """回答目前的題目；答案不合法時題目保留，可以重新輸入。"""
+        prompt = self.prompt
         try:
-            # 這裡會卡住等你輸入，但背景依然能瞬間收到別人的牌！
-            tile_to_play = input("你要打哪張牌？(輸入代碼) > ") 
-            
-            if tile_to_play.lower() in ['q', 'exit', 'quit']:
-                sio.disconnect()
+            reply = await self._call('answer', {'ticket': prompt['ticket'], 'value': value})
+        except SocketIOError:
+            self.message = "回答未獲伺服器確認"
+            return
+        if reply.get('ok'):
+            self.prompt = None
+            self.message = ""
+        elif self.prompt is prompt:
+            self.message = f"不合法的答案 {value}；{describe_prompt(prompt)}"
+
+    def _read_answer(self, text: str) -> int | None:
+        """把輸入轉成答案的編碼（mahjong.flow.encode_answer）；空白表示不要。"""
+        kind = self.prompt['kind']
+        if not text:
+            if kind == Decision.DISCARD:
+                return None
+            return 0 if kind == Decision.SELF_DRAW else NO_ANSWER
+        return int(text)
+
+    async def play(self, code: int):
+        if not self.sio.connected or self.view.seat < 0:
+            self.message = "尚未入座，無法打牌"
+            return
+        try:
+            event = await self.sio.call('play_tile', {'tile': code}, timeout=5)
+        except SocketIOError:
+            # 沒收到 ack：可能已送達也可能沒有，等重連後的 resync 再對齊
+            self.message = f"打出 {Tile(code)} 未獲伺服器確認"
+            return
+        if event and 'error' in event:
+            self.message = f"伺服器拒絕：{event['error']}"
+        elif event and not self.view.receive(event):
+            await self._resync()
+
+    # ── 畫面與輸入 ───────────────────────────────────
+
+    def render(self):
+        view = self.view
+        current = (view.last_seat + 1) % 4 if view.last_seat is not None else 0
+        row = ui.draw_table(
+            self.stdscr,
+            view.players,
+            current,
+            set(),
+            None,
+            highlight_player=view.last_seat if view.last_seat is not None else -1,
+            msg=f"[{self.status}] 牌桌 {self.table_id}  座位 {view.seat}  序號 {view.seq}",
+            sub_msg=self.message,
+        )
+        if self.prompt is not None:
+            # 手牌與其代碼（每張牌和每個兩位數代碼都佔 3 欄，上下對齊）
+            hand = [Tile(code) for code in self.prompt['hand']]
+            row = ui.draw_tiles_vertical(self.stdscr, hand, "手牌:", row + 1)
+            ui._safe_addstr(self.stdscr, row, 7, " ".join(str(t.code) for t in hand), curses.A_DIM)
+            ui._safe_addstr(self.stdscr, row + 2, 0, f"你的答案 > {self.input_buf}")
+            ui.draw_hint_bar(self.stdscr, "輸入答案    Enter 送出（空白為不要）    Backspace 刪除    q 離開")
+        else:
+            ui._safe_addstr(self.stdscr, row + 1, 0, f"你要打哪張牌？(輸入代碼) > {self.input_buf}")
+            ui.draw_hint_bar(self.stdscr, "輸入代碼    Enter 打出    Backspace 刪除    q 離開")
+        self.stdscr.refresh()
+
+    async def run(self):
+        self.stdscr.nodelay(True)
+        self.render()
+        await self.connect()
+
+        while True:
+            key = self.stdscr.getch()
+            if key == -1:
+                await asyncio.sleep(0.03)
+                continue
+            if key in (ord('q'), ord('Q')):
                 break
-                
-            if tile_to_play:
-                # 把你想打的牌「發送 (emit)」給伺服器
-                sio.emit('play_tile', {'tile': tile_to_play})
-                
-        except KeyboardInterrupt:
-            sio.disconnect()
-            break
\ No newline at end of file
+            if ord('0') <= key <= ord('9'):
+                self.input_buf += chr(key)
+            elif key in (curses.KEY_BACKSPACE, 127, 8):
+                self.input_buf = self.input_buf[:-1]
+            elif key in (curses.KEY_ENTER, ord('\n'), ord('\r')) and self.prompt is not None:
+                value = self._read_answer(self.input_buf)
+                self.input_buf = ""
+                if value is not None:
+                    await self.answer(value)
+            elif key in (curses.KEY_ENTER, ord('\n'), ord('\r')) and self.input_buf:
+                code = int(self.input_buf)
+                self.input_buf = ""
+                try:
+                    Tile(code).to_string()
+                except KeyError:
+                    self.message = f"沒有代碼 {code} 的牌"
+                else:
+                    await self.play(code)
+            self.render()
+
+        await self.sio.disconnect()
+
+
+def main(stdscr, args):
+    ui.init_colors()
+    curses.curs_set(0)
+    client = AsyncClient(stdscr, args.url, args.table)
+    asyncio.run(client.run())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="麻將 Socket.IO 客戶端")
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--table', default='lobby', help="要加入的牌桌 ID")
+    args = parser.parse_args()
+    curses.wrapper(main, args)
@@ -0,0 +1,363 @@
+"""
+cluster.py — 多台伺服器共用大廳與牌桌目錄
+
+每個伺服器行程是一個節點（ClusterNode），透過可替換的 pub/sub 後端（Broker）交換訊息：
+
+  - 牌桌目錄：每張牌桌由一個節點擁有。要開新桌的節點在 'directory' 頻道發布 claim，
+    所有節點依 Broker 送達的順序套用訊息，最先送達的 claim 獲勝，所以每個節點看到的擁有者都相同。
+    連到非擁有者的玩家收到擁有者的網址（redirect），由客戶端改連過去。
+  - 大廳：各節點每 HEARTBEAT 秒發布一次 hello（網址、擁有的牌桌與入座人數），
+    新節點先等一輪 hello 收齊目錄才開始服務；超過 NODE_TIMEOUT 秒沒消息的節點視為離線，
+    它的牌桌從目錄移除（可以重新 claim）。
+  - 交接：節點關閉前把每張牌桌的狀態（Table.dump()）以 handoff 交給牌桌最少的另一個節點，
+    等對方回覆 adopted 後才通知桌上玩家改連到新節點；客戶端以 token resync 認回原座位。
+
+Broker 的實作：
+  LocalBroker   同一個行程內的節點共用（測試、單機示範）；訊息經 JSON 往返，與網路後端的行為相同
+  TcpBroker     連到 BrokerServer（本機迴路或區網）；python scripts/cluster.py --port 5100 啟動
+
+要接上其他後端（例如 Redis、NATS），實作 publish / subscribe / close 三個方法即可；
+唯一的要求是同一個頻道的訊息以相同順序送達每個訂閱者（目錄的一致性靠這個）。
+
+用法：
+    python scripts/cluster.py --port 5100
+    python scripts/server.py --port 5001 --cluster tcp://127.0.0.1:5100
+    python scripts/server.py --port 5002 --cluster tcp://127.0.0.1:5100
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+DIRECTORY = 'directory'
+HEARTBEAT = 1.0         # hello 的間隔（秒）
+NODE_TIMEOUT = 5.0      # 超過這麼久沒有 hello 就視為離線
+HANDOFF_TIMEOUT = 5.0   # 等對方接手的時間
+
+Handler = Callable[[dict], None]
+
+
+# ── pub/sub 後端 ─────────────────────────────────────
+
+class Broker:
+    """pub/sub 後端的介面：同一頻道的訊息以相同順序送達每個訂閱者（包括發布者自己）"""
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: Handler):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LocalBroker(Broker):
+    """同一個行程內的 Broker：每則訊息以 JSON 往返後依序交給訂閱者（不共用物件）"""
+
+    def __init__(self):
+        self.handlers: dict[str, list[Handler]] = {}
+
+    async def publish(self, channel: str, message: dict):
+        data = json.dumps(message)
+        loop = asyncio.get_running_loop()
+        for handler in list(self.handlers.get(channel, ())):
+            loop.call_soon(handler, json.loads(data))
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def close(self):
+        self.handlers.clear()
+
+
+class BrokerServer:
+    """
+    TcpBroker 連線的中繼站：每行一則 JSON，{"sub": 頻道} 訂閱、{"pub": 頻道, "msg": ...} 發布。
+    所有連線由同一個事件迴圈依序轉送，所以每個頻道的訊息順序對所有訂閱者都相同。
+    """
+
+    def __init__(self):
+        self.subscribers: dict[str, set[asyncio.StreamWriter]] = {}
+        self.server: asyncio.base_events.Server | None = None
+        self.messages = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 5100):
+        self.server = await asyncio.start_server(self._serve, host, port)
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                if 'sub' in request:
+                    self.subscribers.setdefault(request['sub'], set()).add(writer)
+                    continue
+                out = json.dumps({'ch': request['pub'], 'msg': request['msg']}).encode() + b'\n'
+                self.messages += 1
+                for subscriber in list(self.subscribers.get(request['pub'], ())):
+                    subscriber.write(out)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for subscribers in self.subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+class TcpBroker(Broker):
+    """連到 BrokerServer 的 Broker（tcp://host:port）"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5100):
+        self.host = host
+        self.port = port
+        self.handlers: dict[str, list[Handler]] = {}
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.task: asyncio.Task | None = None
+
+    async def connect(self) -> TcpBroker:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.task = asyncio.create_task(self._read())
+        return self
+
+    async def publish(self, channel: str, message: dict):
+        self.writer.write(json.dumps({'pub': channel, 'msg': message}).encode() + b'\n')
+        await self.writer.drain()
+
+    async def subscribe(self, channel: str, handler: Handler):
+        if channel not in self.handlers:
+            self.writer.write(json.dumps({'sub': channel}).encode() + b'\n')
+            await self.writer.drain()
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+
+    async def _read(self):
+        while line := await self.reader.readline():
+            packet = json.loads(line)
+            for handler in self.handlers.get(packet['ch'], ()):
+                handler(packet['msg'])
+
+
+async def connect_broker(url: str) -> Broker:
+    """'local'（同行程共用的 LocalBroker）或 'tcp://host:port'。"""
+    if url == 'local':
+        return _shared_local
+    if url.startswith('tcp://'):
+        host, _, port = url[len('tcp://'):].rpartition(':')
+        return await TcpBroker(host or '127.0.0.1', int(port)).connect()
+    raise ValueError(f"不支援的 broker：{url}")
+
+
+_shared_local = LocalBroker()
+
+
+# ── 節點 ─────────────────────────────────────────────
+
+class ClusterNode:
+    """
+    叢集中的一個伺服器節點：維護全叢集一致的牌桌目錄（table_id -> 擁有的節點）與大廳。
+    on_adopt(table_id, state) 在別的節點把牌桌交給自己時呼叫；
+    local_tables() 回傳自己擁有的牌桌 {table_id: 入座人數}，放進 hello。
+    """
+
+    def __init__(self, broker: Broker, node_id: str, url: str,
+                 local_tables: Callable[[], dict[str, int]] = dict,
+                 on_adopt: Callable[[str, dict], Awaitable[None] | None] | None = None):
+        self.broker = broker
+        self.node_id = node_id
+        self.url = url
+        self.local_tables = local_tables
+        self.on_adopt = on_adopt
+        self.owners: dict[str, str] = {}            # table_id -> node_id
+        self.nodes: dict[str, dict] = {}            # node_id -> 最近一次的 hello（加上 seen）
+        self._claims: dict[str, asyncio.Future] = {}
+        self._adopted: dict[str, asyncio.Future] = {}
+        self._heartbeat: asyncio.Task | None = None
+        self.messages = 0
+
+    async def start(self, settle: float = HEARTBEAT):
+        """訂閱目錄、請其他節點立即報到，等 settle 秒收齊目錄後開始定期 hello。"""
+        await self.broker.subscribe(DIRECTORY, self._on_message)
+        await self._hello()
+        await self.broker.publish(DIRECTORY, {'op': 'sync', 'node': self.node_id})
+        await asyncio.sleep(settle)
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    async def stop(self, handoff: Callable[[str], dict] | None = None,
+                   notify: Callable[[str, str], None] | None = None) -> dict[str, str]:
+        """
+        離開叢集。給 handoff(table_id) -> 狀態 時把自己的牌桌交給其他節點，
+        對方接手後呼叫 notify(table_id, 新節點網址)。回傳 {table_id: 新節點}。
+        """
+        moved = {}
+        if handoff is not None:
+            for table_id in [t for t, owner in self.owners.items() if owner == self.node_id]:
+                target = self._pick_target()
+                if target is None:
+                    break
+                future = self._adopted[table_id] = asyncio.get_running_loop().create_future()
+                await self.broker.publish(DIRECTORY, {'op': 'handoff', 'node': self.node_id, 'table': table_id,
+                                                      'to': target, 'state': handoff(table_id)})
+                try:
+                    await asyncio.wait_for(future, HANDOFF_TIMEOUT)
+                except asyncio.TimeoutError:
+                    continue
+                finally:
+                    self._adopted.pop(table_id, None)
+                moved[table_id] = target
+                if notify is not None:
+                    notify(table_id, self.nodes[target]['url'])
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        await self.broker.publish(DIRECTORY, {'op': 'bye', 'node': self.node_id})
+        return moved
+
+    # ── 目錄 ─────────────────────────────────────────
+
+    def owner(self, table_id: str) -> str | None:
+        return self.owners.get(table_id)
+
+    def owns(self, table_id: str) -> bool:
+        return self.owners.get(table_id) == self.node_id
+
+    def url_of(self, node_id: str) -> str | None:
+        info = self.nodes.get(node_id)
+        return info['url'] if info else None
+
+    async def claim(self, table_id: str, timeout: float = HANDOFF_TIMEOUT) -> str:
+        """取得 table_id 的擁有者；還沒有人擁有就替自己申請（最先送達的申請獲勝）。"""
+        owner = self.owners.get(table_id)
+        if owner is not None:
+            return owner
+        future = self._claims.get(table_id)
+        if future is None:
+            future = self._claims[table_id] = asyncio.get_running_loop().create_future()
+            await self.broker.publish(DIRECTORY, {'op': 'claim', 'node': self.node_id, 'table': table_id})
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    async def release(self, table_id: str):
+        if self.owns(table_id):
+            await self.broker.publish(DIRECTORY, {'op': 'release', 'node': self.node_id, 'table': table_id})
+
+    def lobby(self) -> dict[str, dict]:
+        """全叢集的牌桌：{table_id: {'node', 'url', 'seated'}}（入座人數來自最近一次 hello）。"""
+        return {
+            table_id: {'node': node_id, 'url': self.url_of(node_id),
+                       'seated': self.nodes.get(node_id, {}).get('tables', {}).get(table_id, 0)}
+            for table_id, node_id in self.owners.items()
+        }
+
+    # ── 訊息 ─────────────────────────────────────────
+
+    def _on_message(self, message: dict):
+        self.messages += 1
+        op = message['op']
+        node = message['node']
+        if op == 'hello':
+            self.nodes[node] = {**message, 'seen': time.monotonic()}
+            # hello 同時宣告擁有的牌桌：讓晚加入的節點補齊目錄
+            for table_id in message['tables']:
+                self._set_owner(table_id, node)
+        elif op == 'sync':
+            if node != self.node_id:
+                asyncio.ensure_future(self._hello())
+        elif op == 'claim':
+            self._set_owner(message['table'], node)
+        elif op == 'release':
+            table_id = message['table']
+            if self.owners.get(table_id) == node:
+                if node == self.node_id and table_id in self.local_tables():
+                    # 送出 release 之後這張牌桌又有人入座：繼續擁有，並立刻以 hello 重新宣告，
+                    # 讓已經刪掉這筆的其他節點補回來（不然別的節點可以再申請同一張牌桌）
+                    asyncio.ensure_future(self._hello())
+                else:
+                    del self.owners[table_id]
+        elif op == 'handoff':
+            table_id = message['table']
+            if self.owners.get(table_id) == node:
+                self.owners[table_id] = message['to']
+                if message['to'] == self.node_id:
+                    asyncio.ensure_future(self._adopt(table_id, message['state'], node))
+        elif op == 'adopted':
+            future = self._adopted.get(message['table'])
+            if future is not None and not future.done() and message['from'] == self.node_id:
+                future.set_result(node)
+        elif op == 'bye':
+            self._forget(node)
+
+    def _set_owner(self, table_id: str, node: str):
+        owner = self.owners.setdefault(table_id, node)
+        future = self._claims.pop(table_id, None)
+        if future is not None and not future.done():
+            future.set_result(owner)
+
+    async def _adopt(self, table_id: str, state: dict, previous: str):
+        if self.on_adopt is not None:
+            result = self.on_adopt(table_id, state)
+            if asyncio.iscoroutine(result):
+                await result
+        await self.broker.publish(DIRECTORY, {'op': 'adopted', 'node': self.node_id,
+                                              'table': table_id, 'from': previous})
+
+    def _forget(self, node: str):
+        self.nodes.pop(node, None)
+        for table_id in [t for t, owner in self.owners.items() if owner == node]:
+            del self.owners[table_id]
+
+    def _pick_target(self) -> str | None:
+        others = [n for n in self.nodes if n != self.node_id]
+        if not others:
+            return None
+        return min(others, key=lambda n: (sum(1 for o in self.owners.values() if o == n), n))
+
+    async def _hello(self):
+        await self.broker.publish(DIRECTORY, {'op': 'hello', 'node': self.node_id, 'url': self.url,
+                                              'tables': self.local_tables()})
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT)
+            await self._hello()
+            now = time.monotonic()
+            for node, info in list(self.nodes.items()):
+                if node != self.node_id and now - info['seen'] > NODE_TIMEOUT:
+                    self._forget(node)
+
+    def register_metrics(self, metrics):
+        metrics.gauge('cluster_nodes', lambda: len(self.nodes))
+        metrics.gauge('cluster_tables', lambda: len(self.owners))
+        metrics.gauge('cluster_owned_tables', lambda: sum(1 for o in self.owners.values() if o == self.node_id))
+        metrics.counter('cluster_messages_total', lambda: self.messages)
+
+
+async def _serve_broker(host: str, port: int):
+    broker = await BrokerServer().start(host, port)
+    print(f"broker 啟動於 tcp://{host}:{port} ...")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="叢集模式的本機 broker（TcpBroker 連線的中繼站）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5100)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_broker(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,120 @@
+"""
+game_archive.py — 牌局紀錄檔：記錄自我對戰、依條件查詢與統計（mahjong.archive）
+
+用法：
+    python scripts/game_archive.py record games.mja --hands 10000 --strategy defensive --strategy simple
+    python scripts/game_archive.py query games.mja --discarder 2                 # 玩家 2 放槍的局
+    python scripts/game_archive.py query games.mja --kong-replacement --list 20  # 列出前 20 局槓上開花
+    python scripts/game_archive.py query games.mja --seed 1000:2000 --winner 0
+    python scripts/game_archive.py reindex games.mja
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.archive import ArchiveWriter, GameArchive, reindex
+from mahjong.flow import HandState, ai_agent
+from tournament import load_strategy
+
+
+FILTERS = ("dealer", "winner", "discarder", "winning_tile", "turns", "tai", "seed",
+           "self_drawn", "kong_replacement", "flower_win")
+
+
+def _seat(value: str) -> int | None:
+    return None if value in ("none", "-") else int(value)
+
+
+def _span(value: str) -> range:
+    """「12」或「10:20」（含頭不含尾）。"""
+    lo, sep, hi = value.partition(":")
+    return range(int(lo), int(hi)) if sep else range(int(lo), int(lo) + 1)
+
+
+def cmd_record(args) -> int:
+    strategies = args.strategy or ["simple"]
+    agents = [ai_agent(load_strategy(strategies[seat % len(strategies)])) for seat in range(4)]
+    state = HandState()
+    t0 = time.perf_counter()
+    with ArchiveWriter(args.archive) as writer:
+        for seed in range(args.seed, args.seed + args.hands):
+            state.reset(dealer=seed % 4)
+            state.deal(random.Random(seed))
+            writer.record_hand(state, agents, seed=seed)
+        total = len(writer)
+    elapsed = time.perf_counter() - t0
+    print(f"記錄 {args.hands} 局（共 {total} 局），{elapsed:.1f} 秒 → {args.archive}")
+    return 0
+
+
+def cmd_query(args) -> int:
+    # 篩選的參數預設為 SUPPRESS：沒給的不會出現在 args 裡（--winner none 則是 None）
+    criteria = {name: value for name, value in vars(args).items() if name in FILTERS}
+
+    with GameArchive(args.archive) as archive:
+        t0 = time.perf_counter()
+        stats = archive.stats(**criteria)
+        elapsed = time.perf_counter() - t0
+        print(f"{stats.hands} / {len(archive)} 局符合（{elapsed * 1e3:.1f} ms）")
+        if stats.hands:
+            print(f"  流局 {stats.draws}、自摸 {stats.self_drawn}、槓上開花 {stats.kong_replacement}、"
+                  f"八仙過海 {stats.flower_win}")
+            print(f"  胡牌  {stats.wins}")
+            print(f"  放槍  {stats.deal_ins}")
+            print(f"  平均 {stats.mean_tai:.2f} 台、打出 {stats.mean_turns:.1f} 張")
+            common = ", ".join(f"{code}×{n}" for code, n in stats.winning_tiles.most_common(5))
+            if common:
+                print(f"  最常胡的牌  {common}")
+        if args.list:
+            for row in archive.select(**criteria)[:args.list]:
+                print(f"  {archive.read(row)}")
+    return 0
+
+
+def cmd_reindex(args) -> int:
+    print(f"{reindex(args.archive)} 局 → {args.archive}.idx")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="牌局紀錄檔的記錄、查詢與統計")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="以 AI 自我對戰並附加到紀錄檔")
+    p.add_argument("archive")
+    p.add_argument("--hands", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=0, help="第一局的 seed（之後依序 +1）")
+    p.add_argument("--strategy", action="append", default=None,
+                   help="各座位的策略，可重複（依序坐 0–3 號位、不足則循環），預設 simple")
+    p.set_defaults(handler=cmd_record)
+
+    p = sub.add_parser("query", help="依條件篩選並統計", argument_default=argparse.SUPPRESS)
+    p.add_argument("archive")
+    p.add_argument("--dealer", type=int)
+    p.add_argument("--winner", type=_seat, help="座位，或 none 表示流局")
+    p.add_argument("--discarder", type=_seat, help="座位，或 none 表示自摸/流局")
+    p.add_argument("--winning-tile", type=int, help="胡的牌（code）")
+    p.add_argument("--turns", type=_span, help="打出張數，例如 40:60")
+    p.add_argument("--tai", type=_span, help="台數，例如 5:100")
+    p.add_argument("--seed", type=_span, help="seed，例如 1000:2000")
+    p.add_argument("--self-drawn", action="store_const", const=True)
+    p.add_argument("--kong-replacement", action="store_const", const=True, help="槓上開花")
+    p.add_argument("--flower-win", action="store_const", const=True, help="八仙過海")
+    p.add_argument("--list", type=int, default=0, metavar="N", help="列出前 N 局")
+    p.set_defaults(handler=cmd_query)
+
+    p = sub.add_parser("reindex", help="從紀錄檔重建索引")
+    p.add_argument("archive")
+    p.set_defaults(handler=cmd_reindex)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == '__main__':
+    main()
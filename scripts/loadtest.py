@@ -0,0 +1,253 @@
+"""
+loadtest.py — 伺服器壓力測試工具
+
+在單一 asyncio 行程中啟動大量模擬客戶端：每四個客戶端組成一桌，
+輪流以 SimpleAI 決定要打的牌，並統計「送出 play_tile → 同桌玩家收到
+player_discarded 廣播」的延遲分位數（p50 / p95 / p99）。
+
+用法：
+    python scripts/server.py --quiet
+    python scripts/loadtest.py --tables 250 --rounds 20
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+import socketio
+from socketio.exceptions import SocketIOError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.deck import Deck
+from mahjong.tile import Tile
+from mahjong.ai import SimpleAI
+
+
+class LoadStats:
+    """共用的延遲統計（所有模擬客戶端在同一行程，可直接共用時間戳）"""
+
+    def __init__(self):
+        self.sent_at: dict[int, float] = {}      # action_id -> 送出時間（還有人沒收到廣播的才留著）
+        self.waiting: dict[int, int] = {}        # action_id -> 還沒收到廣播的人數
+        self.sender_of: dict[int, tuple[str, int]] = {}  # action_id -> (牌桌, 送出的座位)，有人斷線時找出等不到的廣播
+        self.latencies: list[float] = []         # 每一次送達的延遲（秒）
+        self.actions = 0
+        self.errors = 0
+        self.missed = 0                          # 逾時或收件人斷線而沒有送達的廣播（以人次計）
+        self._ids = itertools.count()
+
+    def new_action(self, table_id: str, seat: int, receivers: int = 3) -> int:
+        """登記 seat 的一次打牌；receivers 為會收到這則廣播的人數（同桌其他在線的玩家）。"""
+        action_id = next(self._ids)
+        self.actions += 1
+        if receivers <= 0:
+            return action_id
+        self.sent_at[action_id] = time.perf_counter()
+        self.waiting[action_id] = receivers
+        self.sender_of[action_id] = (table_id, seat)
+        return action_id
+
+    def record(self, action_id: int):
+        sent = self.sent_at.get(action_id)
+        if sent is None:
+            return
+        self.latencies.append(time.perf_counter() - sent)
+        # 最後一位收到後就不再需要送出時間，長時間壓測時字典不會一直長大
+        self.waiting[action_id] -= 1
+        if self.waiting[action_id] <= 0:
+            self._forget(action_id)
+
+    def receiver_left(self, table_id: str, seat: int):
+        """table_id 的 seat 斷線：這桌其他人送出、還在等的廣播少一位收件人。"""
+        pending = [a for a, (t, s) in self.sender_of.items() if t == table_id and s != seat]
+        for action_id in pending:
+            self.missed += 1
+            self.waiting[action_id] -= 1
+            if self.waiting[action_id] <= 0:
+                self._forget(action_id)
+
+    def expire(self, max_age: float) -> int:
+        """丟掉送出超過 max_age 秒仍沒收齊的記錄（沒收到的人次計入 missed）。回傳丟掉的筆數。"""
+        deadline = time.perf_counter() - max_age
+        stale = [a for a, sent in self.sent_at.items() if sent <= deadline]
+        for action_id in stale:
+            self.missed += self.waiting[action_id]
+            self._forget(action_id)
+        return len(stale)
+
+    def _forget(self, action_id: int):
+        del self.sent_at[action_id], self.waiting[action_id], self.sender_of[action_id]
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        idx = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+class SimTable:
+    """一桌模擬牌局：共用牌庫、記錄已打幾手"""
+
+    def __init__(self, table_id: str, rounds: int):
+        self.table_id = table_id
+        self.rounds = rounds
+        self.deck = Deck()
+        self.deck.shuffle()
+        self.turns = 0
+        self.connected = 0      # 目前在線的客戶端數
+        self.done = asyncio.Event()
+
+    def draw(self) -> Tile:
+        # 牌摸完就換一副新牌，壓力測試不需要流局；花牌不能打（伺服器會拒絕），直接跳過
+        while True:
+            if self.deck.get_remaining_tiles_count() <= 0:
+                self.deck = Deck()
+                self.deck.shuffle()
+            tile = self.deck.draw_from_front()
+            if tile.get_suit() != 5:
+                return tile
+
+
+class SimClient:
+    """單一模擬客戶端：入座、等輪到自己時摸一張並以 SimpleAI 打出"""
+
+    def __init__(self, url: str, table: SimTable, stats: LoadStats, think: float):
+        self.url = url
+        self.table = table
+        self.stats = stats
+        self.think = think
+        self.seat = -1
+        self.hand: list[Tile] = []
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on('player_discarded', self._on_discarded)
+        self.sio.on('disconnect', self._on_disconnect)
+
+    async def start(self):
+        await self.sio.connect(self.url, transports=['websocket'])
+        reply = await self.sio.call('join_table', {'table_id': self.table.table_id})
+        self.seat = reply['seat']
+        if self.seat < 0:
+            raise RuntimeError(f"牌桌 {self.table.table_id} 已滿")
+        self.table.connected += 1
+        self.hand = [self.table.draw() for _ in range(16)]
+
+    async def stop(self):
+        await self.sio.disconnect()
+
+    async def _on_disconnect(self, *args):
+        if self.seat >= 0:
+            self.table.connected -= 1
+            self.stats.receiver_left(self.table.table_id, self.seat)
+            self.seat = -1
+
+    async def _on_discarded(self, data):
+        if 'action_id' in data:
+            self.stats.record(data['action_id'])
+        # 上家打完才輪到自己
+        if data.get('seat') == (self.seat - 1) % 4:
+            await self.play()
+
+    async def play(self):
+        table = self.table
+        if table.turns >= table.rounds * 4:
+            table.done.set()
+            return
+        table.turns += 1
+
+        if self.think:
+            await asyncio.sleep(self.think)
+        self.hand.append(table.draw())
+        tile = SimpleAI.choose_discard(self.hand)
+        self.hand.remove(tile)
+        try:
+            await self.sio.emit('play_tile', {
+                'tile': tile.code,
+                'action_id': self.stats.new_action(table.table_id, self.seat, table.connected - 1),
+            })
+        except SocketIOError:
+            self.stats.errors += 1
+            table.done.set()
+
+
+async def run(args):
+    stats = LoadStats()
+    tables = [SimTable(f"load-{i}", args.rounds) for i in range(args.tables)]
+    clients = [
+        SimClient(args.url, table, stats, args.think)
+        for table in tables
+        for _ in range(4)
+    ]
+
+    # 分批連線，避免一次湧入上千條連線
+    limiter = asyncio.Semaphore(args.concurrency)
+
+    async def start(client: SimClient):
+        async with limiter:
+            try:
+                await client.start()
+            except Exception as e:
+                stats.errors += 1
+                client.table.done.set()
+                print(f"[壓測] 連線失敗：{e}")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(start(c) for c in clients))
+    print(f"[壓測] {len(clients)} 個客戶端入座完成，耗時 {time.perf_counter() - t0:.1f}s")
+
+    async def sweep():
+        # 漏掉的廣播不會再來，定期清掉以免 sent_at 在長時間壓測中一直長大
+        while True:
+            await asyncio.sleep(1.0)
+            stats.expire(args.broadcast_timeout)
+
+    # 每桌由座位 0 開始打
+    t0 = time.perf_counter()
+    sweeper = asyncio.create_task(sweep())
+    openers = [asyncio.create_task(c.play()) for c in clients if c.seat == 0]
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(t.done.wait() for t in tables)),
+            timeout=args.timeout,
+        )
+    except asyncio.TimeoutError:
+        unfinished = sum(not t.done.is_set() for t in tables)
+        print(f"[壓測] 逾時：{unfinished} 桌未完成")
+    elapsed = time.perf_counter() - t0
+    for task in (sweeper, *openers):
+        task.cancel()
+
+    await asyncio.gather(*(c.stop() for c in clients), return_exceptions=True)
+    stats.expire(0)
+
+    print(f"牌桌數      : {len(tables)}")
+    print(f"客戶端數    : {len(clients)}")
+    print(f"打牌動作    : {stats.actions}（{stats.actions / elapsed:.0f} 次/秒）")
+    print(f"廣播送達    : {len(stats.latencies)}")
+    print(f"未送達      : {stats.missed}")
+    print(f"錯誤        : {stats.errors}")
+    for p in (50, 95, 99):
+        print(f"p{p:<10} : {stats.percentile(p) * 1000:.2f} ms")
+    if stats.latencies:
+        print(f"max         : {max(stats.latencies) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="麻將伺服器壓力測試")
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--tables', type=int, default=25, help="同時進行的牌桌數（每桌 4 個客戶端）")
+    parser.add_argument('--rounds', type=int, default=20, help="每桌打幾圈（每圈 4 手）")
+    parser.add_argument('--think', type=float, default=0.0, help="每手打牌前的思考時間（秒）")
+    parser.add_argument('--concurrency', type=int, default=200, help="同時建立連線的上限")
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--broadcast-timeout', type=float, default=10.0,
+                        help="廣播送出後幾秒仍沒收到就算未送達（秒）")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
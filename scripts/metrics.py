@@ -0,0 +1,158 @@
+"""
+metrics.py — 伺服器指標：直方圖、事件速率、事件迴圈延遲
+
+只用標準函式庫，輸出 Prometheus 文字格式或 JSON，由 server.py 掛在 /metrics。
+"""
+from __future__ import annotations
+import asyncio
+import bisect
+import functools
+import time
+from collections import deque
+from typing import Callable
+
+# 預設直方圖分桶上限（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """固定分桶的直方圖（累計計數在輸出時才計算）"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 最後一格為 +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result = []
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            running += n
+            result.append(("+Inf" if bound == float("inf") else repr(bound), running))
+        return result
+
+
+class RateMeter:
+    """以每秒一格的環形計數估算最近 window 秒的平均速率"""
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self._slots: deque[list[float]] = deque(maxlen=window + 1)   # [秒, 次數]
+
+    def mark(self, n: int = 1):
+        now = int(time.monotonic())
+        if self._slots and self._slots[-1][0] == now:
+            self._slots[-1][1] += n
+        else:
+            self._slots.append([now, n])
+
+    def rate(self) -> float:
+        now = int(time.monotonic())
+        # 不計入還沒結束的這一秒
+        total = sum(n for sec, n in self._slots if now - self.window <= sec < now)
+        return total / self.window
+
+
+class Metrics:
+    """伺服器所有指標的集合"""
+
+    def __init__(self):
+        self.events = RateMeter()
+        self.loop_lag = Histogram()
+        self.handlers: dict[str, Histogram] = {}
+        self.gauges: dict[str, Callable[[], float]] = {}   # 名稱 -> 取值函式（輸出時才讀）
+        self.counters: dict[str, Callable[[], float]] = {}  # 只增不減的累計值，名稱以 _total 結尾
+        self._lag_task: asyncio.Task | None = None
+
+    def gauge(self, name: str, read: Callable[[], float]):
+        """可增可減的即時值（輸出為 Prometheus gauge）。"""
+        if name.endswith("_total"):
+            raise ValueError(f"{name}：累計值請用 counter()")
+        self.gauges[name] = read
+
+    def counter(self, name: str, read: Callable[[], float]):
+        """只增不減的累計值（輸出為 Prometheus counter，名稱須以 _total 結尾）。"""
+        if not name.endswith("_total"):
+            raise ValueError(f"{name}：counter 的名稱須以 _total 結尾")
+        self.counters[name] = read
+
+    def timed(self, handler):
+        """包住 Socket.IO 事件處理函式：記錄處理時間並計入事件速率。"""
+        hist = self.handlers.setdefault(handler.__name__, Histogram())
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            self.events.mark()
+            start = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+
+    # ── 事件迴圈延遲 ─────────────────────────────────
+
+    def start_loop_monitor(self, interval: float = 0.1):
+        self._lag_task = asyncio.create_task(self._monitor_loop(interval))
+
+    async def stop_loop_monitor(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    async def _monitor_loop(self, interval: float):
+        # 睡 interval 秒，實際醒來的時間超出多少就是事件迴圈被佔住的時間
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, time.perf_counter() - start - interval))
+
+    # ── 輸出 ─────────────────────────────────────────
+
+    def to_dict(self) -> dict:
+        return {
+            **{name: read() for name, read in self.gauges.items()},
+            **{name: read() for name, read in self.counters.items()},
+            "events_per_second": self.events.rate(),
+            "loop_lag_seconds": _hist_dict(self.loop_lag),
+            "handler_seconds": {name: _hist_dict(h) for name, h in self.handlers.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, read in self.gauges.items():
+            lines.append(f"# TYPE mahjong_{name} gauge")
+            lines.append(f"mahjong_{name} {read()}")
+        for name, read in self.counters.items():
+            lines.append(f"# TYPE mahjong_{name} counter")
+            lines.append(f"mahjong_{name} {read()}")
+        lines.append("# TYPE mahjong_events_per_second gauge")
+        lines.append(f"mahjong_events_per_second {self.events.rate()}")
+        lines.append("# TYPE mahjong_loop_lag_seconds histogram")
+        lines.extend(_hist_lines("mahjong_loop_lag_seconds", self.loop_lag, ""))
+        lines.append("# TYPE mahjong_handler_seconds histogram")
+        for name, hist in self.handlers.items():
+            lines.extend(_hist_lines("mahjong_handler_seconds", hist, f'handler="{name}",'))
+        return "\n".join(lines) + "\n"
+
+
+def _hist_dict(hist: Histogram) -> dict:
+    return {
+        "buckets": dict(hist.cumulative()),
+        "sum": hist.total,
+        "count": hist.count,
+    }
+
+
+def _hist_lines(name: str, hist: Histogram, labels: str) -> list[str]:
+    lines = [f'{name}_bucket{{{labels}le="{le}"}} {n}' for le, n in hist.cumulative()]
+    bare = "{" + labels.rstrip(",") + "}" if labels else ""
+    lines.append(f"{name}_sum{bare} {hist.total}")
+    lines.append(f"{name}_count{bare} {hist.count}")
+    return lines
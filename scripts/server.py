@@ -1,6 +1,27 @@
+import argparse
+import asyncio
+import functools
+import os
+import socket
+import sys
+from collections import deque
+
 import socketio
 from aiohttp import web
 
+from wal import WriteAheadLog
+from metrics import Metrics
+from backpressure import OutboundRouter, RateLimiter, DROP_OLDEST, DISCONNECT
+from analysis_service import AnalysisService
+from spectators import PUBLIC, SpectatorHub
+from cluster import ClusterNode, connect_broker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.aioflow import RemoteAgent, run_hand_async
+from mahjong.flow import Decision, HandState
+from mahjong.tile import TILE_INDEX
+
 # 建立一個非同步的 Socket.IO 伺服器
 sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
 app = web.Application()
@@ -9,32 +30,681 @@ sio.attach(app)
 # 記錄目前連線的玩家數量
 connected_players = 0
 
+# 斷線後保留座位的秒數（期間內用同一個 token 重連即可回到原座位）
+SEAT_GRACE = 30.0
+# 每個決策的時限（秒）；逾時由 SimpleAI 代打
+TURN_TIMEOUT = 20.0
+# 觀眾看到牌桌事件的延遲（秒）
+SPECTATOR_DELAY = 5.0
+# 跟看座位（看得到暗手）需要的最短延遲（秒）：延遲更短時只能看公開資訊，
+# 以免玩家另開一條沒入座的連線即時看到對手的牌
+FOLLOW_MIN_DELAY = 60.0
+
+
+class Table:
+    """一張牌桌的伺服器端狀態：座位、事件序號、棄牌與最近的事件記錄"""
+
+    HISTORY = 256   # 保留最近幾筆事件供斷線重連補送
+
+    def __init__(self, table_id: str):
+        self.table_id = table_id
+        self.seats: list[str | None] = [None, None, None, None]   # 入座玩家的 token
+        self.discards: list[list[int]] = [[], [], [], []]
+        self.seq = 0
+        self.history: deque[dict] = deque(maxlen=self.HISTORY)
+
+    def apply(self, event: dict) -> dict:
+        """套用一筆事件並配發序號。"""
+        event['seq'] = self.seq + 1
+        self.replay(event)
+        return event
+
+    def replay(self, event: dict):
+        """套用一筆已有序號的事件（apply 與 WAL 重播共用）。"""
+        self.seq = event['seq']
+        if event['type'] == 'discard':
+            self.discards[event['seat']].append(event['tile'])
+        elif event['type'] == 'hand_start':
+            self.discards = [[], [], [], []]
+        self.history.append(event)
+
+    def snapshot(self) -> dict:
+        return {
+            'table_id': self.table_id,
+            'seq': self.seq,
+            'seats': [token is not None for token in self.seats],
+            'discards': [list(d) for d in self.discards],
+        }
+
+    def dump(self) -> dict:
+        """完整狀態（含座位 token 與事件記錄），供 WAL 快照使用。"""
+        return {
+            'seats': list(self.seats),
+            'discards': [list(d) for d in self.discards],
+            'seq': self.seq,
+            'history': list(self.history),
+        }
+
+    @classmethod
+    def load(cls, table_id: str, state: dict) -> 'Table':
+        table = cls(table_id)
+        table.seats = list(state['seats'])
+        table.discards = [list(d) for d in state['discards']]
+        table.seq = state['seq']
+        table.history.extend(state['history'])
+        return table
+
+    def events_since(self, seq: int) -> list[dict] | None:
+        """回傳序號大於 seq 的事件；若已超出保留範圍則回傳 None（需改送快照）。"""
+        if seq >= self.seq:
+            return []
+        if not self.history or self.history[0]['seq'] > seq + 1:
+            return None
+        return [e for e in self.history if e['seq'] > seq]
+
+
+class LiveHand:
+    """
+    一張牌桌進行中的一局，由 mahjong.aioflow 在伺服器的事件迴圈上驅動（多桌共用一個迴圈）。
+    入座的玩家是 RemoteAgent：以 'decision' 送出題目、等 'answer' 回覆；
+    空位或斷線中的座位送不出題目，立即由 SimpleAI 代打，不必等到逾時。
+    """
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.state = HandState()
+        self.agents = [RemoteAgent(functools.partial(self._prompt, seat)) for seat in range(4)]
+        self.task: asyncio.Task | None = None
+
+    def _prompt(self, seat: int, prompt: dict):
+        sid = _sid_at(self.table.table_id, seat)
+        if sid is None:
+            raise LookupError(f"座位 {seat} 沒有在線的玩家")
+        router.send(sid, 'decision', prompt)
+
+    def _publish(self, payload: dict, name: str = 'table_event', hands: list[list[int]] | None = None) -> dict:
+        event = self.table.apply(payload)
+        _log({'t': self.table.table_id, 'op': 'event', 'event': event})
+        _broadcast(self.table.table_id, name, event,
+                   hands=hands if hands is not None else self._hands())
+        return event
+
+    def _hands(self) -> list[list[int]]:
+        return [[t.code for t in p.hand_tiles] for p in self.state.players]
+
+    async def _observe(self, state: HandState, decision: Decision, answer, substituted):
+        seat = decision.player_idx
+        if decision.kind == Decision.DISCARD:
+            # 答案還沒送進流程，觀眾看到的手牌先拿掉打出的這張
+            hands = self._hands()
+            hands[seat].remove(answer.code)
+            self._publish({'type': 'discard', 'seat': seat, 'tile': answer.code,
+                           'substituted': substituted}, 'player_discarded', hands)
+        elif decision.kind == Decision.REACTION and answer is not None:
+            self._publish({'type': 'claim', 'seat': seat, 'action': answer[0],
+                           'tile': decision.tile.code, 'substituted': substituted})
+        elif decision.kind == Decision.CONCEALED_KONG and answer is not None:
+            self._publish({'type': 'concealed_kong', 'seat': seat, 'substituted': substituted})
+
+    async def run(self, dealer: int = 0, timeout: float | None = None):
+        try:
+            self.state.reset(dealer)
+            self.state.deal()
+            self._publish({'type': 'hand_start', 'dealer': dealer})
+            await run_hand_async(self.state, self.agents, timeouts=timeout, observer=self._observe)
+            state = self.state
+            self._publish({'type': 'hand_over', 'winner': state.winner, 'discarder': state.discarder,
+                           'tile': state.winning_tile.code if state.winning_tile is not None else None})
+        finally:
+            if live_hands.get(self.table.table_id) is self:
+                del live_hands[self.table.table_id]
+
+
+def _broadcast(table_id: str, name: str, event: dict, skip_sid: str | None = None,
+               hands: list[list[int]] | None = None):
+    """牌桌事件送給同桌玩家（即時）與觀眾（延遲、遮蔽暗手）。"""
+    router.broadcast(room_members.get(table_id, ()), name, event, skip_sid=skip_sid)
+    spectators.publish(table_id, name, event, hands)
+
+
+def _sid_at(table_id: str, seat: int) -> str | None:
+    for sid in room_members.get(table_id, ()):
+        if seat_of[sid][1] == seat:
+            return sid
+    return None
+
+
+# 牌桌：table_id -> Table
+tables: dict[str, Table] = {}
+# 進行中的牌局：table_id -> LiveHand
+live_hands: dict[str, LiveHand] = {}
+# 玩家所在位置：sid -> (table_id, seat)
+seat_of: dict[str, tuple[str, int]] = {}
+# 每桌目前在線的 sid（廣播時逐一放進各自的外送佇列）
+room_members: dict[str, set[str]] = {}
+# 斷線保留中的座位：token -> 釋放座位的計時器
+pending_release: dict[str, asyncio.TimerHandle] = {}
+
+# 預寫日誌（以 --data-dir 啟用；未啟用時伺服器重啟即遺失所有牌桌）
+wal: WriteAheadLog | None = None
+# 叢集節點（以 --cluster 啟用；未啟用時所有牌桌都在這個行程）
+cluster: ClusterNode | None = None
+
+# 所有外送訊息都經過每條連線的有界佇列；進站事件受權杖桶限速
+router = OutboundRouter(sio)
+limiter = RateLimiter()
+limiter.on_abuse = router.kick
+
+# 觀戰（watch_table）：事件延遲後送出，每個觀眾群組只編碼一次
+spectators = SpectatorHub(router, SPECTATOR_DELAY)
+
+# 伺服器指標（GET /metrics，只接受本機連線）
+metrics = Metrics()
+metrics.gauge('connected_players', lambda: connected_players)
+metrics.gauge('active_tables', lambda: len(tables))
+metrics.gauge('live_hands', lambda: len(live_hands))
+metrics.gauge('outbound_queue_depth', router.depth)
+metrics.counter('outbound_dropped_total', lambda: router.dropped)
+metrics.counter('slow_consumers_total', lambda: router.slow_consumers + router.overflows)
+metrics.counter('outbound_send_errors_total', lambda: router.send_errors)
+metrics.counter('rate_limited_total', lambda: limiter.rejected)
+spectators.register_metrics(metrics)
+
+# 手牌分析 HTTP 服務（POST /analyze），計算交給行程池
+analysis = AnalysisService()
+analysis.attach(app)
+analysis.register_metrics(metrics)
+
+# 是否印出每一手打牌（壓力測試時以 --quiet 關閉）
+verbose = True
+
 @sio.event
-async def connect(sid, environ):
+@metrics.timed
+async def connect(sid, environ, auth=None):
     global connected_players
     connected_players += 1
-    print(f"[伺服器] 玩家 {sid} 已連線！目前總人數：{connected_players}")
+    if verbose:
+        print(f"[伺服器] 玩家 {sid} 已連線！目前總人數：{connected_players}")
     # 歡迎新玩家
-    await sio.emit('server_message', {'msg': f'歡迎加入麻將大廳！你的 ID 是 {sid}'}, to=sid)
+    router.open(sid)
+    router.send(sid, 'server_message', {'msg': f'歡迎加入麻將大廳！你的 ID 是 {sid}'})
 
 @sio.event
-async def disconnect(sid):
+@metrics.timed
+async def disconnect(sid, reason=None):
     global connected_players
     connected_players -= 1
-    print(f"[伺服器] 玩家 {sid} 斷線了。目前總人數：{connected_players}")
+    router.close(sid)
+    limiter.forget(sid)
+    spectators.unwatch(sid)
+    if sid in seat_of:
+        table_id, seat = seat_of.pop(sid)
+        room_members[table_id].discard(sid)
+        if not room_members[table_id]:
+            del room_members[table_id]
+        token = tables[table_id].seats[seat]
+        if _sid_at(table_id, seat) is not None:
+            pass    # 已經有別的連線以同一個 token 坐回這個座位
+        elif token == sid:
+            _release_seat(table_id, seat, token)
+        else:
+            # 有 token 的玩家保留座位一段時間，等待重連
+            loop = asyncio.get_running_loop()
+            pending_release[token] = loop.call_later(
+                SEAT_GRACE, _release_seat, table_id, seat, token)
+    if verbose:
+        print(f"[伺服器] 玩家 {sid} 斷線了。目前總人數：{connected_players}")
+
+
+def _log(record: dict):
+    if wal is not None:
+        wal.append(record)
+
+
+# 牌桌代號與 token 的長度上限（兩者都會寫進 WAL 與快照）
+MAX_NAME_LEN = 64
+
+
+def _name(data: dict, key: str, default: str | None = None) -> str | None:
+    """取出字串參數；沒有帶時回傳 default，不是非空字串或太長時回傳 None。"""
+    value = data.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, str) or not 0 < len(value) <= MAX_NAME_LEN:
+        return None
+    return value
+
+
+def _release_seat(table_id: str, seat: int, token: str):
+    pending_release.pop(token, None)
+    table = tables.get(table_id)
+    if table is None or table.seats[seat] != token:
+        return
+    table.seats[seat] = None
+    _log({'t': table_id, 'op': 'seat', 'seat': seat, 'token': None})
+    if not any(table.seats):
+        _drop_table(table_id)
+        if cluster is not None:
+            asyncio.ensure_future(cluster.release(table_id))
+
+
+def _drop_table(table_id: str):
+    del tables[table_id]
+    for sid in room_members.pop(table_id, ()):
+        seat_of.pop(sid, None)
+    spectators.forget(table_id)
+    hand = live_hands.pop(table_id, None)
+    if hand is not None:
+        hand.task.cancel()
+
+
+def _hold_seats(table: Table):
+    """所有座位先視為斷線：給每個座位一段重連時間（當機復原、接手別的節點的牌桌）。"""
+    loop = asyncio.get_running_loop()
+    for seat, token in enumerate(table.seats):
+        if token is not None:
+            pending_release[token] = loop.call_later(
+                SEAT_GRACE, _release_seat, table.table_id, seat, token)
+
+
+async def _redirect(table_id: str, create: bool = True) -> dict | None:
+    """
+    叢集模式下 table_id 由別的節點擁有時，回傳要客戶端改連的 {'redirect': 網址}。
+    create 時沒有人擁有的牌桌由這個節點申請；申請逾時或 broker 斷線時回傳 {'error': ...}。
+    """
+    if cluster is None or table_id in tables:
+        return None
+    try:
+        owner = await cluster.claim(table_id) if create else cluster.owner(table_id)
+    except (asyncio.TimeoutError, ConnectionError):
+        # broker 沒有回應或斷線：不能確定別的節點沒有同一張牌桌，先不入座
+        return {'table_id': table_id, 'seat': -1, 'error': '叢集目錄沒有回應，請稍後再試'}
+    if owner is None or owner == cluster.node_id:
+        return None
+    return {'table_id': table_id, 'seat': -1, 'redirect': cluster.url_of(owner)}
+
+
+async def _take_seat(sid: str, table: Table, seat: int):
+    token = table.seats[seat]
+    timer = pending_release.pop(token, None)
+    if timer is not None:
+        timer.cancel()
+    # 重連時舊連線可能還沒被判定斷線：把座位從舊 sid 拿走，
+    # 之後舊 sid 斷線不會釋放座位，題目與廣播也不會送到舊連線
+    stale = _sid_at(table.table_id, seat)
+    if stale is not None and stale != sid:
+        del seat_of[stale]
+        room_members[table.table_id].discard(stale)
+        await sio.leave_room(stale, table.table_id)
+    seat_of[sid] = (table.table_id, seat)
+    room_members.setdefault(table.table_id, set()).add(sid)
+    await sio.enter_room(sid, table.table_id)
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def join_table(sid, data):
+    """
+    玩家入座。data 可帶 token（客戶端自行產生的識別碼），斷線重連時用來認回座位。
+    回傳 {'table_id', 'seat', 'snapshot'}；牌桌已滿時 seat 為 -1。參數不合法時回傳 {'error': ...}。
+    """
+    if not isinstance(data, dict):
+        return {'error': '參數必須是物件'}
+    table_id = _name(data, 'table_id', 'lobby')
+    token = _name(data, 'token', sid)
+    if table_id is None or token is None:
+        return {'error': f'牌桌代號與 token 必須是 1–{MAX_NAME_LEN} 字的字串'}
+    if sid in seat_of:
+        table_id, seat = seat_of[sid]
+        return {'table_id': table_id, 'seat': seat, 'snapshot': tables[table_id].snapshot()}
+    if moved := await _redirect(table_id):
+        return moved
+
+    # 真的入座才建立牌桌：被拒絕的請求不留下空桌
+    table = tables.get(table_id) or Table(table_id)
+    if token in table.seats:
+        seat = table.seats.index(token)
+    elif None in table.seats:
+        seat = table.seats.index(None)
+        table.seats[seat] = token
+        tables[table_id] = table
+        _log({'t': table_id, 'op': 'seat', 'seat': seat, 'token': token})
+    else:
+        return {'table_id': table_id, 'seat': -1}
+
+    await _take_seat(sid, table, seat)
+    return {'table_id': table_id, 'seat': seat, 'snapshot': table.snapshot()}
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def resync(sid, data):
+    """
+    斷線重連後補齊狀態。data: {'table_id', 'token', 'last_seq'}。
+    還在保留範圍內就回傳漏掉的事件 {'events': [...]}，否則回傳完整快照 {'snapshot': {...}}。
+    牌桌在叢集中的別的節點時回傳 {'seat': -1, 'redirect': 網址}；參數不合法時回傳 {'error': ...}。
+    """
+    if not isinstance(data, dict):
+        return {'error': '參數必須是物件'}
+    table_id = _name(data, 'table_id')
+    token = _name(data, 'token')
+    if table_id is None or token is None:
+        return {'error': f'牌桌代號與 token 必須是 1–{MAX_NAME_LEN} 字的字串'}
+    if moved := await _redirect(table_id, create=False):
+        return moved
+    table = tables.get(table_id)
+    if table is None or token not in table.seats:
+        return {'seat': -1}
+
+    seat = table.seats.index(token)
+    await _take_seat(sid, table, seat)
+    # 斷線時正輪到自己決策：重送題目
+    hand = live_hands.get(table.table_id)
+    if hand is not None and hand.agents[seat].prompt is not None:
+        router.send(sid, 'decision', hand.agents[seat].prompt)
+
+    last_seq = data.get('last_seq')
+    if isinstance(last_seq, bool) or not isinstance(last_seq, int) or last_seq < 0:
+        last_seq = 0    # 序號不明：從頭補（多半會改回傳快照）
+    events = table.events_since(last_seq)
+    if events is None:
+        return {'seat': seat, 'snapshot': table.snapshot()}
+    return {'seat': seat, 'events': events}
 
 @sio.event
+@metrics.timed
+@limiter.limited
 async def play_tile(sid, data):
-    """當收到玩家打牌的事件時"""
+    """
+    當收到玩家打牌的事件時。已入座時回傳帶序號的事件作為 ack。
+    tile 必須是可打出的牌的 code；牌局進行中（start_hand）的牌桌由流程決定誰打牌，
+    要以 'answer' 回覆決策，這裡回傳 {'error': ...}。
+    """
+    if not isinstance(data, dict):
+        return {'error': '參數必須是物件'}
     tile = data.get('tile')
-    print(f"[伺服器] 收到玩家 {sid} 打出了：{tile}")
-    
-    # 廣播給「除了打牌者以外」的所有人
-    await sio.emit('player_discarded', {
+    # 事件會寫進 WAL、快照並廣播給同桌與觀眾，不合法的牌在這裡就擋掉
+    if not isinstance(tile, int) or tile not in TILE_INDEX:
+        return {'error': f'不合法的牌：{tile!r}'}
+    if sid in seat_of and seat_of[sid][0] in live_hands:
+        return {'error': '牌局進行中，請回覆伺服器的決策（answer）'}
+    if verbose:
+        print(f"[伺服器] 收到玩家 {sid} 打出了：{tile}")
+
+    payload = {
         'player_id': sid,
-        'tile': tile
-    }, skip_sid=sid)
+        'tile': tile,
+    }
+    # action_id 原樣回傳，讓客戶端可以量測「打牌 → 收到廣播」的延遲
+    if 'action_id' in data:
+        payload['action_id'] = data['action_id']
+
+    # 已入座：記錄到牌桌並只廣播給同桌的其他人；否則沿用大廳廣播
+    if sid in seat_of:
+        table_id, seat = seat_of[sid]
+        payload['type'] = 'discard'
+        payload['seat'] = seat
+        event = tables[table_id].apply(payload)
+        # 只放進 WAL 緩衝區；fsync 由背景寫入器整批完成，不擋廣播
+        _log({'t': table_id, 'op': 'event', 'event': event})
+        _broadcast(table_id, 'player_discarded', event, skip_sid=sid)
+        return event
+    else:
+        # 廣播給「除了打牌者以外」的所有人
+        router.broadcast(list(router.outboxes), 'player_discarded', payload, skip_sid=sid)
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def watch_table(sid, data=None):
+    """
+    觀戰。data: {'table_id', 'seat'（選填，跟看哪個座位的暗手）}。
+    之後以 'player_discarded' / 'table_event' 收到延遲 --spectator-delay 秒的事件；
+    其他座位的暗手只有張數。回傳 {'table_id', 'perspective', 'delay', 'seq'}。
+    跟看別人的座位需要 --spectator-delay 至少 FOLLOW_MIN_DELAY 秒，同桌的玩家則不能跟看別人。
+    """
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return {'error': '參數必須是物件'}
+    table_id = _name(data, 'table_id', 'lobby')
+    if table_id is None:
+        return {'error': f'牌桌代號必須是 1–{MAX_NAME_LEN} 字的字串'}
+    seat = data.get('seat')
+    if seat is None:
+        perspective = PUBLIC
+    elif isinstance(seat, bool) or not isinstance(seat, int) or not PUBLIC <= seat < 4:
+        return {'error': '座位必須是 0–3'}
+    else:
+        perspective = seat
+    if moved := await _redirect(table_id, create=False):
+        return moved
+    if perspective != PUBLIC and seat_of.get(sid) != (table_id, perspective):
+        # 同桌的玩家不能看別人的暗手
+        if seat_of.get(sid, (None,))[0] == table_id:
+            return {'error': '不能跟看同桌其他座位'}
+        # 沒入座的連線（也可能是同桌玩家的另一條連線）只有延遲夠長時才能跟看
+        if spectators.delay < FOLLOW_MIN_DELAY:
+            return {'error': f'觀戰延遲不到 {FOLLOW_MIN_DELAY:g} 秒，只能看公開資訊'}
+    return spectators.watch(sid, table_id, perspective)
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def unwatch_table(sid, data=None):
+    spectators.unwatch(sid)
+    return {'ok': True}
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def lobby(sid, data=None):
+    """大廳：所有牌桌與入座人數（叢集模式下包括其他節點的牌桌與其網址）。"""
+    if cluster is not None:
+        return {'tables': cluster.lobby()}
+    return {'tables': {table_id: {'seated': sum(1 for token in t.seats if token is not None)}
+                       for table_id, t in tables.items()}}
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def start_hand(sid, data=None):
+    """
+    入座的玩家開始一局（data 可帶 dealer，0–3，省略為 0）。伺服器發牌並驅動流程：
+    輪到入座的玩家時送 'decision'（題目見 mahjong.aioflow.describe），以 'answer' 回覆；
+    打牌廣播為 'player_discarded'，其他動作與結果廣播為 'table_event'。
+    """
+    if sid not in seat_of:
+        return {'error': '尚未入座'}
+    if data is not None and not isinstance(data, dict):
+        return {'error': '參數必須是物件'}
+    dealer = (data or {}).get('dealer')
+    if dealer is None:
+        dealer = 0
+    elif isinstance(dealer, bool) or not isinstance(dealer, int) or not 0 <= dealer <= 3:
+        return {'error': f'莊家必須是 0–3：{dealer!r}'}
+    table_id, _ = seat_of[sid]
+    if table_id in live_hands:
+        return {'running': True}
+    hand = live_hands[table_id] = LiveHand(tables[table_id])
+    hand.task = asyncio.create_task(hand.run(dealer, TURN_TIMEOUT))
+    return {'running': True}
+
+@sio.event
+@metrics.timed
+@limiter.limited
+async def answer(sid, data):
+    """回覆 'decision'：data {'ticket', 'value'}（value 的編碼見 mahjong.flow.encode_answer）。"""
+    if sid not in seat_of or not isinstance(data, dict):
+        return {'ok': False}
+    table_id, seat = seat_of[sid]
+    hand = live_hands.get(table_id)
+    ok = hand is not None and hand.agents[seat].submit(data.get('ticket'), data.get('value'))
+    return {'ok': ok}
+
+# ── 指標 ─────────────────────────────────────────────
+
+async def metrics_handler(request):
+    """GET /metrics：預設 Prometheus 文字格式，?format=json 回傳 JSON。"""
+    if request.remote not in ('127.0.0.1', '::1'):
+        raise web.HTTPForbidden(text="metrics 只開放本機存取")
+    if request.query.get('format') == 'json':
+        return web.json_response(metrics.to_dict())
+    return web.Response(text=metrics.to_prometheus(), content_type='text/plain')
+
+app.router.add_get('/metrics', metrics_handler)
+
+
+async def _start_metrics(app):
+    metrics.start_loop_monitor()
+
+
+async def _stop_metrics(app):
+    await metrics.stop_loop_monitor()
+
+app.on_startup.append(_start_metrics)
+app.on_cleanup.append(_stop_metrics)
+
+# ── 當機復原 ─────────────────────────────────────────
+
+def _restore_tables(state: dict | None, records: list[dict]):
+    """由 WAL 快照 + 後續記錄重建所有牌桌。"""
+    tables.clear()
+    for table_id, table_state in (state or {}).items():
+        tables[table_id] = Table.load(table_id, table_state)
+
+    for record in records:
+        if record['op'] == 'handoff':
+            tables.pop(record['t'], None)
+            continue
+        if record['op'] == 'adopt':
+            tables[record['t']] = Table.load(record['t'], record['state'])
+            continue
+        table = tables.setdefault(record['t'], Table(record['t']))
+        if record['op'] == 'event':
+            table.replay(record['event'])
+        elif record['op'] == 'seat':
+            table.seats[record['seat']] = record['token']
+            # 與 _release_seat 相同：最後一人離座時牌桌即解散
+            if not any(table.seats):
+                del tables[record['t']]
+
+
+async def _start_wal(app):
+    state, records = wal.recover()
+    _restore_tables(state, records)
+
+    # 復原後所有人都處於斷線狀態：給每個座位一段重連時間
+    for table in tables.values():
+        _hold_seats(table)
+    if tables:
+        print(f"[伺服器] 已從 {wal.directory} 復原 {len(tables)} 張牌桌")
+
+    await wal.start(lambda: {table_id: t.dump() for table_id, t in tables.items()})
+
+
+async def _close_wal(app):
+    await wal.close()
+
+# ── 叢集 ─────────────────────────────────────────────
+
+def _seated_tables() -> dict[str, int]:
+    return {table_id: sum(1 for token in t.seats if token is not None) for table_id, t in tables.items()}
+
+
+def _adopt_table(table_id: str, state: dict):
+    """別的節點關閉前把牌桌交給這裡：載入狀態，等玩家以 token resync 回來。"""
+    table = tables[table_id] = Table.load(table_id, state)
+    _log({'t': table_id, 'op': 'adopt', 'state': table.dump()})
+    _hold_seats(table)
+    if verbose:
+        print(f"[伺服器] 接手牌桌 {table_id}")
+
+
+def _handoff_table(table_id: str) -> dict:
+    return tables[table_id].dump()
+
+
+def _notify_moved(table_id: str, url: str):
+    """牌桌已交給 url 的節點：通知桌上玩家與觀眾改連過去，本地不再保留。"""
+    router.broadcast(room_members.get(table_id, set()) | spectators.audience_of(table_id),
+                     'redirect', {'table_id': table_id, 'url': url})
+    _log({'t': table_id, 'op': 'handoff'})
+    for token in tables[table_id].seats:
+        timer = pending_release.pop(token, None)
+        if timer is not None:
+            timer.cancel()
+    _drop_table(table_id)
+
+
+async def _start_cluster(broker_url: str, node_id: str, public_url: str, app):
+    global cluster
+    broker = await connect_broker(broker_url)
+    cluster = ClusterNode(broker, node_id, public_url, local_tables=_seated_tables, on_adopt=_adopt_table)
+    cluster.register_metrics(metrics)
+    await cluster.start()
+    # 復原或先前建立的牌桌：宣告擁有權（已被別的節點擁有的就不再服務）
+    for table_id in list(tables):
+        if await cluster.claim(table_id) != cluster.node_id:
+            print(f"[伺服器] 牌桌 {table_id} 已由 {cluster.owner(table_id)} 擁有，略過")
+            _drop_table(table_id)
+    print(f"[伺服器] 叢集節點 {cluster.node_id}：已知 {len(cluster.nodes)} 個節點、{len(cluster.owners)} 張牌桌")
+
+
+async def _stop_cluster(app):
+    moved = await cluster.stop(handoff=_handoff_table, notify=_notify_moved)
+    if moved:
+        print(f"[伺服器] 已交接 {len(moved)} 張牌桌")
+        await asyncio.sleep(0.2)    # 讓 redirect 送出去
+    await cluster.broker.close()
+
 
 if __name__ == '__main__':
-    print("啟動麻將伺服器於 http://localhost:5001 ...")
-    web.run_app(app, port=5001)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="麻將 Socket.IO 伺服器")
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--quiet', action='store_true', help="不印出每位玩家的連線與打牌訊息")
+    parser.add_argument('--data-dir', help="WAL 與快照的存放目錄；指定後重啟可復原所有牌桌")
+    parser.add_argument('--commit-interval', type=float, default=0.02, help="WAL 批次 fsync 的間隔（秒）")
+    parser.add_argument('--checkpoint-every', type=int, default=5000, help="每幾筆記錄做一次快照")
+    parser.add_argument('--outbox-size', type=int, default=256, help="每條連線最多積壓幾則外送訊息")
+    parser.add_argument('--overflow', choices=[DROP_OLDEST, DISCONNECT], default=DROP_OLDEST,
+                        help="外送佇列滿時丟最舊訊息或直接斷線")
+    parser.add_argument('--rate', type=float, default=20.0, help="每條連線每秒可送的事件數")
+    parser.add_argument('--burst', type=float, default=40.0, help="每條連線可瞬間爆發的事件數")
+    parser.add_argument('--analysis-workers', type=int, default=None, help="手牌分析的工作行程數（預設為 CPU 數）")
+    parser.add_argument('--analysis-cache', type=int, default=4096, help="手牌分析結果的 LRU 快取筆數")
+    parser.add_argument('--turn-timeout', type=float, default=TURN_TIMEOUT,
+                        help="牌局中每個決策的時限（秒），逾時由 AI 代打")
+    parser.add_argument('--spectator-delay', type=float, default=SPECTATOR_DELAY,
+                        help="觀眾看到牌桌事件的延遲（秒）")
+    parser.add_argument('--follow-min-delay', type=float, default=FOLLOW_MIN_DELAY,
+                        help="觀眾跟看座位（看得到暗手）需要的最短延遲（秒）")
+    parser.add_argument('--cluster', help="叢集模式的 broker：tcp://host:port（見 scripts/cluster.py）或 local")
+    parser.add_argument('--node-id', help="叢集中這個節點的名稱（預設為 主機名稱:port）")
+    parser.add_argument('--public-url', help="客戶端連到這個節點的網址（預設 http://localhost:port）")
+    args = parser.parse_args()
+    TURN_TIMEOUT = args.turn_timeout
+    spectators.delay = args.spectator_delay
+    FOLLOW_MIN_DELAY = args.follow_min_delay
+    verbose = not args.quiet
+    router.maxlen = args.outbox_size
+    router.policy = args.overflow
+    limiter.rate = args.rate
+    limiter.burst = args.burst
+    analysis.workers = args.analysis_workers or analysis.workers
+    analysis.cache_size = args.analysis_cache
+
+    if args.data_dir:
+        wal = WriteAheadLog(args.data_dir, args.commit_interval, args.checkpoint_every)
+        app.on_startup.append(_start_wal)
+        app.on_cleanup.append(_close_wal)
+
+    if args.cluster:
+        node_id = args.node_id or f"{socket.gethostname()}:{args.port}"
+        public_url = args.public_url or f"http://localhost:{args.port}"
+        # 在 WAL 復原之後加入叢集；關閉時先交接（連線都還在），再關 WAL
+        app.on_startup.append(functools.partial(_start_cluster, args.cluster, node_id, public_url))
+        app.on_shutdown.append(_stop_cluster)
+
+    print(f"啟動麻將伺服器於 http://localhost:{args.port} ...")
+    web.run_app(app, port=args.port)
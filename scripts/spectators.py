@@ -0,0 +1,122 @@
+"""
+spectators.py — 觀戰：每桌的觀眾、延遲播放與只序列化一次的事件
+
+觀眾以 watch_table 加入任一張牌桌，可指定跟看的座位（perspective）；
+不指定則只看公開資訊。牌桌的每則事件：
+
+  - 依觀眾群組（不跟看任何座位、跟看 0–3 號座位）各遮蔽並編碼一次成 Frame：
+    其他座位的暗手只留張數，遮蔽在編碼時做，不在每位觀眾身上重做。
+    同一群組的所有觀眾共用同一個 Frame 物件（只是各自 Outbox 中的參考），
+    所以觀眾再多，每則事件的 CPU 與記憶體也只和群組數（最多 5 個）有關。
+  - 延遲 delay 秒後才放進觀眾的 Outbox（觀眾不能即時看到牌桌，避免場外報牌）。
+    延遲中的事件每個群組只佔一個計時器，不是每位觀眾一個。
+
+事件的 'hands' 是發布當下各座位的暗手（牌的 code）；沒有附手牌的事件（例如大廳的打牌）只送公開內容。
+"""
+from __future__ import annotations
+import asyncio
+
+from backpressure import Frame, OutboundRouter
+
+PUBLIC = -1     # 不跟看任何座位
+
+
+def redact(event: dict, hands: list[list[int]] | None, perspective: int) -> dict:
+    """給觀眾的事件：只有 perspective 座位的暗手看得到內容，其他座位只留張數。"""
+    if hands is None:
+        return event
+    return {**event, 'hands': [list(h) if seat == perspective else len(h) for seat, h in enumerate(hands)]}
+
+
+class SpectatorHub:
+    """所有牌桌的觀眾與延遲播放"""
+
+    def __init__(self, router: OutboundRouter, delay: float = 0.0):
+        self.router = router
+        self.delay = delay
+        # table_id -> perspective -> 觀眾的 sid
+        self.audiences: dict[str, dict[int, set[str]]] = {}
+        # sid -> (table_id, perspective)
+        self.watching: dict[str, tuple[str, int]] = {}
+        self.last_seq: dict[str, int] = {}      # 每桌已送給觀眾的最新序號
+        self.frames_encoded = 0
+        self.frames_delivered = 0
+        self.bytes_encoded = 0
+        self.pending = 0                        # 延遲中的 Frame 數
+
+    def watch(self, sid: str, table_id: str, perspective: int = PUBLIC) -> dict:
+        """sid 開始觀看 table_id（已在看別桌則先離開）；回傳之後的事件從哪個序號接起。"""
+        self.unwatch(sid)
+        self.audiences.setdefault(table_id, {}).setdefault(perspective, set()).add(sid)
+        self.watching[sid] = (table_id, perspective)
+        return {'table_id': table_id, 'perspective': perspective, 'delay': self.delay,
+                'seq': self.last_seq.get(table_id, 0)}
+
+    def unwatch(self, sid: str):
+        entry = self.watching.pop(sid, None)
+        if entry is None:
+            return
+        table_id, perspective = entry
+        groups = self.audiences[table_id]
+        groups[perspective].discard(sid)
+        if not groups[perspective]:
+            del groups[perspective]
+        if not groups:
+            del self.audiences[table_id]
+
+    def count(self) -> int:
+        return len(self.watching)
+
+    def audience_of(self, table_id: str) -> set[str]:
+        return set().union(*self.audiences.get(table_id, {}).values())
+
+    def publish(self, table_id: str, event_name: str, event: dict, hands: list[list[int]] | None = None):
+        """牌桌發生一則事件：每個有觀眾的群組編碼一次，delay 秒後送出。"""
+        groups = self.audiences.get(table_id)
+        if not groups:
+            self.last_seq[table_id] = event.get('seq', 0)
+            return
+        if hands is None:
+            # 沒有暗手可遮蔽：所有群組共用同一個 Frame
+            frame = self._encode(event_name, event)
+            frames = [(perspective, frame) for perspective in groups]
+        else:
+            frames = [(perspective, self._encode(event_name, redact(event, hands, perspective)))
+                      for perspective in groups]
+        if self.delay > 0:
+            loop = asyncio.get_running_loop()
+            for perspective, frame in frames:
+                self.pending += 1
+                loop.call_later(self.delay, self._deliver, table_id, perspective, frame, event.get('seq'))
+        else:
+            for perspective, frame in frames:
+                self._fan_out(table_id, perspective, frame, event.get('seq'))
+
+    def forget(self, table_id: str):
+        """牌桌解散：觀眾留著（牌桌重開時繼續看），只清掉序號。"""
+        self.last_seq.pop(table_id, None)
+
+    def _encode(self, event_name: str, data: dict) -> Frame:
+        frame = self.router.frame(event_name, data)
+        self.frames_encoded += 1
+        self.bytes_encoded += frame.size
+        return frame
+
+    def _deliver(self, table_id: str, perspective: int, frame: Frame, seq: int | None):
+        self.pending -= 1
+        self._fan_out(table_id, perspective, frame, seq)
+
+    def _fan_out(self, table_id: str, perspective: int, frame: Frame, seq: int | None):
+        if seq is not None:
+            self.last_seq[table_id] = max(seq, self.last_seq.get(table_id, 0))
+        # 送給送出當下還在看的觀眾（延遲期間才加入的也收得到，離開的就不送）
+        for sid in self.audiences.get(table_id, {}).get(perspective, ()):
+            self.router.send_frame(sid, frame)
+            self.frames_delivered += 1
+
+    def register_metrics(self, metrics):
+        metrics.gauge('spectators', self.count)
+        metrics.counter('spectator_frames_encoded_total', lambda: self.frames_encoded)
+        metrics.counter('spectator_frames_delivered_total', lambda: self.frames_delivered)
+        metrics.counter('spectator_bytes_encoded_total', lambda: self.bytes_encoded)
+        metrics.gauge('spectator_frames_delayed', lambda: self.pending)
@@ -0,0 +1,245 @@
+"""
+tournament.py — AI 策略對戰，以 SPRT 提早停止
+
+每位挑戰者（--challenger，可多個）依序與基準策略（--baseline）對戰：
+
+  - 複式發牌：同一副牌（同一個 seed）打兩次，第一次挑戰者坐 0、2 號位，
+    第二次換坐 1、3 號位。牌運好壞在兩次之間互相抵銷，只留下策略的差異。
+    莊家依 seed 輪流，四個座位都會坐莊。
+  - 每副牌的結果是挑戰者兩次合計的輸贏（底 + 台數 × 每台）：
+    > 0 算贏、< 0 算輸、= 0 算和。
+  - SPRT（序貫機率比檢定）：H0 為挑戰者贏的機率（扣除和局）p = p0，
+    H1 為 p = p1；對數概似比超過上界就接受 H1（挑戰者較強），
+    低於下界就接受 H0（沒有強到 p1），不必跑滿固定局數。
+  - 牌局分批送到 ProcessPoolExecutor，結果依完成順序累加；
+    一有結論就取消還沒開始的批次。
+
+策略的寫法：
+    simple                               內建的 SimpleAI
+    cached                               打牌查表的 SimpleAI（mahjong.policy.CachedSimpleAI）
+    defensive                            參考放槍危險度的 SimpleAI（mahjong.danger.DefensiveAI）
+    mahjong.ai.SimpleAI                  任何 SimpleAI 相容類別的完整路徑
+    simple,PONG_LOSS_THRESHOLD=0.5       覆寫類別屬性（產生子類別）
+
+用法：
+    python scripts/tournament.py --challenger simple,PONG_LOSS_THRESHOLD=0.5
+    python scripts/tournament.py -c simple,PONG_LOSS_THRESHOLD=0 -c simple,PONG_LOSS_THRESHOLD=1 --workers 8
+"""
+from __future__ import annotations
+import argparse
+import ast
+import importlib
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mahjong.ai import SimpleAI
+from mahjong.flow import HandState, ai_agent, run_hand
+from mahjong.scoring import score_state
+from mahjong.session import payments
+
+STRATEGIES = {
+    "simple": "mahjong.ai.SimpleAI",
+    "cached": "mahjong.policy.CachedSimpleAI",
+    "defensive": "mahjong.danger.DefensiveAI",
+}
+
+# 複式發牌的兩種座位安排：True 表示該座位由挑戰者操作
+SEATINGS = ((True, False, True, False), (False, True, False, True))
+
+
+def load_strategy(spec: str) -> type[SimpleAI]:
+    """把策略字串（名稱或 module.Class，後接 ,KEY=VALUE 覆寫）轉成類別。"""
+    name, *overrides = spec.split(",")
+    path = STRATEGIES.get(name, name)
+    module_name, _, class_name = path.rpartition(".")
+    if not module_name:
+        raise ValueError(f"未知的策略：{name}（可用：{', '.join(STRATEGIES)}，或 module.Class）")
+    cls = getattr(importlib.import_module(module_name), class_name)
+
+    if overrides:
+        attrs = {}
+        for item in overrides:
+            key, _, value = item.partition("=")
+            if not hasattr(cls, key):
+                raise ValueError(f"{class_name} 沒有屬性 {key}")
+            attrs[key] = ast.literal_eval(value)
+        cls = type(f"{class_name}[{','.join(overrides)}]", (cls,), attrs)
+    return cls
+
+
+# ── 對戰（在工作行程中執行）──────────────────────────
+
+def play_deals(baseline: str, challenger: str, seeds: list[int], base: int, per_tai: int) -> list[int]:
+    """每個 seed 以兩種座位各打一局，回傳挑戰者在每副牌的合計輸贏。"""
+    agents = {False: ai_agent(load_strategy(baseline)), True: ai_agent(load_strategy(challenger))}
+    state = HandState()   # 整批共用，每局 reset()
+    results = []
+    for seed in seeds:
+        net = 0
+        for seating in SEATINGS:
+            state.reset(dealer=seed % 4)
+            state.deal(random.Random(seed))
+            run_hand(state, [agents[is_challenger] for is_challenger in seating])
+            result = score_state(state)
+            if result is None:
+                continue
+            deltas = payments(state.winner, state.discarder, result.tai,
+                              dealer=state.dealer, base=base, per_tai=per_tai)
+            net += sum(d for d, is_challenger in zip(deltas, seating) if is_challenger)
+        results.append(net)
+    return results
+
+
+# ── 統計 ──────────────────────────────────────────────
+
+class SPRT:
+    """伯努利 SPRT（和局不計）：H0 p = p0 對 H1 p = p1"""
+
+    def __init__(self, p0: float = 0.5, p1: float = 0.55, alpha: float = 0.05, beta: float = 0.05):
+        self.p0 = p0
+        self.p1 = p1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+
+    def add(self, net: int):
+        if net > 0:
+            self.wins += 1
+        elif net < 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def llr(self) -> float:
+        return (self.wins * math.log(self.p1 / self.p0)
+                + self.losses * math.log((1 - self.p1) / (1 - self.p0)))
+
+    def decision(self) -> str | None:
+        """'H1'（挑戰者較強）、'H0'（沒有強到 p1）或 None（還要繼續）。"""
+        llr = self.llr
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+
+class MatchStats:
+    """一場對戰的累計結果"""
+
+    def __init__(self, sprt: SPRT):
+        self.sprt = sprt
+        self.deals = 0
+        self.total = 0
+        self.total_sq = 0
+
+    def add(self, net: int):
+        self.sprt.add(net)
+        self.deals += 1
+        self.total += net
+        self.total_sq += net * net
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.deals if self.deals else 0.0
+
+    @property
+    def stderr(self) -> float:
+        if self.deals < 2:
+            return 0.0
+        var = (self.total_sq - self.deals * self.mean ** 2) / (self.deals - 1)
+        return math.sqrt(max(var, 0.0) / self.deals)
+
+
+def run_match(pool: ProcessPoolExecutor, baseline: str, challenger: str, args) -> MatchStats:
+    stats = MatchStats(SPRT(args.p0, args.p1, args.alpha, args.beta))
+    next_seed = args.seed
+    pending = set()
+
+    def submit():
+        nonlocal next_seed
+        seeds = list(range(next_seed, next_seed + args.batch))
+        next_seed += args.batch
+        pending.add(pool.submit(play_deals, baseline, challenger, seeds, args.base, args.per_tai))
+
+    # 每個工作行程保持兩批在排隊，結論出來時浪費的計算有限
+    for _ in range(args.workers * 2):
+        submit()
+
+    last_report = time.perf_counter()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            for net in future.result():
+                stats.add(net)
+
+        if stats.sprt.decision() or stats.deals >= args.max_deals:
+            break
+        if next_seed - args.seed < args.max_deals:
+            for _ in done:
+                submit()
+
+        now = time.perf_counter()
+        if now - last_report >= args.report_interval:
+            last_report = now
+            _report(stats, prefix="  ")
+
+    for future in pending:
+        future.cancel()
+    return stats
+
+
+def _report(stats: MatchStats, prefix: str = ""):
+    s = stats.sprt
+    print(f"{prefix}{stats.deals} 副  勝/和/負 {s.wins}/{s.draws}/{s.losses}  "
+          f"平均 {stats.mean:+.1f} ± {1.96 * stats.stderr:.1f}  "
+          f"LLR {s.llr:+.2f} [{s.lower:.2f}, {s.upper:.2f}]", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 策略對戰（複式發牌 + SPRT）")
+    parser.add_argument('--baseline', '-b', default='simple', help="基準策略（預設 simple）")
+    parser.add_argument('--challenger', '-c', action='append', required=True, help="挑戰者策略（可重複）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch', type=int, default=20, help="每批送給工作行程的牌數")
+    parser.add_argument('--max-deals', type=int, default=100_000, help="最多打幾副牌（每副打兩局）")
+    parser.add_argument('--seed', type=int, default=0, help="第一副牌的 seed")
+    parser.add_argument('--p0', type=float, default=0.5, help="H0：挑戰者贏的機率（扣除和局）")
+    parser.add_argument('--p1', type=float, default=0.55, help="H1：挑戰者贏的機率（扣除和局）")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--base', type=int, default=100, help="底")
+    parser.add_argument('--per-tai', type=int, default=20, help="每台")
+    parser.add_argument('--report-interval', type=float, default=5.0, help="進度輸出間隔（秒）")
+    args = parser.parse_args()
+
+    # 先在主行程檢查策略字串，錯誤不要等到工作行程才出現
+    for spec in [args.baseline, *args.challenger]:
+        load_strategy(spec)
+
+    with ProcessPoolExecutor(args.workers) as pool:
+        for challenger in args.challenger:
+            print(f"[對戰] {challenger} vs {args.baseline}")
+            t0 = time.perf_counter()
+            stats = run_match(pool, args.baseline, challenger, args)
+            elapsed = time.perf_counter() - t0
+            _report(stats, prefix="  ")
+            verdict = {
+                "H1": f"{challenger} 較強（p ≥ {args.p1}）",
+                "H0": f"{challenger} 沒有強到 p = {args.p1}",
+                None: "未達結論（已到 --max-deals）",
+            }[stats.sprt.decision()]
+            print(f"  結論：{verdict}，耗時 {elapsed:.1f}s（{2 * stats.deals / elapsed:.0f} 局/秒）")
+
+
+if __name__ == '__main__':
+    main()
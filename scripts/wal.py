@@ -0,0 +1,183 @@
+"""
+wal.py — 伺服器牌桌的預寫日誌（write-ahead log）與當機復原
+
+所有牌桌共用一條依段落（segment）切分的日誌：
+  wal-000001.log       每行一筆 JSON 記錄（依接受順序）
+  snapshot-000001.json 第 1 段（含）以前所有記錄套用後的完整狀態
+
+寫入流程：
+  - append() 只把記錄放進記憶體緩衝區並喚醒背景寫入器，不碰磁碟；
+    打牌的處理流程因此不需要等 fsync。
+  - 背景寫入器每 commit_interval 秒把緩衝區整批寫入並 fsync 一次（group commit），
+    在同一個視窗內被接受的記錄共用一次磁碟同步。
+  - 每累積 checkpoint_every 筆記錄做一次檢查點：換到新段落、寫入快照，
+    再刪除快照已涵蓋的舊段落與舊快照。
+
+復原：載入最新快照，再依序重播之後所有段落的記錄。
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import re
+from typing import Callable
+
+_SEGMENT_RE = re.compile(r"^wal-(\d+)\.log$")
+_SNAPSHOT_RE = re.compile(r"^snapshot-(\d+)\.json$")
+
+
+class WriteAheadLog:
+    def __init__(self, directory: str, commit_interval: float = 0.02, checkpoint_every: int = 5000):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.checkpoint_every = checkpoint_every
+        self._buffer: list[bytes] = []
+        self._segment = 0
+        self._file = None
+        self._since_checkpoint = 0
+        self._dump_state: Callable[[], dict] | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        os.makedirs(directory, exist_ok=True)
+
+    # ── 復原 ─────────────────────────────────────────
+
+    def recover(self) -> tuple[dict | None, list[dict]]:
+        """回傳 (最新快照狀態或 None, 快照之後的所有記錄)。需在 start() 之前呼叫。"""
+        snapshots = self._numbered(_SNAPSHOT_RE)
+        segments = self._numbered(_SEGMENT_RE)
+
+        state = None
+        base = 0
+        if snapshots:
+            base = snapshots[-1]
+            with open(self._snapshot_path(base), encoding="utf-8") as f:
+                state = json.load(f)
+
+        records: list[dict] = []
+        for n in segments:
+            if n <= base:
+                continue
+            with open(self._segment_path(n), "rb") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # 當機時寫到一半的最後一行：之後不會有完整記錄
+                        break
+
+        self._segment = max([base] + segments)
+        return state, records
+
+    # ── 寫入 ─────────────────────────────────────────
+
+    async def start(self, dump_state: Callable[[], dict]):
+        """開新段落並啟動背景寫入器。dump_state 需回傳可 JSON 化的完整狀態。"""
+        self._dump_state = dump_state
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def append(self, record: dict):
+        """接受一筆記錄。只寫入記憶體，實際落盤由背景寫入器整批處理。"""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        self._buffer.append(line.encode("utf-8") + b"\n")
+        self._since_checkpoint += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def close(self):
+        """停止寫入器並把剩下的記錄落盤。"""
+        if self._task is not None:
+            # 不能 cancel：寫入器可能正在執行緒裡 fsync（或做檢查點），
+            # 取消只會停止等待，檔案仍在被寫。改為請它做完這一輪後自行結束。
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._file is not None:
+            batch, self._buffer = self._buffer, []
+            self._commit(self._file, batch)
+            self._file.close()
+            self._file = None
+
+    async def _writer(self):
+        while not self._closing:
+            await self._wakeup.wait()
+            if not self._closing:
+                # 等一個提交視窗，讓這段時間內的記錄共用同一次 fsync
+                await asyncio.sleep(self.commit_interval)
+            self._wakeup.clear()
+
+            batch, self._buffer = self._buffer, []
+            if batch:
+                await asyncio.to_thread(self._commit, self._file, batch)
+            if self._since_checkpoint >= self.checkpoint_every:
+                await self._checkpoint()
+
+    async def _checkpoint(self):
+        # 擷取狀態、取出尚未落盤的記錄、換段落三件事在事件迴圈中同步完成，
+        # 保證快照恰好等於「舊段落全部記錄」套用後的結果。
+        state = self._dump_state()
+        tail, self._buffer = self._buffer, []
+        old_file, old_segment = self._file, self._segment
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+        self._since_checkpoint = 0
+        await asyncio.to_thread(self._finish_checkpoint, old_file, tail, old_segment, state)
+
+    def _finish_checkpoint(self, old_file, tail: list[bytes], segment: int, state: dict):
+        self._commit(old_file, tail)
+        old_file.close()
+
+        path = self._snapshot_path(segment)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._fsync_dir()
+
+        # 快照已落盤，舊段落與舊快照都可以刪了
+        for n in self._numbered(_SEGMENT_RE):
+            if n <= segment:
+                os.remove(self._segment_path(n))
+        for n in self._numbered(_SNAPSHOT_RE):
+            if n < segment:
+                os.remove(self._snapshot_path(n))
+
+    @staticmethod
+    def _commit(f, batch: list[bytes]):
+        if not batch:
+            return
+        f.write(b"".join(batch))
+        f.flush()
+        os.fsync(f.fileno())
+
+    # ── 檔案 ─────────────────────────────────────────
+
+    def _segment_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"wal-{n:06d}.log")
+
+    def _snapshot_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{n:06d}.json")
+
+    def _numbered(self, pattern: re.Pattern) -> list[int]:
+        found = []
+        for name in os.listdir(self.directory):
+            m = pattern.match(name)
+            if m:
+                found.append(int(m.group(1)))
+        return sorted(found)
+
+    def _fsync_dir(self):
+        if not hasattr(os, "O_DIRECTORY"):
+            return   # Windows 不支援對目錄 fsync
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
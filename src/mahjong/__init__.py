@@ -1,6 +1,52 @@
-from .tile import Tile
-from .deck import Deck
-from .player import Player
-from .rule_engine import RuleEngine
-from .ai import SimpleAI
-from .game import Game
+"""
+mahjong — 16 張台灣麻將
+
+核心（不依賴 curses，可在伺服器、模擬與工作行程中使用）：
+    tile, deck, player, rule_engine, ai, state, scoring, session, flow, analysis,
+    tables, policy, danger, archive, aioflow
+    env, sampler, selfplay, batch_ai（需要 numpy）
+curses 前端：
+    game, ui, advisor
+
+套件層級的名稱（Tile、Game…）在第一次存取時才載入對應模組，
+所以 `import mahjong` 不會載入 curses，只用 Tile 或 RuleEngine 也不必付出前端的成本。
+"""
+from __future__ import annotations
+from importlib import import_module
+
+# 不 import typing 也能讓型別檢查器看到下列名稱（typing 本身就要好幾毫秒）
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .tile import Tile
+    from .deck import Deck
+    from .player import Player
+    from .rule_engine import RuleEngine
+    from .ai import SimpleAI
+    from .state import GameState
+    from .game import Game
+
+# 名稱 -> 定義它的模組
+_LAZY = {
+    "Tile": ".tile",
+    "Deck": ".deck",
+    "Player": ".player",
+    "RuleEngine": ".rule_engine",
+    "SimpleAI": ".ai",
+    "GameState": ".state",
+    "Game": ".game",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value     # 之後直接從模組字典取，不再經過 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
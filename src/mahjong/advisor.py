@@ -0,0 +1,52 @@
+"""
+advisor.py — 在背景執行緒計算聽牌建議
+
+玩家摸牌後就先把「打哪張可以聽什麼」丟給背景執行緒計算，畫面不必等結果；
+結果依手牌內容（排序後的 code）快取，同一手牌（例如按 ? 切換顯示、
+補花後又回到同一組牌）不會重算。計算用 analysis.tenpai_advice（記憶化的
+分花色拆牌），結果與 RuleEngine.get_tenpai_advice 相同。
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .tile import Tile
+from .analysis import tenpai_advice
+
+Advice = dict[int, list[Tile]]
+
+
+def _compute(codes: tuple[int, ...]) -> Advice:
+    return {code: [Tile(c) for c in ting] for code, ting in tenpai_advice(list(codes)).items()}
+
+
+class TenpaiAdvisor:
+    """聽牌建議的背景計算與快取（以手牌內容為鍵）"""
+
+    def __init__(self, cache_size: int = 256):
+        self.cache_size = cache_size
+        self._futures: OrderedDict[tuple[int, ...], Future] = OrderedDict()
+        self._pool: ThreadPoolExecutor | None = None
+
+    def request(self, hand: list[Tile]) -> Future:
+        """回傳這手牌的聽牌建議 Future；已算過或正在算的直接共用。"""
+        key = tuple(sorted(t.code for t in hand))
+        future = self._futures.get(key)
+        if future is not None:
+            self._futures.move_to_end(key)
+            return future
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(1, thread_name_prefix="tenpai-advisor")
+        future = self._futures[key] = self._pool.submit(_compute, key)
+        if len(self._futures) > self.cache_size:
+            self._futures.popitem(last=False)
+        return future
+
+    # 摸牌時預先計算：語意同 request，只是不需要回傳值
+    prefetch = request
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._futures.clear()
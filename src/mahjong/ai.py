@@ -4,7 +4,9 @@ from .tile import Tile
 
 
 class SimpleAI:
-    """簡易 AI 玩家決策邏輯"""
+    """簡易 AI 玩家決策邏輯（子類別可覆寫參數或方法，作為不同策略互相比較）"""
+
+    PONG_LOSS_THRESHOLD = 0.25   # 碰數牌時可接受的順子潛力損失比例
 
     @staticmethod
     def _sequence_potential(hand: list[Tile]) -> int:
@@ -48,8 +50,8 @@ class SimpleAI:
 
         return min(hand, key=keep_value)
 
-    @staticmethod
-    def choose_pong(hand: list[Tile], tile: Tile) -> bool:
+    @classmethod
+    def choose_pong(cls, hand: list[Tile], tile: Tile) -> bool:
         """判斷是否應該碰牌"""
         suit = tile.get_suit()
 
@@ -58,7 +60,7 @@ class SimpleAI:
             return True
 
         # 數牌：模擬移除 2 張後，順子潛力下降多少
-        pot_before = SimpleAI._sequence_potential(hand)
+        pot_before = cls._sequence_potential(hand)
 
         hand_after = list(hand)
         removed = 0
@@ -67,15 +69,16 @@ class SimpleAI:
                 hand_after.pop(i)
                 removed += 1
 
-        pot_after = SimpleAI._sequence_potential(hand_after)
+        pot_after = cls._sequence_potential(hand_after)
 
-        # 只有潛力下降不超過 25% 才碰
+        # 只有潛力下降不超過 PONG_LOSS_THRESHOLD（預設 25%）才碰
         if pot_before == 0:
             return True
-        return (pot_before - pot_after) / pot_before <= 0.25
+        return (pot_before - pot_after) / pot_before <= cls.PONG_LOSS_THRESHOLD
 
-    @staticmethod
+    @classmethod
     def choose_reaction(
+        cls,
         hand: list[Tile],
         tile: Tile,
         actions: list[tuple[str, object]]
@@ -91,11 +94,11 @@ class SimpleAI:
             return ("胡", None)
 
         if "槓" in action_map:
-            if SimpleAI.choose_pong(hand, tile):
+            if cls.choose_pong(hand, tile):
                 return ("槓", None)
 
         if "碰" in action_map:
-            if SimpleAI.choose_pong(hand, tile):
+            if cls.choose_pong(hand, tile):
                 return ("碰", None)
 
         chow_opts = [(a, e) for a, e in actions if a == "吃"]
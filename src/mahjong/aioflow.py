@@ -0,0 +1,178 @@
+"""
+aioflow.py — 以 asyncio 驅動的牌局流程
+
+flow.play_hand 每個決策點 yield 一個 Decision；run_hand_async 以 await 等答案，
+每個座位是一個 AsyncAgent（async 函式 (state, decision) -> 答案）。AI、本機 curses 玩家
+（Game.run_async）與遠端連線（RemoteAgent）用同一個介面：
+
+  - 每個決策有時限（timeouts：秒數，或依決策種類的 dict；None 表示不限時）。
+    逾時、agent 丟出例外或答案不合法時由 fallback（預設 SimpleAI）代答，牌局繼續。
+  - 等人類或網路時只是 await，同一個事件迴圈上的其他牌桌照常進行，
+    多桌以 asyncio.gather / TaskGroup 同時跑即可。
+  - observer（async 函式）在每個答案送進流程前收到 (state, decision, answer, substituted)，
+    substituted 為代答的原因（"timeout" / "error" / "illegal"）或 None；用來更新畫面、廣播或記錄。
+
+遠端玩家的題目與答案都是可以直接轉成 JSON 的值：RemoteAgent 以 send(prompt) 送出題目，
+收到回覆時呼叫 submit(ticket, value)，value 的編碼見 flow.encode_answer。
+"""
+from __future__ import annotations
+import asyncio
+import inspect
+import random
+from typing import Awaitable, Callable
+
+from .ai import SimpleAI
+from .flow import (Agent, Decision, HandState, ai_agent, decode_answer, is_legal, play_hand,
+                   simple_ai_agent)
+from .session import Session
+
+AsyncAgent = Callable[[HandState, Decision], Awaitable[object]]
+Observer = Callable[[HandState, Decision, object, "str | None"], Awaitable[None]]
+Timeouts = "float | dict[str, float | None] | None"
+
+TIMEOUT = "timeout"
+ERROR = "error"
+ILLEGAL = "illegal"
+
+
+def from_sync(agent: Agent) -> AsyncAgent:
+    """把同步的 Agent（例如 flow.ai_agent）包成 AsyncAgent；在事件迴圈裡直接執行。"""
+    async def wrapped(state: HandState, decision: Decision) -> object:
+        return agent(state, decision)
+    return wrapped
+
+
+def ai(strategy: type[SimpleAI] = SimpleAI) -> AsyncAgent:
+    return from_sync(ai_agent(strategy))
+
+
+def _limit(timeouts, kind: str) -> float | None:
+    if isinstance(timeouts, dict):
+        return timeouts.get(kind)
+    return timeouts
+
+
+async def ask(agent: AsyncAgent, state: HandState, decision: Decision,
+              timeout: float | None = None, fallback: Agent = simple_ai_agent) -> tuple[object, str | None]:
+    """向 agent 要一個答案；回傳 (答案, 代答原因或 None)。"""
+    try:
+        answer = await asyncio.wait_for(agent(state, decision), timeout)
+    except asyncio.TimeoutError:
+        reason = TIMEOUT
+    except Exception:
+        reason = ERROR
+    else:
+        if is_legal(decision, answer):
+            return answer, None
+        reason = ILLEGAL
+    return fallback(state, decision), reason
+
+
+async def run_hand_async(
+    state: HandState,
+    agents: list[AsyncAgent] | None = None,
+    timeouts: Timeouts = None,
+    fallback: Agent = simple_ai_agent,
+    observer: Observer | None = None,
+) -> HandState:
+    """以 AsyncAgent 跑完一局（需先 deal()）；結果寫在 state。"""
+    agents = agents or [ai()] * 4
+    flow = play_hand(state)
+    try:
+        decision = next(flow)
+        while True:
+            answer, substituted = await ask(agents[decision.player_idx], state, decision,
+                                            _limit(timeouts, decision.kind), fallback)
+            if observer is not None:
+                await observer(state, decision, answer, substituted)
+            decision = flow.send(answer)
+    except StopIteration:
+        pass
+    return state
+
+
+async def play_session_async(
+    session: Session | None = None,
+    agents: list[AsyncAgent] | None = None,
+    rng: random.Random | None = None,
+    max_hands: int | None = None,
+    **kwargs,
+) -> Session:
+    """session.play_session 的 asyncio 版本；kwargs 交給 run_hand_async。"""
+    session = session or Session()
+    state = HandState()
+    played = 0
+    while not session.finished and (max_hands is None or played < max_hands):
+        state.reset(session.dealer, session.prevailing_wind)
+        state.deal(rng)
+        await run_hand_async(state, agents, **kwargs)
+        session.record_state(state)
+        played += 1
+    return session
+
+
+# ── 遠端玩家 ──────────────────────────────────────────
+
+def _is_int(value: object) -> bool:
+    """JSON 傳來的整數（True/False 與浮點數不算）。"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def describe(state: HandState, decision: Decision, ticket: int = 0) -> dict:
+    """給遠端玩家的題目（可以直接轉成 JSON；只含該座位看得到的資訊）。"""
+    if decision.kind == Decision.REACTION:
+        options = [[action, list(extra) if extra else None] for action, extra in decision.options]
+    elif decision.kind == Decision.CONCEALED_KONG:
+        options = [t.code for t in decision.options]
+    else:
+        options = []
+    return {
+        "ticket": ticket,
+        "kind": decision.kind,
+        "seat": decision.player_idx,
+        "tile": decision.tile.code if decision.tile is not None else None,
+        "options": options,
+        "hand": [t.code for t in state.players[decision.player_idx].hand_tiles],
+        "wall": state.deck.get_remaining_tiles_count(),
+    }
+
+
+class RemoteAgent:
+    """
+    遠端座位：輪到它時以 send(題目) 送出 describe() 的結果，等 submit(ticket, value) 收到答案。
+    send 可以是一般函式或 async 函式。答案不合法時 submit 回傳 False 並繼續等（直到逾時）。
+    """
+
+    def __init__(self, send: Callable[[dict], object]):
+        self.send = send
+        self._ticket = 0
+        self._pending: tuple[Decision, asyncio.Future] | None = None
+        self.prompt: dict | None = None      # 等待中的題目（斷線重連時重送）
+
+    async def __call__(self, state: HandState, decision: Decision) -> object:
+        self._ticket += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending = (decision, future)
+        self.prompt = describe(state, decision, self._ticket)
+        try:
+            sent = self.send(self.prompt)
+            if inspect.isawaitable(sent):
+                await sent
+            return await future
+        finally:
+            self._pending = None
+            self.prompt = None
+
+    def submit(self, ticket: int, value: int) -> bool:
+        """收到遠端的答案；ticket 不是目前的題目、value 不是整數或答案不合法時回傳 False。"""
+        if self._pending is None or not _is_int(ticket) or ticket != self._ticket or not _is_int(value):
+            return False
+        decision, future = self._pending
+        try:
+            answer = decode_answer(decision, value)
+        except ValueError:
+            return False
+        if future.done() or not is_legal(decision, answer):
+            return False
+        future.set_result(answer)
+        return True
@@ -0,0 +1,288 @@
+"""
+analysis.py — 不依賴 curses 的手牌分析
+
+把一行文字（以空白或逗號分隔的牌 code）解析成手牌，回答：
+  - 3n+2 張：是否胡牌、打哪張可以聽什麼（與 RuleEngine.get_tenpai_advice 相同）
+  - 3n+1 張：聽哪些牌
+  - 向聽數（shanten）：還差幾張才聽牌，聽牌為 0、胡牌為 -1
+  - 胡牌的台數（score）
+
+evaluate() 接受 normalize_request() 整理過的查詢（只含 int / str / list，可直接
+pickle 給工作行程），供 HTTP 分析服務批次呼叫。
+
+判斷都用 scoring 的記憶化分花色拆牌（is_complete / waits，有查表檔時查表），
+結果與 RuleEngine 相同但快好幾倍；所有輸入輸出都是 code（int），方便序列化成 JSON、
+在行程之間傳遞。
+"""
+from __future__ import annotations
+import re
+from collections import Counter
+from functools import lru_cache
+
+from .tile import Tile, TILE_INDEX
+from .player import Player
+from .scoring import is_complete, waits, score_hand, _suit_counts
+from .tables import get_tables
+
+MAX_TILES = 17              # 16 張麻將胡牌時暗手最多 17 張
+
+_SEPARATORS = re.compile(r"[\s,]+")
+
+
+def parse_hand(line: str) -> list[int]:
+    """
+    解析一行牌 code（例如 "11 12 13 45 45"），回傳排序後的 code。
+    不合法（不是可打出的牌、同一種超過 4 張、張數不是 3n+1 或 3n+2）時丟出 ValueError。
+    """
+    try:
+        codes = sorted(int(tok) for tok in _SEPARATORS.split(line.strip()) if tok)
+    except ValueError:
+        raise ValueError(f"無法解析：{line.strip()!r}") from None
+    if not codes:
+        raise ValueError("沒有牌")
+    for code in codes:
+        if code not in TILE_INDEX:
+            raise ValueError(f"不合法的牌 code：{code}")
+    for code, n in Counter(codes).items():
+        if n > 4:
+            raise ValueError(f"{code} 超過 4 張")
+    if len(codes) > MAX_TILES or len(codes) % 3 == 0:
+        raise ValueError(f"張數 {len(codes)} 不是 3n+1 或 3n+2（最多 {MAX_TILES} 張）")
+    return codes
+
+
+def tenpai_advice(codes: list[int]) -> dict[int, list[int]]:
+    """3n+2 張手牌打出哪一種牌可以聽牌：{打出的 code: 聽的 code}。"""
+    advice: dict[int, list[int]] = {}
+    for code in dict.fromkeys(codes):
+        rest = list(codes)
+        rest.remove(code)
+        ting = waits(rest)
+        if ting:
+            advice[code] = ting
+    return advice
+
+
+def analyze(codes: list[int]) -> dict:
+    """分析一手牌（已由 parse_hand 驗證），回傳可直接轉成 JSON 的 dict。"""
+    if len(codes) % 3 == 1:
+        return {"hand": codes, "waits": waits(codes)}
+    return {"hand": codes, "is_hu": is_complete(codes), "advice": tenpai_advice(codes)}
+
+
+# ── 向聽數 ────────────────────────────────────────────
+
+# 部分拆法：(面子數, 搭子數, 對眼數)
+Blocks = tuple[int, int, int]
+
+
+def _pareto(options: set[Blocks]) -> frozenset[Blocks]:
+    """去掉三項都不比別人多的組合（向聽數公式對三項都是單調的）。"""
+    return frozenset(
+        a for a in options
+        if not any(b != a and b[0] >= a[0] and b[1] >= a[1] and b[2] >= a[2] for b in options)
+    )
+
+
+@lru_cache(maxsize=None)
+def _suit_blocks(counts: tuple[int, ...], honor: bool) -> frozenset[Blocks]:
+    """單一花色所有拆成面子、搭子（兩張差一張成面子）與對眼的方式。"""
+    i = next((k for k, c in enumerate(counts) if c), None)
+    if i is None:
+        return frozenset({(0, 0, 0)})
+
+    c = list(counts)
+    options: set[Blocks] = set()
+
+    def take(indices: tuple[int, ...], melds: int, partials: int, pairs: int):
+        for k in indices:
+            c[k] -= 1
+        for m, t, p in _suit_blocks(tuple(c), honor):
+            if p + pairs <= 1:
+                options.add((m + melds, t + partials, p + pairs))
+        for k in indices:
+            c[k] += 1
+
+    take((i,), 0, 0, 0)                       # 孤張
+    if c[i] >= 3:
+        take((i, i, i), 1, 0, 0)              # 刻子
+    if c[i] >= 2:
+        take((i, i), 0, 0, 1)                 # 對眼
+        take((i, i), 0, 1, 0)                 # 對子當搭子
+    if not honor:
+        if i <= 6 and c[i + 1] and c[i + 2]:
+            take((i, i + 1, i + 2), 1, 0, 0)  # 順子
+        if i <= 7 and c[i + 1]:
+            take((i, i + 1), 0, 1, 0)         # 兩面/邊張
+        if i <= 6 and c[i + 2]:
+            take((i, i + 2), 0, 1, 0)         # 嵌張
+    return _pareto(options)
+
+
+def shanten(codes: list[int]) -> int:
+    """
+    向聽數：3n+1 張聽牌為 0，3n+2 張胡牌為 -1。
+    以 2 × (需要的面子數 − 面子) − 搭子 − 對眼 計算，搭子最多算到湊滿面子數為止。
+    有查表檔（mahjong.tables）時改為查表。
+    """
+    tables = get_tables()
+    if tables is not None and (result := tables.shanten(codes)) is not None:
+        return result
+    need = len(codes) // 3
+    combos: set[Blocks] = {(0, 0, 0)}
+    for suit, counts in enumerate(_suit_counts(codes)):
+        combos = {
+            (m1 + m2, t1 + t2, p1 + p2)
+            for m1, t1, p1 in combos
+            for m2, t2, p2 in _suit_blocks(counts, suit == 3)
+            if p1 + p2 <= 1
+        }
+        combos = set(_pareto(combos))
+    return min(2 * (need - m) - min(t, need - m) - p for m, t, p in combos)
+
+
+# ── 台數 ──────────────────────────────────────────────
+
+_MELD_SIZES = {"pong": 3, "kong": 4, "concealed_kong": 4, "chow": 3}
+
+
+def score(
+    codes: list[int],
+    winning_tile: int | None = None,
+    *,
+    melds: list[tuple[str, int]] = (),
+    flowers: list[int] = (),
+    **context,
+) -> dict:
+    """
+    胡牌的台數。codes 為含胡的那張牌在內的暗手，melds 為亮出/暗槓的面子
+    （與 Player.melds 相同的 (種類, code)），flowers 為花牌 code；
+    其餘參數（seat、dealer、self_drawn…）直接傳給 scoring.score_hand。
+    """
+    player = Player()
+    player.hand_tiles = [Tile(c) for c in codes]
+    for kind, code in melds:
+        player.melds.append((kind, code))
+        if kind == "chow":
+            player.melded_tiles.extend(Tile(code + k) for k in range(3))
+        else:
+            player.melded_tiles.extend(Tile(code) for _ in range(_MELD_SIZES[kind]))
+    player.flower_tiles = [Tile(c) for c in flowers]
+    context.setdefault("seat", 0)
+    context.setdefault("dealer", 0)
+    context.setdefault("self_drawn", False)
+    result = score_hand(player, Tile(winning_tile) if winning_tile else None, **context)
+    return {"tai": result.tai, "patterns": result.patterns}
+
+
+# ── 批次查詢 ──────────────────────────────────────────
+
+QUERIES = ("waits", "advice", "shanten", "score")
+_SCORE_FLAGS = ("self_drawn", "last_tile", "kong_replacement")
+_SCORE_INTS = ("seat", "dealer", "prevailing_wind", "dealer_streak")
+
+
+def normalize_request(data: dict) -> dict:
+    """
+    驗證並整理一筆查詢：
+        {"hand": "11 12 ..." 或 [11, 12, ...], "queries": ["waits", ...],
+         "score": {"winning_tile": 45, "melds": [["pong", 41]], "flowers": [51], "seat": 0, ...}}
+    回傳排序過、只含基本型別的 dict，相同的查詢會得到相同的結果（可當快取鍵）。
+    不合法時丟出 ValueError。
+    """
+    if not isinstance(data, dict):
+        raise ValueError("查詢必須是 JSON 物件")
+    hand = data.get("hand")
+    if isinstance(hand, list):
+        hand = " ".join(str(c) for c in hand)
+    if not isinstance(hand, str):
+        raise ValueError("缺少 hand")
+
+    queries = data.get("queries") or ["waits", "advice", "shanten"]
+    unknown = set(queries) - set(QUERIES)
+    if unknown:
+        raise ValueError(f"未知的查詢：{sorted(unknown)}（可用：{', '.join(QUERIES)}）")
+
+    raw = data.get("score") or {}
+    if not isinstance(raw, dict):
+        raise ValueError("score 必須是 JSON 物件")
+    try:
+        melds = [(str(kind), int(code)) for kind, code in raw.get("melds", [])]
+    except (TypeError, ValueError):
+        raise ValueError("melds 必須是 [種類, code] 的串列") from None
+    for kind, code in melds:
+        if kind not in _MELD_SIZES or code not in TILE_INDEX or (kind == "chow" and (code > 40 or code % 10 > 7)):
+            raise ValueError(f"不合法的面子：{kind} {code}")
+    codes = parse_hand(hand)
+    # 亮出的面子佔掉的張數不算在暗手裡
+    if len(codes) + 3 * len(melds) > MAX_TILES:
+        raise ValueError(f"暗手 {len(codes)} 張加上 {len(melds)} 個面子超過 {MAX_TILES} 張")
+    total = Counter(codes)
+    for kind, code in melds:
+        total.update(range(code, code + 3) if kind == "chow" else [code] * _MELD_SIZES[kind])
+    for code, n in total.items():
+        if n > 4:
+            raise ValueError(f"{code} 加上亮出的面子超過 4 張")
+
+    request = {"hand": codes, "queries": sorted(set(queries))}
+    if "score" in request["queries"]:
+        winning_tile = raw.get("winning_tile")
+        if winning_tile is not None and int(winning_tile) not in codes:
+            raise ValueError("winning_tile 必須在 hand 裡")
+        flowers = sorted(int(c) for c in raw.get("flowers", []))
+        if any(not 51 <= c <= 58 for c in flowers) or len(set(flowers)) != len(flowers):
+            raise ValueError("flowers 必須是不重複的花牌 code（51–58）")
+        context = {k: int(raw[k]) for k in _SCORE_INTS if k in raw}
+        context.update({k: bool(raw[k]) for k in _SCORE_FLAGS if k in raw})
+        request["score"] = {
+            "winning_tile": int(winning_tile) if winning_tile is not None else None,
+            "melds": melds,
+            "flowers": flowers,
+            **dict(sorted(context.items())),
+        }
+    return request
+
+
+def evaluate(request: dict) -> dict:
+    """回答 normalize_request() 整理過的查詢。"""
+    codes = request["hand"]
+    result: dict = {"hand": codes}
+    tenpai_shape = len(codes) % 3 == 1
+    for query in request["queries"]:
+        if query == "waits":
+            result["waits"] = waits(codes) if tenpai_shape else None
+        elif query == "advice":
+            if tenpai_shape:
+                result["advice"] = None
+            else:
+                result["is_hu"] = is_complete(codes)
+                result["advice"] = tenpai_advice(codes)
+        elif query == "shanten":
+            result["shanten"] = shanten(codes)
+        elif query == "score":
+            if tenpai_shape or not is_complete(codes):
+                result["score"] = None
+            else:
+                ctx = dict(request["score"])
+                result["score"] = score(codes, ctx.pop("winning_tile"), **ctx)
+    return result
+
+
+def evaluate_batch(requests: list[dict]) -> list[dict | Exception]:
+    """逐筆 evaluate()；算不出來的那一筆放例外物件，不影響同一批的其他查詢。"""
+    results: list[dict | Exception] = []
+    for request in requests:
+        try:
+            results.append(evaluate(request))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def analyze_line(line: str) -> dict:
+    """解析並分析一行；格式錯誤時回傳 {"error": ...} 而不是丟出例外。"""
+    try:
+        codes = parse_hand(line)
+    except ValueError as e:
+        return {"error": str(e)}
+    return analyze(codes)
@@ -0,0 +1,449 @@
+"""
+archive.py — 牌局紀錄檔與旁附索引
+
+紀錄檔（例如 games.mja）只附加不修改，每局一筆：
+  結果摘要（seed、莊家、圈風、胡牌者、放槍者、胡的牌、打出張數、花牌數、台數、旗標）
+  + 牌序（144 張的 code）+ 每個決策一個位元組的答案，可以用 HandLog.replay() 完整重播。
+
+索引檔（games.mja.idx）把摘要存成欄式：每個欄位一段連續的位元組，
+篩選單一位元組的欄位時以 bytes.translate 產生 0/1 遮罩，多個條件以大整數的 AND 合併，
+再以 itertools.compress 取出列號 —— 全部在 C 裡完成，不必逐列跑 Python，也不必讀紀錄檔。
+seed 依遞增順序寫入時（常見的用法）以二分搜尋取範圍。
+
+    with ArchiveWriter("games.mja") as writer:
+        for seed in range(1000):
+            state.reset(dealer=seed % 4)
+            state.deal(random.Random(seed))
+            writer.record_hand(state, agents, seed=seed)
+
+    archive = GameArchive("games.mja")
+    archive.select(discarder=2)                       # 玩家 2 放槍的局（列號）
+    archive.stats(kong_replacement=True)              # 槓上開花的統計
+    for log in archive.iter_hands(seed=range(100, 200), winner=0):
+        state = log.replay()
+
+索引檔只是快取：寫入到一半當掉、或索引比紀錄檔舊時，開檔會從紀錄檔補齊（reindex() 可存回）。
+"""
+from __future__ import annotations
+import bisect
+import itertools
+import os
+import struct
+from array import array
+from collections import Counter
+from typing import Iterator
+
+from .flow import Agent, HandState, decode_answer, encode_answer, play_hand, simple_ai_agent
+from .scoring import score_state
+
+FORMAT_VERSION = 1
+_LOG_MAGIC = b"MJGA"
+_INDEX_MAGIC = b"MJGI"
+_LOG_HEADER = struct.Struct("<4sH")
+# seed, 莊家, 圈風, 胡牌者, 放槍者, 胡的牌, 打出張數, 花牌數, 台數, 旗標, 答案數
+_RECORD = struct.Struct("<qBBBBBBBBBH")
+_WALL = 144
+# magic, 版本, 旗標, 列數, 已索引到的紀錄檔位置
+_INDEX_HEADER = struct.Struct("<4sHHIQ")
+_SEEDS_SORTED = 1
+
+NONE = 255                  # 單一位元組欄位的「沒有」（流局的胡牌者、自摸的放槍者…）
+SELF_DRAWN = 1
+KONG_REPLACEMENT = 2
+FLOWER_WIN = 4
+_FLAGS = {"self_drawn": SELF_DRAWN, "kong_replacement": KONG_REPLACEMENT, "flower_win": FLOWER_WIN}
+
+# 索引中每列一個位元組的欄位（依 _RECORD 的順序）
+BYTE_FIELDS = ("dealer", "wind", "winner", "discarder", "winning_tile", "turns", "flowers", "tai", "flags")
+
+
+class HandLog:
+    """紀錄檔中的一局"""
+
+    __slots__ = ("row", "seed", "dealer", "wind", "winner", "discarder", "winning_tile",
+                 "turns", "flowers", "tai", "flags", "wall", "answers")
+
+    row: int
+    seed: int
+    dealer: int
+    wind: int
+    winner: int | None
+    discarder: int | None
+    winning_tile: int | None    # code
+    turns: int                  # 打出幾張牌
+    flowers: int                # 四家的花牌總數
+    tai: int
+    flags: int
+    wall: bytes                 # 發牌前的牌序（code）
+    answers: bytes              # 每個決策的答案（見 flow.encode_answer）
+
+    def __init__(self, row: int, data: bytes | memoryview):
+        (self.seed, self.dealer, self.wind, winner, discarder, winning_tile,
+         self.turns, self.flowers, self.tai, self.flags, n) = _RECORD.unpack_from(data)
+        self.row = row
+        self.winner = None if winner == NONE else winner
+        self.discarder = None if discarder == NONE else discarder
+        self.winning_tile = None if winning_tile == NONE else winning_tile
+        start = _RECORD.size
+        self.wall = bytes(data[start:start + _WALL])
+        self.answers = bytes(data[start + _WALL:start + _WALL + n])
+
+    @property
+    def self_drawn(self) -> bool:
+        return bool(self.flags & SELF_DRAWN)
+
+    @property
+    def kong_replacement(self) -> bool:
+        return bool(self.flags & KONG_REPLACEMENT)
+
+    @property
+    def flower_win(self) -> bool:
+        return bool(self.flags & FLOWER_WIN)
+
+    def replay(self, state: HandState | None = None) -> HandState:
+        """依牌序與答案重播這一局，回傳結束時的 HandState。"""
+        state = state or HandState()
+        state.reset(self.dealer, self.wind)
+        state.deal(wall=list(self.wall))
+        answers = iter(self.answers)
+        flow = play_hand(state)
+        try:
+            decision = next(flow)
+            while True:
+                decision = flow.send(decode_answer(decision, next(answers)))
+        except StopIteration:
+            pass
+        return state
+
+    def __repr__(self) -> str:
+        if self.winner is None:
+            result = "流局"
+        elif self.discarder is None:
+            result = f"玩家 {self.winner} 自摸 {self.tai} 台"
+        else:
+            result = f"玩家 {self.winner} 胡 玩家 {self.discarder} {self.tai} 台"
+        return f"HandLog(#{self.row} seed={self.seed}：{result}，{self.turns} 張)"
+
+
+# ── 索引 ──────────────────────────────────────────────
+
+class _Index:
+    """欄式的摘要：每個位元組欄位一個 bytearray，另有 seed、紀錄位置與長度"""
+
+    def __init__(self):
+        self.columns = {name: bytearray() for name in BYTE_FIELDS}
+        self.seeds = array("q")
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.seeds_sorted = True
+        self.covered = _LOG_HEADER.size     # 已索引到的紀錄檔位置
+
+    def __len__(self) -> int:
+        return len(self.seeds)
+
+    def add(self, offset: int, record: bytes | memoryview, length: int):
+        fields = _RECORD.unpack_from(record)
+        seed = fields[0]
+        if self.seeds and seed < self.seeds[-1]:
+            self.seeds_sorted = False
+        self.seeds.append(seed)
+        for name, value in zip(BYTE_FIELDS, fields[1:-1]):
+            self.columns[name].append(value)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.covered = offset + length
+
+    def scan(self, data: bytes | memoryview, start: int):
+        """從紀錄檔的 start 位置補齊索引（data 為整個紀錄檔的內容）。"""
+        offset = start
+        while offset + _RECORD.size <= len(data):
+            length = _RECORD.size + _WALL + _RECORD.unpack_from(data, offset)[-1]
+            if offset + length > len(data):
+                break       # 最後一筆沒寫完（寫入時當掉），略過
+            self.add(offset, data[offset:offset + _RECORD.size], length)
+            offset += length
+
+    @classmethod
+    def load(cls, path: str) -> _Index | None:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < _INDEX_HEADER.size:
+            return None
+        magic, version, flags, n, covered = _INDEX_HEADER.unpack_from(data)
+        if magic != _INDEX_MAGIC or version != FORMAT_VERSION:
+            return None
+        index = cls()
+        offset = _INDEX_HEADER.size
+        for column, itemsize in ((index.seeds, 8), (index.offsets, 8), (index.lengths, 4)):
+            column.frombytes(data[offset:offset + n * itemsize])
+            offset += n * itemsize
+        for name in BYTE_FIELDS:
+            index.columns[name] = bytearray(data[offset:offset + n])
+            offset += n
+        if offset != len(data):
+            return None
+        index.seeds_sorted = bool(flags & _SEEDS_SORTED)
+        index.covered = covered
+        return index
+
+    def save(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            flags = _SEEDS_SORTED if self.seeds_sorted else 0
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, FORMAT_VERSION, flags, len(self), self.covered))
+            f.write(self.seeds.tobytes())
+            f.write(self.offsets.tobytes())
+            f.write(self.lengths.tobytes())
+            for name in BYTE_FIELDS:
+                f.write(self.columns[name])
+        os.replace(tmp, path)
+
+
+def _index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _open_index(path: str) -> _Index:
+    """載入索引，並從紀錄檔補上索引之後才寫入的局。"""
+    index = _Index.load(_index_path(path)) or _Index()
+    with open(path, "rb") as f:
+        header = f.read(_LOG_HEADER.size)
+        magic, version = _LOG_HEADER.unpack(header) if len(header) == _LOG_HEADER.size else (None, None)
+        if magic != _LOG_MAGIC:
+            raise ValueError(f"{path}：不是牌局紀錄檔")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}：版本 {version} 與程式的版本 {FORMAT_VERSION} 不符")
+        size = f.seek(0, os.SEEK_END)
+        if index.covered > size:        # 索引比紀錄檔新（紀錄檔被換掉了）：重建
+            index = _Index()
+        if index.covered < size:
+            f.seek(0)
+            index.scan(f.read(), index.covered)
+    return index
+
+
+def reindex(path: str) -> int:
+    """補齊並存回 path 的索引，回傳總局數。"""
+    index = _open_index(path)
+    index.save(_index_path(path))
+    return len(index)
+
+
+# ── 寫入 ──────────────────────────────────────────────
+
+class ArchiveWriter:
+    """把牌局附加到紀錄檔；close() 時寫回索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as f:
+                f.write(_LOG_HEADER.pack(_LOG_MAGIC, FORMAT_VERSION))
+        self._index = _open_index(path)
+        self._file = open(path, "r+b")
+        # 截掉沒寫完的最後一筆，從最後一筆完整的紀錄之後接著寫
+        self._file.truncate(self._index.covered)
+        self._file.seek(self._index.covered)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def record_hand(self, state: HandState, agents: list[Agent] | None = None, seed: int = 0) -> HandLog:
+        """以 agents 跑完一局（需先 deal()）並記錄；seed 只是存進摘要供查詢。"""
+        agents = agents or [simple_ai_agent] * 4
+        wall = bytes(t.code for t in state.deck.tiles)
+        answers = bytearray()
+        flow = play_hand(state)
+        try:
+            decision = next(flow)
+            while True:
+                answer = agents[decision.player_idx](state, decision)
+                answers.append(encode_answer(decision, answer))
+                decision = flow.send(answer)
+        except StopIteration:
+            pass
+        return self.append(state, wall, bytes(answers), seed)
+
+    def append(self, state: HandState, wall: bytes, answers: bytes, seed: int = 0) -> HandLog:
+        """記錄一局已經打完的牌（wall 為發牌前的牌序，answers 為依序的決策答案）。"""
+        result = score_state(state)
+        flags = ((SELF_DRAWN if state.self_drawn else 0)
+                 | (KONG_REPLACEMENT if state.kong_replacement else 0)
+                 | (FLOWER_WIN if state.flower_win else 0))
+        record = _RECORD.pack(
+            seed, state.dealer, state.current_wind,
+            NONE if state.winner is None else state.winner,
+            NONE if state.discarder is None else state.discarder,
+            NONE if state.winning_tile is None else state.winning_tile.code,
+            min(state.turns, 254), sum(len(p.flower_tiles) for p in state.players),
+            min(result.tai if result else 0, 254), flags, len(answers),
+        ) + wall + answers
+        offset = self._index.covered
+        self._file.write(record)
+        self._index.add(offset, record, len(record))
+        return HandLog(len(self._index) - 1, record)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        self._index.save(_index_path(self.path))
+
+    def __enter__(self) -> ArchiveWriter:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── 查詢 ──────────────────────────────────────────────
+
+class ArchiveStats:
+    """一組牌局的彙總"""
+
+    hands: int
+    draws: int
+    wins: list[int]             # 各座位胡牌次數
+    deal_ins: list[int]         # 各座位放槍次數
+    self_drawn: int
+    kong_replacement: int
+    flower_win: int
+    tai: Counter                # 台數 -> 局數（只算有人胡的局）
+    turns: Counter              # 打出張數 -> 局數
+    winning_tiles: Counter      # 胡的牌（code）-> 局數
+
+    def __init__(self, hands: int, winner: Counter, discarder: Counter, flags: Counter,
+                 tai: Counter, turns: Counter, winning_tiles: Counter):
+        self.hands = hands
+        self.draws = winner[NONE]
+        self.wins = [winner[s] for s in range(4)]
+        self.deal_ins = [discarder[s] for s in range(4)]
+        self.self_drawn = sum(n for v, n in flags.items() if v & SELF_DRAWN)
+        self.kong_replacement = sum(n for v, n in flags.items() if v & KONG_REPLACEMENT)
+        self.flower_win = sum(n for v, n in flags.items() if v & FLOWER_WIN)
+        self.tai = tai
+        self.turns = turns
+        self.winning_tiles = winning_tiles
+
+    @property
+    def mean_tai(self) -> float:
+        won = self.hands - self.draws
+        return sum(t * n for t, n in self.tai.items()) / won if won else 0.0
+
+    @property
+    def mean_turns(self) -> float:
+        return sum(t * n for t, n in self.turns.items()) / self.hands if self.hands else 0.0
+
+    def __repr__(self) -> str:
+        return (f"ArchiveStats({self.hands} 局：流局 {self.draws}、胡 {self.wins}、放槍 {self.deal_ins}、"
+                f"自摸 {self.self_drawn}、槓上開花 {self.kong_replacement}、平均 {self.mean_tai:.2f} 台)")
+
+
+class GameArchive:
+    """
+    唯讀的紀錄檔與索引。篩選條件（皆為 AND）：
+      dealer / wind / winner / discarder / turns / flowers / tai   整數、None（winner / discarder）、
+                                                                   或 range / 集合（符合其一）
+      winning_tile                                                 牌的 code（同上）
+      self_drawn / kong_replacement / flower_win                   True / False
+      seed                                                         整數、range（step 1）或集合
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index = _open_index(path)
+        self._file = open(path, "rb")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> GameArchive:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def mask(self, **criteria) -> bytes:
+        """符合條件的列為 1、其餘為 0 的位元組串。"""
+        n = len(self._index)
+        result: int | None = None
+        for name, want in criteria.items():
+            part = int.from_bytes(self._mask(name, want), "little")
+            result = part if result is None else result & part
+        if result is None:
+            return b"\x01" * n
+        return result.to_bytes(n, "little")
+
+    def select(self, **criteria) -> list[int]:
+        """符合條件的列號（即局的編號，依寫入順序）。"""
+        return list(itertools.compress(range(len(self._index)), self.mask(**criteria)))
+
+    def count(self, **criteria) -> int:
+        return self.mask(**criteria).count(1)
+
+    def read(self, row: int) -> HandLog:
+        self._file.seek(self._index.offsets[row])
+        return HandLog(row, self._file.read(self._index.lengths[row]))
+
+    def iter_hands(self, **criteria) -> Iterator[HandLog]:
+        for row in self.select(**criteria):
+            yield self.read(row)
+
+    def stats(self, **criteria) -> ArchiveStats:
+        mask = self.mask(**criteria)
+        columns = self._index.columns
+
+        def histogram(name: str) -> Counter:
+            return Counter(itertools.compress(columns[name], mask))
+
+        winner = histogram("winner")
+        won = bytes(v != NONE for v in range(256))
+        tai = Counter(itertools.compress(columns["tai"], self._and(mask, columns["winner"].translate(won))))
+        winning_tiles = histogram("winning_tile")
+        del winning_tiles[NONE]
+        return ArchiveStats(mask.count(1), winner, histogram("discarder"), histogram("flags"),
+                            tai, histogram("turns"), winning_tiles)
+
+    # ── 內部 ──────────────────────────────────────────
+
+    def _mask(self, name: str, want) -> bytes:
+        index = self._index
+        if name in _FLAGS:
+            bit = _FLAGS[name]
+            table = bytes(bool(v & bit) == bool(want) for v in range(256))
+            return index.columns["flags"].translate(table)
+        if name == "seed":
+            return self._seed_mask(want)
+        if name not in index.columns or name == "flags":
+            raise ValueError(f"不能以 {name} 篩選")
+        if want is None or isinstance(want, int):
+            wanted = {NONE if want is None else want}
+        else:
+            wanted = {NONE if v is None else v for v in want}
+        table = bytes(v in wanted for v in range(256))
+        return index.columns[name].translate(table)
+
+    def _seed_mask(self, want) -> bytes:
+        seeds = self._index.seeds
+        n = len(seeds)
+        if isinstance(want, int):
+            want = range(want, want + 1)
+        if isinstance(want, range) and want.step == 1:
+            if self._index.seeds_sorted:
+                lo = bisect.bisect_left(seeds, want.start)
+                hi = bisect.bisect_left(seeds, want.stop)
+                return bytes(lo) + b"\x01" * (hi - lo) + bytes(n - hi)
+            start, stop = want.start, want.stop
+            return bytes(start <= s < stop for s in seeds)
+        wanted = set(want)
+        return bytes(s in wanted for s in seeds)
+
+    @staticmethod
+    def _and(a: bytes, b: bytes) -> bytes:
+        return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(len(a), "little")
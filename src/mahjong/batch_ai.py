@@ -0,0 +1,126 @@
+"""
+batch_ai.py — SimpleAI 的批次版本（需要 numpy）
+
+輸入為 (N, 34) 的手牌張數陣列（TILE_CODES 順序，與 env / sampler 相同），
+一次替 N 副手牌做決策，結果與 SimpleAI 逐副呼叫相同：
+
+  discard_batch(counts)                            打哪張（牌的索引）
+  pong_batch(counts, tiles)                        要不要碰（bool）
+  reaction_batch(counts, tiles, can_hu, is_next)   對別人打出的牌的反應（env 的動作編號）
+
+SimpleAI 是以 code 計算相鄰關係（例如 19 與 21 差 2、39 與東差 2 也算在內），
+這裡先把張數攤到以 code 為索引的陣列（_CODE_SPACE 格，前後留空）再位移相加，行為完全一致。
+打牌分數相同時 SimpleAI 取手牌中較前面的一張；手牌依 code 排序時（Player.order_hand）
+就是 code 最小的一張，這裡也取索引最小者。
+
+PONG_LOSS_THRESHOLD 取自傳入的 ai 類別，所以只覆寫參數的 SimpleAI 子類別也適用；
+覆寫了方法的子類別則需要自己的批次版本。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from .ai import SimpleAI
+from .env import CHOW_HIGH, CHOW_LOW, CHOW_MID, HU, KONG, N_TILE_TYPES, PASS, PONG
+from .tile import TILE_CODES, TILE_INDEX
+
+_PAD = 2
+_CODE_SPACE = max(TILE_CODES) + 1 + 2 * _PAD       # code ± 2 都不會超出範圍
+_CODES = np.array(TILE_CODES, dtype=np.intp)
+_COL = _CODES + _PAD                                # 索引 -> code 空間的欄
+_NUMBER = _CODES < 40                               # 萬筒條（可成順子）
+_HONOR_PENALTY = np.where(_NUMBER, 0, -2)
+
+
+def _code_space(counts: np.ndarray) -> np.ndarray:
+    """(N, 34) 張數 -> (N, _CODE_SPACE) 以 code 為索引的張數。"""
+    space = np.zeros((len(counts), _CODE_SPACE), dtype=np.int16)
+    space[:, _COL] = counts
+    return space
+
+
+def _shift(present: np.ndarray, d: int) -> np.ndarray:
+    """每一種牌的 code + d 是否在手牌裡（0/1），(N, 34)。"""
+    return present[:, _COL + d]
+
+
+def keep_values(counts: np.ndarray) -> np.ndarray:
+    """每一種牌的保留價值（SimpleAI.choose_discard 的 keep_value），(N, 34)。"""
+    counts = np.asarray(counts)
+    present = (_code_space(counts) > 0).astype(np.int16)    # bool 相加是 OR，要先轉成整數
+    value = np.where(counts >= 3, 8, np.where(counts == 2, 5, 0))
+    neighbours = 2 * (_shift(present, -1) + _shift(present, 1)) + _shift(present, -2) + _shift(present, 2)
+    return value + np.where(_NUMBER, neighbours, 0) + _HONOR_PENALTY
+
+
+def discard_batch(counts: np.ndarray) -> np.ndarray:
+    """每副手牌要打出的牌的索引，(N,)。手牌至少要有一張。"""
+    counts = np.asarray(counts)
+    values = np.where(counts > 0, keep_values(counts), np.iinfo(np.int32).max)
+    return values.argmin(axis=1)
+
+
+def sequence_potential(counts: np.ndarray) -> np.ndarray:
+    """SimpleAI._sequence_potential，(N,)。"""
+    counts = np.asarray(counts)
+    present = (_code_space(counts) > 0).astype(np.int16)
+    per_tile = 2 * _shift(present, 1) + _shift(present, 2)
+    return (np.where(_NUMBER, per_tile, 0) * counts).sum(axis=1)
+
+
+def pong_batch(counts: np.ndarray, tiles: np.ndarray, ai: type[SimpleAI] = SimpleAI) -> np.ndarray:
+    """SimpleAI.choose_pong：tiles 為別人打出的牌的索引，(N,) bool。"""
+    counts = np.asarray(counts)
+    tiles = np.asarray(tiles, dtype=np.intp)
+    rows = np.arange(len(counts))
+    after = counts.copy()
+    after[rows, tiles] -= np.minimum(after[rows, tiles], 2)
+    before = sequence_potential(counts)
+    loss = before - sequence_potential(after)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        keep = loss / before <= ai.PONG_LOSS_THRESHOLD
+    return ~_NUMBER[tiles] | (before == 0) | keep
+
+
+def reaction_batch(
+    counts: np.ndarray,
+    tiles: np.ndarray,
+    can_hu: np.ndarray | None = None,
+    is_next: np.ndarray | bool = False,
+    ai: type[SimpleAI] = SimpleAI,
+) -> np.ndarray:
+    """
+    SimpleAI.choose_reaction，回傳 env 的動作編號 (N,)：HU / KONG / PONG / CHOW_* / PASS。
+    可碰、可槓、可吃由張數判斷（與 flow.legal_reactions 相同）；
+    能不能胡需要完整的規則判斷，由呼叫端以 can_hu 傳入。
+    """
+    counts = np.asarray(counts)
+    tiles = np.asarray(tiles, dtype=np.intp)
+    n = len(counts)
+    rows = np.arange(n)
+    held = counts[rows, tiles]
+    wants = pong_batch(counts, tiles, ai)
+
+    present = _code_space(counts) > 0
+    col = _COL[tiles]
+    number = _NUMBER[tiles] & np.broadcast_to(np.asarray(is_next, dtype=bool), (n,))
+    has = {d: present[rows, col + d] for d in (-2, -1, 1, 2)}
+
+    action = np.full(n, PASS, dtype=np.int8)
+    # 由低優先到高優先覆寫：吃（依 (c-2,c-1)、(c-1,c+1)、(c+1,c+2) 的順序取第一個）< 碰 < 槓 < 胡
+    for chow, a, b in ((CHOW_HIGH, 1, 2), (CHOW_MID, -1, 1), (CHOW_LOW, -2, -1)):
+        action[number & has[a] & has[b]] = chow
+    action[(held >= 2) & wants] = PONG
+    action[(held >= 3) & wants] = KONG
+    if can_hu is not None:
+        action[np.asarray(can_hu, dtype=bool)] = HU
+    return action
+
+
+def counts_of(hands: list[list]) -> np.ndarray:
+    """Tile 串列的串列 -> (N, 34) 張數（方便拿現有的手牌做比較）。"""
+    out = np.zeros((len(hands), N_TILE_TYPES), dtype=np.int8)
+    for row, hand in enumerate(hands):
+        for t in hand:
+            out[row, TILE_INDEX[t.code]] += 1
+    return out
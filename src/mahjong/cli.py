@@ -0,0 +1,183 @@
+"""
+cli.py — 命令列工具（`mahjong` 或 `python -m mahjong`）
+
+子命令：
+  analyze        逐行讀入手牌（檔案或 stdin），串流輸出是否胡牌、聽哪些牌、打哪張可以聽
+  build-tables   產生分花色查表檔（mahjong.tables），之後所有行程以 mmap 共用
+  build-policy   產生打牌決策的查表檔（mahjong.policy），AI 打牌時查表代替即時計算
+
+analyze 的輸入每行一手牌，以空白或逗號分隔的牌 code（空行與 # 開頭的行略過）：
+    11 12 13 14 15 16 17 18 19 21 22 23 31 32 33 45
+輸出預設為 JSON Lines，一行對應一手輸入（依輸入順序），例如：
+    {"line": 1, "hand": [...], "waits": [45]}
+    {"line": 2, "hand": [...], "is_hu": false, "advice": {"19": [21, 24]}}
+    {"line": 3, "error": "不合法的牌 code：99"}
+
+多行輸入會切成固定大小的批次交給工作行程；同時在處理中的批次有上限，
+輸出依完成的先後重新排回輸入順序，所以記憶體用量與輸入長度無關。
+"""
+from __future__ import annotations
+import argparse
+import importlib
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from typing import Iterable, Iterator, TextIO
+
+from .analysis import analyze_line
+from .tile import Tile
+
+
+def _numbered_hands(stream: TextIO) -> Iterator[tuple[int, str]]:
+    for lineno, line in enumerate(stream, 1):
+        text = line.strip()
+        if text and not text.startswith("#"):
+            yield lineno, text
+
+
+def _analyze_chunk(chunk: list[tuple[int, str]]) -> list[dict]:
+    return [{"line": lineno, **analyze_line(text)} for lineno, text in chunk]
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def analyze_stream(stream: TextIO, workers: int = 1, chunk_size: int = 256, max_pending: int | None = None) -> Iterator[dict]:
+    """
+    依輸入順序逐筆產生分析結果。workers > 1 時以行程池平行處理，
+    最多同時有 max_pending（預設 workers × 4）個批次在處理中。
+    """
+    hands = _numbered_hands(stream)
+    if workers <= 1:
+        for lineno, text in hands:
+            yield {"line": lineno, **analyze_line(text)}
+        return
+
+    # 只在平行處理時才載入 concurrent.futures（連帶 logging 等），單行程啟動較快
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_pending = max_pending or workers * 4
+    chunks = _chunks(hands, chunk_size)
+    with ProcessPoolExecutor(workers) as pool:
+        pending: deque = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(_analyze_chunk, chunk))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _format_text(result: dict) -> str:
+    def names(codes) -> str:
+        return " ".join(str(Tile(c)) for c in codes)
+
+    prefix = f"{result['line']}: "
+    if "error" in result:
+        return prefix + f"錯誤：{result['error']}"
+    hand = names(result["hand"])
+    if "waits" in result:
+        return prefix + f"{hand}  →  " + (f"聽 {names(result['waits'])}" if result["waits"] else "沒有聽牌")
+    if result["is_hu"]:
+        return prefix + f"{hand}  →  胡牌"
+    if not result["advice"]:
+        return prefix + f"{hand}  →  打任何一張都不會聽牌"
+    advice = "；".join(f"打 {Tile(c)} 聽 {names(ting)}" for c, ting in result["advice"].items())
+    return prefix + f"{hand}  →  {advice}"
+
+
+def _cmd_analyze(args) -> int:
+    stream = open(args.file, encoding="utf-8") if args.file not in (None, "-") else sys.stdin
+    workers = args.workers
+    if workers is None:
+        # 互動式輸入時逐行回應，不等批次湊滿
+        workers = 1 if stream.isatty() else (os.cpu_count() or 1)
+
+    errors = 0
+    try:
+        for result in analyze_stream(stream, workers, args.chunk):
+            errors += "error" in result
+            if args.format == "text":
+                line = _format_text(result)
+            else:
+                line = json.dumps(result, ensure_ascii=False)
+            print(line, flush=workers <= 1)
+    except BrokenPipeError:
+        # 例如接到 head：下游關閉就安靜結束
+        sys.stdout = open(os.devnull, "w")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return 1 if errors else 0
+
+
+def _cmd_build_tables(args) -> int:
+    from . import tables
+
+    try:
+        path = tables.build(args.output)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"已寫入 {path}（{os.path.getsize(path) / 1e6:.1f} MB）")
+    if args.output and args.output != tables.default_path():
+        print(f"使用時請設定 MAHJONG_TABLES={path}")
+    return 0
+
+
+def _cmd_build_policy(args) -> int:
+    from . import policy
+
+    try:
+        # 命令列明確指定的模組才匯入；模組在匯入時以 register_evaluator 登記評估函式
+        for module in args.plugin:
+            importlib.import_module(module)
+        evaluator = policy.resolve_evaluator(args.evaluator)
+    except (ImportError, LookupError) as e:
+        print(f"無法載入評估函式 {args.evaluator}：{e}", file=sys.stderr)
+        return 1
+    path, n = policy.build(args.output, args.max_tiles, evaluator)
+    print(f"已寫入 {path}（{n} 個花色型，{os.path.getsize(path) / 1e6:.1f} MB）")
+    if args.output and args.output != policy.default_path():
+        print(f"使用時請設定 MAHJONG_POLICY={path}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="mahjong", description="終端機麻將命令列工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="分析手牌：胡牌、聽牌、打哪張可以聽")
+    p.add_argument("file", nargs="?", help="每行一手牌 code 的檔案（省略或 - 表示 stdin）")
+    p.add_argument("--format", choices=("json", "text"), default="json", help="輸出格式（預設 JSON Lines）")
+    p.add_argument("--workers", type=int, default=None,
+                   help="工作行程數（預設為 CPU 數；互動式輸入時為 1）")
+    p.add_argument("--chunk", type=int, default=256, help="每批交給工作行程的手牌數")
+    p.set_defaults(handler=_cmd_analyze)
+
+    p = sub.add_parser("build-tables", help="產生胡牌/聽牌/向聽數的分花色查表檔")
+    p.add_argument("-o", "--output", default=None,
+                   help="輸出路徑（預設為 $MAHJONG_TABLES 或 ~/.cache/mahjong/ 下）")
+    p.set_defaults(handler=_cmd_build_tables)
+
+    p = sub.add_parser("build-policy", help="產生打牌決策（各花色型的保留價值）的查表檔")
+    p.add_argument("-o", "--output", default=None,
+                   help="輸出路徑（預設為 $MAHJONG_POLICY 或 ~/.cache/mahjong/ 下）")
+    p.add_argument("--max-tiles", type=int, default=8, help="列舉每個花色最多幾張（預設 8）")
+    p.add_argument("--evaluator", default="simple",
+                   help="已登記的評估函式名稱（預設 simple，與 SimpleAI 相同）")
+    p.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                   help="建表前先匯入的模組（在其中以 mahjong.policy.register_evaluator 登記評估函式；可重複）")
+    p.set_defaults(handler=_cmd_build_policy)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
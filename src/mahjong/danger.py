@@ -0,0 +1,255 @@
+"""
+danger.py — 每位對手的放槍危險度索引
+
+DangerIndex 依公開資訊（各家的棄牌、亮出的面子、聽牌與否）替每位對手維護 34 種牌的危險度，
+事件發生時只重算受影響的幾格，查詢是查表（O(1)）：
+
+  現物    對手自己打過的牌：0（台灣麻將沒有振聽，這是「他不要這張」的推測，不是絕對安全）
+  筋      兩面聽 (r-2, r-1) 與 (r+1, r+2) 也聽 r∓3；對手打過 r-3 / r+3 就視為那一側不聽 r
+  壁      r±1 或 r±2 已經四張都看得見，需要那張的兩面、嵌張、邊張都不可能
+  張數    看得見三張以上的牌不會是對碰；字牌只可能對碰或單吊
+
+危險度（越大越危險）＝ 每個還可能的兩面 2、邊張 1、嵌張 1、對碰/單吊 1（字牌 2），
+再乘上對手的威脅度（1 + 亮出的面子數，聽牌時為 TENPAI_THREAT）加總成 risk()。
+看得見的張數只算公開的牌；自己手上的牌不算在內。
+
+聽牌：台灣麻將沒有聽牌宣告，DangerIndex 由公開資訊推測——亮出 TENPAI_MELDS 個面子，
+或全桌打出 LATE_DISCARDS 張之後亮出 LATE_TENPAI_MELDS 個面子，就對該座位呼叫 on_tenpai()。
+有聽牌宣告的規則（或其他判斷來源）也可以自行呼叫 on_tenpai。
+
+事件來源：
+  - flow.play_hand：把 DangerIndex 放進 HandState.trackers，打牌、碰/槓/吃、暗槓時自動更新
+  - 其他前端（Game、伺服器）：自行呼叫 on_discard / on_meld，
+    或以 rebuild(players) 從 Player.discarded_tiles / melded_tiles 重建
+  聽牌的推測在 on_discard / on_meld / rebuild 之中自動進行。
+
+DefensiveAI 是打牌時參考 risk() 的 SimpleAI（保留價值由 policy.DiscardPolicy 查表）。
+"""
+from __future__ import annotations
+
+from .ai import SimpleAI
+from .flow import Agent, Decision, HandState
+from .policy import get_policy
+from .tile import TILE_CODES, TILE_INDEX, Tile
+
+N_TILES = len(TILE_CODES)
+TENPAI_THREAT = 5       # 聽牌的對手
+TENPAI_MELDS = 3        # 亮出這麼多面子就推測已聽牌
+LATE_DISCARDS = 40      # 全桌打出這麼多張之後（約每家 10 張）……
+LATE_TENPAI_MELDS = 2   # ……亮出這麼多面子也推測已聽牌
+_RANK = tuple(code % 10 for code in TILE_CODES)
+_HONOR = tuple(code >= 40 for code in TILE_CODES)
+
+
+class DangerIndex:
+    """四家的公開資訊與每位對手 34 種牌的危險度"""
+
+    visible: bytearray          # 每種牌看得見的張數（棄牌 + 亮牌）
+    genbutsu: list[bytearray]   # [座位][牌] 該座位打過幾張
+    danger: list[bytearray]     # [座位][牌] 對該座位的危險度
+    exposed: list[int]          # 各座位亮出的面子數（不含暗槓）
+    tenpai: list[bool]          # 各座位是否聽牌（宣告或推測）
+    discards: int               # 全桌打出的張數
+
+    def __init__(self):
+        self.visible = bytearray(N_TILES)
+        self.genbutsu = [bytearray(N_TILES) for _ in range(4)]
+        self.danger = [bytearray(N_TILES) for _ in range(4)]
+        self.exposed = [0] * 4
+        self.tenpai = [False] * 4
+        self.discards = 0
+        self.reset()
+
+    def reset(self):
+        """回到發牌前（就地清空）。"""
+        self.visible[:] = bytes(N_TILES)
+        self.discards = 0
+        for seat in range(4):
+            self.genbutsu[seat][:] = bytes(N_TILES)
+            self.exposed[seat] = 0
+            self.tenpai[seat] = False
+            for i in range(N_TILES):
+                self._refresh(seat, i)
+
+    # ── 事件 ──────────────────────────────────────────
+
+    def on_discard(self, seat: int, tile: Tile):
+        """seat 打出 tile。"""
+        i = TILE_INDEX[tile.code]
+        self.genbutsu[seat][i] += 1
+        self._add_visible(i)
+        self.discards += 1
+        if self.discards == LATE_DISCARDS:
+            for s in range(4):
+                self._infer_tenpai(s)
+        # 新的現物：這張本身與 ±3 的筋
+        self._refresh(seat, i)
+        if not _HONOR[i]:
+            rank = _RANK[i]
+            if rank > 3:
+                self._refresh(seat, i - 3)
+            if rank < 7:
+                self._refresh(seat, i + 3)
+
+    def on_meld(self, seat: int, codes: list[int] | tuple[int, ...], concealed: bool = False):
+        """seat 亮出面子；codes 是從手牌拿出來的牌（被吃/碰的那張已在 on_discard 算過）。"""
+        if not concealed:
+            self.exposed[seat] += 1
+            self._infer_tenpai(seat)
+        for code in codes:
+            self._add_visible(TILE_INDEX[code])
+
+    def on_tenpai(self, seat: int):
+        """seat 聽牌（宣告、或由 _infer_tenpai 等其他跡象判斷）。"""
+        self.tenpai[seat] = True
+
+    def _infer_tenpai(self, seat: int):
+        """由公開資訊推測 seat 已聽牌：亮出的面子夠多，或牌局後段亮出的面子不少。"""
+        melds = self.exposed[seat]
+        if melds >= TENPAI_MELDS or (melds >= LATE_TENPAI_MELDS and self.discards >= LATE_DISCARDS):
+            self.on_tenpai(seat)
+
+    def rebuild(self, players: list) -> DangerIndex:
+        """
+        從 Player 的棄牌與亮牌重建（例如中途加入或還原快照之後）。
+        碰/槓/吃的那張同時在放槍者的 discarded_tiles 與 melded_tiles 裡，以物件身分排除；
+        還原的快照無法比對時，吃的那張假設是順子中最小的一張。
+        """
+        self.visible[:] = bytes(N_TILES)
+        self.discards = sum(len(p.discarded_tiles) for p in players)
+        discarded = {id(t) for p in players for t in p.discarded_tiles}
+        for seat, player in enumerate(players):
+            self.genbutsu[seat][:] = bytes(N_TILES)
+            for t in player.discarded_tiles:
+                self.genbutsu[seat][TILE_INDEX[t.code]] += 1
+                self.visible[TILE_INDEX[t.code]] += 1
+            for t in player.melded_tiles:
+                self.visible[TILE_INDEX[t.code]] += 1
+            open_melds = [code for kind, code in player.melds if kind != "concealed_kong"]
+            self.exposed[seat] = len(open_melds)
+            claimed = {id(t): t.code for t in player.melded_tiles if id(t) in discarded}
+            for code in claimed.values():
+                self.visible[TILE_INDEX[code]] -= 1
+            for code in open_melds[len(claimed):]:
+                self.visible[TILE_INDEX[code]] -= 1
+        for seat in range(4):
+            self._infer_tenpai(seat)
+            for i in range(N_TILES):
+                self._refresh(seat, i)
+        return self
+
+    # ── 查詢 ──────────────────────────────────────────
+
+    def threat(self, seat: int) -> int:
+        return TENPAI_THREAT if self.tenpai[seat] else 1 + self.exposed[seat]
+
+    def tile_danger(self, seat: int, code: int) -> int:
+        """打出 code 對 seat 的危險度。"""
+        return self.danger[seat][TILE_INDEX[code]]
+
+    def risk(self, observer: int, code: int) -> int:
+        """observer 打出 code 對三位對手的危險度，依威脅度加權加總。"""
+        i = TILE_INDEX[code]
+        total = 0
+        for seat in range(4):
+            if seat != observer:
+                total += self.threat(seat) * self.danger[seat][i]
+        return total
+
+    def max_threat(self, observer: int) -> int:
+        return max(self.threat(seat) for seat in range(4) if seat != observer)
+
+    # ── 內部 ──────────────────────────────────────────
+
+    def _add_visible(self, i: int):
+        self.visible[i] += 1
+        if self.visible[i] == 4 and not _HONOR[i]:
+            # 成了壁：±2 內用到這張的兩面、邊張、嵌張都不可能
+            rank = _RANK[i]
+            cells = range(i - min(2, rank - 1), i + min(2, 9 - rank) + 1)
+        else:
+            cells = (i,)       # 只影響這張的對碰/單吊
+        for seat in range(4):
+            for j in cells:
+                self._refresh(seat, j)
+
+    def _refresh(self, seat: int, i: int):
+        genbutsu = self.genbutsu[seat]
+        if genbutsu[i]:
+            self.danger[seat][i] = 0
+            return
+        visible = self.visible
+        if _HONOR[i]:
+            self.danger[seat][i] = 2 if visible[i] <= 1 else 1 if visible[i] == 2 else 0
+            return
+
+        rank = _RANK[i]
+        value = 1 if visible[i] <= 2 else 0                     # 對碰/單吊
+        if rank >= 3 and visible[i - 1] < 4 and visible[i - 2] < 4:
+            if rank == 3:
+                value += 1                                      # 邊張 12 聽 3
+            elif not genbutsu[i - 3]:
+                value += 2                                      # 兩面，沒有被筋排除
+        if rank <= 7 and visible[i + 1] < 4 and visible[i + 2] < 4:
+            if rank == 7:
+                value += 1                                      # 邊張 89 聽 7
+            elif not genbutsu[i + 3]:
+                value += 2
+        if 2 <= rank <= 8 and visible[i - 1] < 4 and visible[i + 1] < 4:
+            value += 1                                          # 嵌張
+        self.danger[seat][i] = value
+
+
+def tracker_of(state: HandState) -> DangerIndex:
+    """state（flow.HandState）上的 DangerIndex；還沒有就從目前的牌面建一個並掛上去。"""
+    for tracker in state.trackers:
+        if isinstance(tracker, DangerIndex):
+            return tracker
+    index = DangerIndex().rebuild(state.players)
+    state.trackers.append(index)
+    return index
+
+
+# ── 策略 ──────────────────────────────────────────────
+
+class DefensiveAI(SimpleAI):
+    """
+    打牌時參考放槍危險度的 SimpleAI：在保留價值不超過最低值 + SLACK 的牌中打 risk() 最低的一張。
+    這套計分自摸三家都要付，完全棄和（SLACK 很大）對上 SimpleAI 反而輸分；
+    預設只在保留價值相同的牌之間挑安全的，不犧牲進攻；聽牌的對手在 risk() 中權重最高。
+    有對手聽牌時可以另外放寬到 TENPAI_SLACK（對上 SimpleAI 調高到 1、2 都是輸的，所以預設 0）。
+    """
+
+    DEFEND_THREAT = 1   # 有對手的威脅度達到這個值才參考危險度（1 表示一律參考）
+    SLACK = 0           # 為了安全願意讓出多少保留價值
+    TENPAI_SLACK = 0    # 有對手聽牌時願意讓出多少保留價值
+
+    @classmethod
+    def choose_defensive_discard(cls, hand: list[Tile], index: DangerIndex, seat: int) -> Tile:
+        if index.max_threat(seat) < cls.DEFEND_THREAT:
+            return cls.choose_discard(hand)
+        keep = get_policy().keep_values(hand)
+        tenpai = any(index.tenpai[s] for s in range(4) if s != seat)
+        limit = min(keep) + (max(cls.SLACK, cls.TENPAI_SLACK) if tenpai else cls.SLACK)
+        best, best_key = None, None
+        for t, k in zip(hand, keep):
+            if k <= limit:
+                key = (index.risk(seat, t.code), k)
+                if best_key is None or key < best_key:      # 同分取手牌中較前面的一張
+                    best, best_key = t, key
+        return best
+
+    @classmethod
+    def make_agent(cls) -> Agent:
+        """需要牌局狀態（DangerIndex），所以自己產生 agent；flow.ai_agent 會改用這個。"""
+        def agent(state: HandState, decision: Decision) -> object:
+            seat = decision.player_idx
+            hand = state.players[seat].hand_tiles
+            if decision.kind == Decision.DISCARD:
+                return cls.choose_defensive_discard(hand, tracker_of(state), seat)
+            if decision.kind == Decision.REACTION:
+                return cls.choose_reaction(hand, decision.tile, decision.options)
+            if decision.kind == Decision.SELF_DRAW:
+                return True
+            return decision.options[0]
+        return agent
@@ -32,11 +32,34 @@ class Deck:
     def __str__(self) -> str:
         return " ".join([str(tile) for tile in self.tiles])
 
-    def shuffle(self):
+    def reset(self):
+        """把牌放回初始順序、重新開始摸牌（沿用同一批 Tile 物件）。"""
+        self.tiles.sort(key=lambda tile: tile.code)
+        self.front_index = 0
+        self.back_index = len(self.tiles) - 1
+
+    def shuffle(self, rng: random.Random | None = None):
+        """洗牌；傳入 rng 可得到可重現的牌序。"""
+        randint = (rng or random).randint
         for i in range(len(self.tiles) - 1, 0, -1):
-            j = random.randint(0, i)
+            j = randint(0, i)
             self.tiles[i], self.tiles[j] = self.tiles[j], self.tiles[i]
 
+    def arrange(self, codes: list[int]):
+        """依 codes 的順序排列牌庫（沿用同一批 Tile 物件）；codes 必須恰好是一副完整的牌。"""
+        pools: dict[int, list[Tile]] = {}
+        for tile in self.tiles:
+            pools.setdefault(tile.code, []).append(tile)
+        try:
+            tiles = [pools[code].pop() for code in codes]
+        except (KeyError, IndexError):
+            raise ValueError("牌序與牌庫的牌不符") from None
+        if len(tiles) != len(self.tiles):
+            raise ValueError(f"牌序應為 {len(self.tiles)} 張，收到 {len(tiles)} 張")
+        self.tiles[:] = tiles
+        self.front_index = 0
+        self.back_index = len(self.tiles) - 1
+
     def draw_from_front(self) -> Tile:
         tile = self.tiles[self.front_index]
         self.front_index += 1
@@ -0,0 +1,311 @@
+"""
+env.py — Gym 風格的強化學習環境（需要 numpy）
+
+MahjongEnv 由一位受控玩家（seat）與三位對手（預設 SimpleAI）組成，
+以 flow.play_hand 推進牌局；只有輪到受控玩家決策時才回到呼叫端。
+
+動作空間（N_ACTIONS = 41）：
+  0..33  打出該索引的牌（DISCARD）；暗槓時代表要槓的牌（CONCEALED_KONG）
+  34     略過（不碰/不吃/不胡/不暗槓）
+  35     胡（放槍胡或自摸）
+  36     碰
+  37     槓
+  38     吃，打出的牌為順子最大張（c-2, c-1）
+  39     吃，打出的牌為順子中間張（c-1, c+1）
+  40     吃，打出的牌為順子最小張（c+1, c+2）
+
+觀察值（皆以受控玩家為第 0 家，其餘依下家順序排列）：
+  hand      (34,)    自己的手牌張數
+  melds     (4, 34)  各家亮出的牌（別家的暗槓看不到是哪張牌，不計入）
+  concealed_kongs (4,)  各家暗槓的個數
+  discards  (4, 34)  各家的棄牌
+  flowers   (4,)     各家的花牌數
+  wall      ()       牌庫剩餘張數（deck.get_remaining_tiles_count()）
+  decision  ()       決策種類（DECISION_KINDS 的索引，局已結束為 -1）
+  tile      ()       相關的牌（剛摸進/別人打出），沒有為 -1
+"""
+from __future__ import annotations
+import random
+
+import numpy as np
+
+from .tile import Tile, TILE_INDEX, TILE_CODES
+from .flow import Decision, HandState, play_hand, simple_ai_agent, Agent
+
+N_TILE_TYPES = 34
+N_ACTIONS = 41
+PASS = 34
+HU = 35
+PONG = 36
+KONG = 37
+CHOW_LOW = 38     # 打出的牌在順子最大張
+CHOW_MID = 39
+CHOW_HIGH = 40    # 打出的牌在順子最小張
+
+DECISION_KINDS = (Decision.DISCARD, Decision.REACTION, Decision.SELF_DRAW, Decision.CONCEALED_KONG)
+_KIND_INDEX = {kind: i for i, kind in enumerate(DECISION_KINDS)}
+
+
+def _chow_action(tile: Tile, option: tuple[int, int]) -> int:
+    low = option[0]
+    if low == tile.code - 2:
+        return CHOW_LOW
+    if low == tile.code - 1:
+        return CHOW_MID
+    return CHOW_HIGH
+
+
+def _count(tiles: list[Tile], out: np.ndarray):
+    for t in tiles:
+        idx = TILE_INDEX.get(t.code)
+        if idx is not None:
+            out[idx] += 1
+
+
+def _count_exposed(melds: list[tuple[str, int]], out: np.ndarray):
+    """Player.melds 中別人看得到的牌：碰、明槓、吃；暗槓只知道有一組，不知道是哪張。"""
+    for kind, code in melds:
+        if kind == "chow":
+            for c in (code, code + 1, code + 2):
+                out[TILE_INDEX[c]] += 1
+        elif kind == "pong":
+            out[TILE_INDEX[code]] += 3
+        elif kind == "kong":
+            out[TILE_INDEX[code]] += 4
+
+
+class MahjongEnv:
+    """單桌環境：reset(seed) → step(action) 直到 terminated"""
+
+    def __init__(self, seat: int = 0, opponents: list[Agent] | None = None):
+        self.seat = seat
+        self.opponents = opponents or [simple_ai_agent] * 4   # 依座位索引，受控座位不使用
+        self.state: HandState | None = None
+        self.decision: Decision | None = None
+        self._flow = None
+        self._rng = random.Random()
+
+    # ── Gym API ──────────────────────────────────────
+
+    def reset(self, seed: int | None = None, dealer: int = 0) -> tuple[dict, dict]:
+        if seed is not None:
+            self._rng.seed(seed)
+        # 極少數情況下受控玩家還沒決策這局就結束了（例如對手天胡），直接重發
+        if self.state is None:
+            self.state = HandState()
+        while True:
+            self.state.reset(dealer)   # 沿用同一副牌與四位玩家的物件
+            self.state.deal(self._rng)
+            self._flow = play_hand(self.state)
+            self._advance(None, first=True)
+            if self.decision is not None:
+                return self.observe(), self._info()
+
+    def legal_actions(self) -> list[int]:
+        return legal_actions(self.decision)
+
+    def action_mask(self) -> np.ndarray:
+        mask = np.zeros(N_ACTIONS, dtype=bool)
+        mask[self.legal_actions()] = True
+        return mask
+
+    def step(self, action: int) -> tuple[dict, float, bool, bool, dict]:
+        """
+        回傳 (obs, reward, terminated, truncated, info)。這局結束（胡牌或流局）時 terminated=True；
+        流局是牌局本身的結局（reward 0），不是步數上限，所以不算 truncated。
+        """
+        if self.decision is None:
+            raise RuntimeError("這局已經結束，請先 reset()")
+        if action not in self.legal_actions():
+            raise ValueError(f"不合法的動作 {action}，可用：{self.legal_actions()}")
+
+        self._advance(self._to_answer(int(action)))
+        done = self.decision is None
+        reward = self._reward() if done else 0.0
+        return self.observe(), reward, done, False, self._info()
+
+    # ── 觀察值 ────────────────────────────────────────
+
+    def observe(self) -> dict:
+        return observe(self.state, self.seat, self.decision)
+
+    # ── 內部 ──────────────────────────────────────────
+
+    def _advance(self, answer, first: bool = False):
+        """送出答案，並讓對手自動決策，直到輪到受控玩家或這局結束。"""
+        try:
+            decision = next(self._flow) if first else self._flow.send(answer)
+            while decision.player_idx != self.seat:
+                decision = self._flow.send(self.opponents[decision.player_idx](self.state, decision))
+        except StopIteration:
+            decision = None
+        self.decision = decision
+
+    def _to_answer(self, action: int) -> object:
+        d = self.decision
+        if d.kind == Decision.DISCARD:
+            code = TILE_CODES[action]
+            return next(t for t in d.options if t.code == code)
+        if d.kind == Decision.CONCEALED_KONG:
+            return None if action == PASS else next(t for t in d.options if t.code == TILE_CODES[action])
+        if d.kind == Decision.SELF_DRAW:
+            return action == HU
+        if action == PASS:
+            return None
+        for option in d.options:
+            act, extra = option
+            if (action == HU and act == "胡") or (action == PONG and act == "碰") \
+                    or (action == KONG and act == "槓") \
+                    or (act == "吃" and action == _chow_action(d.tile, extra)):
+                return option
+        raise ValueError(action)
+
+    def _reward(self) -> float:
+        return reward(self.state, self.seat)
+
+    def _info(self) -> dict:
+        state = self.state
+        return {
+            "winner": state.winner,
+            "discarder": state.discarder,
+            "turns": state.turns,
+            "action_mask": self.action_mask(),
+        }
+
+
+class VectorEnv:
+    """
+    同步推進多個互相獨立的牌桌，回傳批次化的 NumPy 觀察值。
+    結束的牌桌會自動 reset（下一局的第一個觀察值取代結束時的觀察值，
+    結束時的觀察值放在 infos[i]["final_observation"]）。
+    """
+
+    def __init__(self, num_envs: int, seat: int = 0, opponents: list[Agent] | None = None):
+        self.envs = [MahjongEnv(seat, opponents) for _ in range(num_envs)]
+        self._next_seed = 0
+
+    @property
+    def num_envs(self) -> int:
+        return len(self.envs)
+
+    def reset(self, seed: int | None = None) -> tuple[dict, list[dict]]:
+        if seed is not None:
+            self._next_seed = seed
+        results = [env.reset(self._take_seed()) for env in self.envs]
+        return _stack([obs for obs, _ in results]), [info for _, info in results]
+
+    def action_masks(self) -> np.ndarray:
+        return np.stack([env.action_mask() for env in self.envs])
+
+    def step(self, actions) -> tuple[dict, np.ndarray, np.ndarray, np.ndarray, list[dict]]:
+        observations = []
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, rewards[i], terminated[i], truncated[i], info = env.step(int(action))
+            if terminated[i] or truncated[i]:
+                info["final_observation"] = obs
+                obs, _ = env.reset(self._take_seed())
+            observations.append(obs)
+            infos.append(info)
+        return _stack(observations), rewards, terminated, truncated, infos
+
+    def _take_seed(self) -> int:
+        seed = self._next_seed
+        self._next_seed += 1
+        return seed
+
+
+def _stack(observations: list[dict]) -> dict:
+    return {key: np.stack([obs[key] for obs in observations]) for key in observations[0]}
+
+
+# ── 編碼（MahjongEnv 與 selfplay 共用）────────────────
+
+def legal_actions(decision: Decision | None) -> list[int]:
+    """決策的合法動作（動作空間見模組說明）。"""
+    d = decision
+    if d is None:
+        return []
+    if d.kind == Decision.DISCARD:
+        return sorted({TILE_INDEX[t.code] for t in d.options})
+    if d.kind == Decision.CONCEALED_KONG:
+        return [TILE_INDEX[t.code] for t in d.options] + [PASS]
+    if d.kind == Decision.SELF_DRAW:
+        return [HU, PASS]
+
+    actions = []
+    for action, extra in d.options:
+        if action == "胡":
+            actions.append(HU)
+        elif action == "碰":
+            actions.append(PONG)
+        elif action == "槓":
+            actions.append(KONG)
+        else:
+            actions.append(_chow_action(d.tile, extra))
+    return sorted(actions) + [PASS]
+
+
+def action_of(decision: Decision, answer: object) -> int:
+    """把 agent 對 decision 的回答轉成動作編號（MahjongEnv._to_answer 的反向）。"""
+    kind = decision.kind
+    if kind == Decision.DISCARD:
+        return TILE_INDEX[answer.code]
+    if kind == Decision.CONCEALED_KONG:
+        return PASS if answer is None else TILE_INDEX[answer.code]
+    if kind == Decision.SELF_DRAW:
+        return HU if answer else PASS
+    if answer is None:
+        return PASS
+    action, extra = answer
+    if action == "胡":
+        return HU
+    if action == "碰":
+        return PONG
+    if action == "槓":
+        return KONG
+    return _chow_action(decision.tile, extra)
+
+
+def observe(state: HandState, seat: int, decision: Decision | None) -> dict:
+    """seat 的觀察值（以 seat 為第 0 家，其餘依下家順序排列）。"""
+    order = [(seat + i) % 4 for i in range(4)]
+    melds = np.zeros((4, N_TILE_TYPES), dtype=np.int8)
+    discards = np.zeros((4, N_TILE_TYPES), dtype=np.int8)
+    concealed_kongs = np.zeros(4, dtype=np.int8)
+    hand = np.zeros(N_TILE_TYPES, dtype=np.int8)
+    for row, idx in enumerate(order):
+        p = state.players[idx]
+        if idx == seat:
+            _count(p.melded_tiles, melds[row])
+        else:
+            _count_exposed(p.melds, melds[row])
+        concealed_kongs[row] = sum(1 for kind, _ in p.melds if kind == "concealed_kong")
+        _count(p.discarded_tiles, discards[row])
+    _count(state.players[seat].hand_tiles, hand)
+
+    d = decision
+    return {
+        "hand": hand,
+        "melds": melds,
+        "discards": discards,
+        "concealed_kongs": concealed_kongs,
+        "flowers": np.array([len(state.players[i].flower_tiles) for i in order], dtype=np.int8),
+        "wall": np.int16(state.deck.get_remaining_tiles_count()),
+        "decision": np.int8(_KIND_INDEX[d.kind] if d else -1),
+        "tile": np.int8(TILE_INDEX.get(d.tile.code, -1) if d and d.tile else -1),
+    }
+
+
+def reward(state: HandState, seat: int) -> float:
+    """胡牌 +1；放槍 -1；別家自摸 -1/3（三家分攤）；流局或別人放槍 0。"""
+    if state.winner == seat:
+        return 1.0
+    if state.discarder == seat:
+        return -1.0
+    if state.winner is not None and state.discarder is None:
+        return -1.0 / 3
+    return 0.0
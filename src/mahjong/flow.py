@@ -0,0 +1,418 @@
+"""
+flow.py — 不依賴 curses 的牌局流程
+
+play_hand() 以 generator 實作與 Game 相同的一局流程（補花、暗槓、自摸、打牌、
+碰/槓/吃/胡、流局），每當需要玩家決策時就 yield 一個 Decision，
+由呼叫端 send() 回答案後繼續。這樣同一套流程可以由不同的驅動方式使用：
+同步的 AI 模擬（run_hand）、強化學習環境（env.py）等。
+
+Decision 的答案：
+  DISCARD         要打出的 Tile（必須是手牌中的物件）
+  REACTION        options 中的一個 (action, extra)，或 None 表示略過
+  SELF_DRAW       True 胡 / False 不胡
+  CONCEALED_KONG  options 中要暗槓的 Tile，或 None 表示不槓
+"""
+from __future__ import annotations
+import random
+from typing import Callable, Generator
+
+from .tile import Tile
+from .deck import Deck
+from .player import Player
+from .rule_engine import RuleEngine
+from .ai import SimpleAI
+
+
+class Decision:
+    """牌局流程暫停、等待某位玩家決策的請求"""
+
+    DISCARD = "discard"
+    REACTION = "reaction"
+    SELF_DRAW = "self_draw"
+    CONCEALED_KONG = "concealed_kong"
+
+    __slots__ = ("kind", "player_idx", "tile", "options")
+
+    kind: str
+    player_idx: int
+    tile: Tile | None       # 剛摸進的牌（DISCARD/SELF_DRAW）或別人打出的牌（REACTION）
+    options: list           # REACTION: [(action, extra), ...]；CONCEALED_KONG: [Tile, ...]
+
+    def __init__(self, kind: str, player_idx: int, tile: Tile | None = None, options: list | None = None):
+        self.kind = kind
+        self.player_idx = player_idx
+        self.tile = tile
+        self.options = options if options is not None else []
+
+    def __repr__(self) -> str:
+        return f"Decision({self.kind}, player={self.player_idx}, tile={self.tile}, options={self.options})"
+
+
+class HandState:
+    """一局牌的狀態：牌庫、四位玩家與結果"""
+
+    deck: Deck
+    players: list[Player]
+    dealer: int
+    current_player: int
+    current_wind: int
+    winner: int | None
+    discarder: int | None       # 放槍者（自摸或流局為 None）
+    winning_tile: Tile | None
+    self_drawn: bool
+    kong_replacement: bool      # 槓上開花（胡的是槓後補進的牌）
+    flower_win: bool            # 八仙過海
+    turns: int                  # 已打出幾張牌
+    trackers: list              # 跟著牌局更新的公開資訊索引（例如 danger.DangerIndex）
+
+    def __init__(self, dealer: int = 0, current_wind: int = 1):
+        self.deck = Deck()
+        self.players = [Player() for _ in range(4)]
+        self.trackers = []
+        self.reset(dealer, current_wind)
+
+    def reset(self, dealer: int = 0, current_wind: int = 1):
+        """回到發牌前的狀態，沿用原本的 Deck / Player 物件（多局連打時不必重建）。"""
+        self.deck.reset()
+        for player in self.players:
+            player.reset()
+        self.dealer = dealer
+        self.current_player = dealer
+        self.current_wind = current_wind
+        self.winner = None
+        self.discarder = None
+        self.winning_tile = None
+        self.self_drawn = False
+        self.kong_replacement = False
+        self.flower_win = False
+        self.turns = 0
+        for tracker in self.trackers:
+            tracker.reset()
+
+    def deal(self, rng: random.Random | None = None, wall: list[int] | None = None):
+        """洗牌並發 16 張手牌。wall 為指定的牌序（144 張的 code，例如重播紀錄時），此時不洗牌。"""
+        if wall is None:
+            self.deck.shuffle(rng)
+        else:
+            self.deck.arrange(wall)
+        for _ in range(16):
+            for player in self.players:
+                player.add_tile_to_hand(self.deck.draw_from_front())
+        for player in self.players:
+            player.order_hand()
+
+    @property
+    def is_draw(self) -> bool:
+        return self.winner is None
+
+
+# ── 流程 ──────────────────────────────────────────────
+
+def play_hand(state: HandState) -> Generator[Decision, object, None]:
+    """
+    執行一局（需先 deal()）。每次需要決策時 yield Decision，結束時 return。
+    結果寫在 state.winner / discarder / winning_tile 等欄位。
+    """
+    # 發牌後補花 + 暗槓（初始手牌）
+    for i in range(4):
+        idx = (state.dealer + i) % 4
+        is_over, _ = _handle_flowers(state, idx)
+        if is_over:
+            return
+        is_over, _ = yield from _handle_concealed_kong(state, idx)
+        if is_over:
+            return
+
+    while True:
+        is_over = yield from _play_turn(state)
+        if is_over:
+            return
+
+
+def _handle_flowers(state: HandState, idx: int) -> tuple[bool, Tile | None]:
+    """補花。回傳 (是否結束, 最後摸進的牌)。"""
+    player = state.players[idx]
+    last_drawn = None
+    while True:
+        flowers = [t for t in player.hand_tiles if t.get_suit() == 5]
+        if not flowers:
+            break
+        for f in flowers:
+            player.declare_replace_flower(f)
+            last_drawn = state.deck.draw_from_back()
+            player.add_tile_to_hand(last_drawn)
+        player.order_hand()
+
+        if len(player.flower_tiles) >= 8:
+            player.is_winner = True
+            state.winner = idx
+            state.self_drawn = True
+            state.flower_win = True
+            return True, last_drawn
+    return False, last_drawn
+
+
+def _handle_concealed_kong(state: HandState, idx: int):
+    """暗槓（可連續多次）。回傳 (是否結束, 最後摸進的牌)。"""
+    player = state.players[idx]
+    last_drawn = None
+    while True:
+        kong_tiles = RuleEngine.can_concealed_kong(player.hand_tiles)
+        if not kong_tiles:
+            return False, last_drawn
+
+        choice = yield Decision(Decision.CONCEALED_KONG, idx, options=kong_tiles)
+        if choice is None:
+            return False, last_drawn
+        tile = _pick(choice, kong_tiles)
+
+        player.declare_concealed_kong(tile)
+        for tracker in state.trackers:
+            tracker.on_meld(idx, (tile.code,) * 4, concealed=True)
+        last_drawn = state.deck.draw_from_back()
+        player.add_tile_to_hand(last_drawn)
+        player.order_hand()
+        is_over, drawn = _handle_flowers(state, idx)
+        if drawn is not None:
+            last_drawn = drawn
+        if is_over:
+            return True, last_drawn
+
+
+def _play_turn(state: HandState):
+    """執行目前玩家的回合。回傳 True 表示這局結束。"""
+    idx = state.current_player
+    player = state.players[idx]
+
+    # 1. 摸牌（剩 8 墩流局）
+    if state.deck.get_remaining_tiles_count() <= 16:
+        return True
+
+    tile = state.deck.draw_from_front()
+    player.add_tile_to_hand(tile)
+    player.order_hand()
+    from_kong = False
+
+    # 2. 補花
+    is_over, drawn = _handle_flowers(state, idx)
+    if drawn is not None:
+        tile = drawn
+    if is_over:
+        return True
+
+    # 3. 暗槓
+    is_over, drawn = yield from _handle_concealed_kong(state, idx)
+    if drawn is not None:
+        tile = drawn
+        from_kong = True
+    if is_over:
+        return True
+
+    # 4. 自摸
+    if player.can_win_self_drawn(tile):
+        if (yield Decision(Decision.SELF_DRAW, idx, tile)):
+            player.declare_hu(None)
+            state.winner = idx
+            state.discarder = None
+            state.winning_tile = tile
+            state.self_drawn = True
+            state.kong_replacement = from_kong
+            return True
+
+    # 5. 打牌 → 處理反應
+    discard = yield Decision(Decision.DISCARD, idx, tile, player.hand_tiles)
+    return (yield from _discard_and_react(state, idx, discard))
+
+
+def _discard_and_react(state: HandState, idx: int, discard: Tile):
+    """打出一張牌後處理其他玩家的反應；碰/槓/吃的人接著打牌，直到沒人反應。"""
+    while True:
+        player = state.players[idx]
+        discard = _pick(discard, player.hand_tiles)
+        player.discard_tile(discard)
+        state.turns += 1
+        for tracker in state.trackers:
+            tracker.on_discard(idx, discard)
+
+        result = yield from _prompt_reactions(state, idx, discard)
+        if result is None:
+            state.current_player = (idx + 1) % 4
+            return False
+
+        winner_idx, action, extra = result
+        winner = state.players[winner_idx]
+        new_drawn = None
+
+        if action == "胡":
+            winner.declare_hu(discard)
+            state.winner = winner_idx
+            state.discarder = idx
+            state.winning_tile = discard
+            return True
+
+        if action == "碰":
+            winner.declare_pong(discard)
+            _notify_meld(state, winner_idx, (discard.code,) * 2)
+        elif action == "槓":
+            winner.declare_kong(discard)
+            _notify_meld(state, winner_idx, (discard.code,) * 3)
+            extra_tile = state.deck.draw_from_back()
+            winner.add_tile_to_hand(extra_tile)
+            winner.order_hand()
+            new_drawn = extra_tile
+            is_over, drawn = _handle_flowers(state, winner_idx)
+            if drawn is not None:
+                new_drawn = drawn
+            if is_over:
+                return True
+        elif action == "吃":
+            winner.declare_chow(discard, extra)
+            _notify_meld(state, winner_idx, tuple(extra))
+
+        # 碰/槓/吃 後：winner_idx 打一張牌，再處理反應
+        state.current_player = winner_idx
+        idx = winner_idx
+        discard = yield Decision(Decision.DISCARD, idx, new_drawn, winner.hand_tiles)
+
+
+def _notify_meld(state: HandState, idx: int, codes: tuple[int, ...]):
+    """碰/槓/吃：codes 是從手牌拿出來的牌。"""
+    for tracker in state.trackers:
+        tracker.on_meld(idx, codes)
+
+
+def _prompt_reactions(state: HandState, discarder: int, tile: Tile):
+    """依座位順序詢問其他玩家是否碰/槓/吃/胡（與 Game._prompt_reactions 相同的規則）。"""
+    priority = {"胡": 0, "碰": 1, "槓": 1, "吃": 2}
+
+    for offset in range(1, 4):
+        idx = (discarder + offset) % 4
+        actions = legal_reactions(state.players[idx], tile, is_next=(offset == 1))
+        if not actions:
+            continue
+        actions.sort(key=lambda a: priority[a[0]])
+
+        choice = yield Decision(Decision.REACTION, idx, tile, actions)
+        if choice is None:
+            continue
+        if tuple(choice) not in [tuple(a) for a in actions]:
+            raise ValueError(f"玩家 {idx} 不能 {choice}")
+        action, extra = choice
+        return idx, action, extra
+
+    return None
+
+
+def legal_reactions(player: Player, tile: Tile, is_next: bool) -> list[tuple[str, object]]:
+    """玩家對別人打出的 tile 可以做的反應（只有下家可以吃）。"""
+    actions: list[tuple[str, object]] = []
+    if player.can_win_with(tile):
+        actions.append(("胡", None))
+    if RuleEngine.can_pong(player.hand_tiles, tile):
+        actions.append(("碰", None))
+    if RuleEngine.can_kong(player.hand_tiles, tile):
+        actions.append(("槓", None))
+    if is_next:
+        for opt in RuleEngine.can_chow(player.hand_tiles, tile):
+            actions.append(("吃", opt))
+    return actions
+
+
+def _pick(tile: Tile, tiles: list[Tile]) -> Tile:
+    """把答案對應到 tiles 中的實際物件（可傳入同 code 的任何 Tile）。"""
+    for t in tiles:
+        if t is tile:
+            return t
+    for t in tiles:
+        if t == tile:
+            return t
+    raise ValueError(f"{tile!r} 不在可選的牌中")
+
+
+# ── 答案 ──────────────────────────────────────────────
+
+NO_ANSWER = 255     # 反應、暗槓的「不要」
+
+
+def is_legal(decision: Decision, answer: object) -> bool:
+    """answer 是不是 decision 可以接受的答案（與 play_hand 的檢查相同，但不丟例外）。"""
+    if decision.kind == Decision.DISCARD:
+        return isinstance(answer, Tile) and answer in decision.options
+    if decision.kind == Decision.SELF_DRAW:
+        return isinstance(answer, bool)
+    if answer is None:
+        return True
+    if decision.kind == Decision.REACTION:
+        return isinstance(answer, (tuple, list)) and tuple(answer) in [tuple(a) for a in decision.options]
+    return isinstance(answer, Tile) and answer in decision.options
+
+
+def encode_answer(decision: Decision, answer: object) -> int:
+    """
+    答案 -> 0–255 的整數（紀錄檔與遠端玩家共用）：
+    打牌為牌的 code；反應與暗槓為 options 的索引（不要為 NO_ANSWER）；自摸為 1/0。
+    """
+    if decision.kind == Decision.DISCARD:
+        return answer.code
+    if decision.kind == Decision.SELF_DRAW:
+        return 1 if answer else 0
+    if answer is None:
+        return NO_ANSWER
+    if decision.kind == Decision.REACTION:
+        answer = tuple(answer)
+        return next(i for i, option in enumerate(decision.options) if tuple(option) == answer)
+    return next(i for i, tile in enumerate(decision.options) if tile == answer)
+
+
+def decode_answer(decision: Decision, value: int) -> object:
+    """encode_answer 的反向；value 不合法時丟出 ValueError。"""
+    if decision.kind == Decision.DISCARD:
+        return Tile(value)
+    if decision.kind == Decision.SELF_DRAW:
+        return bool(value)
+    if value == NO_ANSWER:
+        return None
+    if not 0 <= value < len(decision.options):
+        raise ValueError(f"沒有第 {value} 個選項")
+    return decision.options[value]
+
+
+# ── 同步驅動 ──────────────────────────────────────────
+
+Agent = Callable[[HandState, Decision], object]
+
+
+def ai_agent(ai: type[SimpleAI] = SimpleAI) -> Agent:
+    """
+    把 SimpleAI（或其子類別）包成 Agent，回答任何決策（與 Game 中 AI 玩家的行為相同）。
+    需要牌局狀態的策略（例如 danger.DefensiveAI）可以定義 make_agent() 自己產生 agent。
+    """
+    make_agent = getattr(ai, "make_agent", None)
+    if make_agent is not None:
+        return make_agent()
+    def agent(state: HandState, decision: Decision) -> object:
+        hand = state.players[decision.player_idx].hand_tiles
+        if decision.kind == Decision.DISCARD:
+            return ai.choose_discard(hand)
+        if decision.kind == Decision.REACTION:
+            return ai.choose_reaction(hand, decision.tile, decision.options)
+        if decision.kind == Decision.SELF_DRAW:
+            return True
+        return decision.options[0]   # CONCEALED_KONG：有就槓
+    return agent
+
+
+simple_ai_agent: Agent = ai_agent(SimpleAI)
+
+
+def run_hand(state: HandState, agents: list[Agent] | None = None) -> HandState:
+    """以同步的 agent 函式跑完一局（預設四家都是 SimpleAI）。"""
+    agents = agents or [simple_ai_agent] * 4
+    flow = play_hand(state)
+    try:
+        decision = next(flow)
+        while True:
+            decision = flow.send(agents[decision.player_idx](state, decision))
+    except StopIteration:
+        pass
+    return state
@@ -1,12 +1,26 @@
 from __future__ import annotations
+import asyncio
 import curses
+import threading
 
 from .tile import Tile
 from .deck import Deck
 from .player import Player
 from .rule_engine import RuleEngine
+from .advisor import TenpaiAdvisor
 from .ai import SimpleAI
-from . import ui
+from .state import GameState
+from .scoring import ScoreResult, score_hand
+from .session import Session
+from .flow import Decision, HandState
+from . import aioflow, ui
+
+# aioflow 代打的原因 -> 顯示文字
+_SUBSTITUTED = {aioflow.TIMEOUT: "逾時", aioflow.ERROR: "出錯", aioflow.ILLEGAL: "答案不合法"}
+
+
+def _reaction_label(action: str, extra: object) -> str:
+    return f"吃 {Tile(extra[0])}{Tile(extra[1])}" if action == "吃" else action
 
 
 class Game:
@@ -16,14 +30,33 @@ class Game:
         self.players = [Player() for _ in range(4)]
         self.current_player = 0
         self.current_wind = 1
+        self.dealer = 0
+        self.dealer_streak = 0
         # ai_players: 哪幾位玩家由 AI 操作，預設 1/2/3
         self.ai_players: set[int] = ai_players if ai_players is not None else {1, 2, 3}
         self._show_advice = True   # 是否顯示聽牌建議
+        self.advisor = TenpaiAdvisor()   # 聽牌建議在背景計算，依手牌內容快取
         self._winner: int | None = None      # 胡牌者
         self._discarder: int | None = None   # 放槍者（自摸為 None）
-        self._winning_tile: Tile | None = None  # 胡的那張牌
+        self._winning_tile: Tile | None = None  # 胡的那張牌（自摸為摸進的牌，花胡為 None）
+        self._kong_replacement = False          # 自摸的是暗槓後補進的牌（槓上開花）
         self._last_discard_info: str = ""   # 常駐顯示在分隔線下方
 
+    def reset_hand(self, dealer: int = 0, current_wind: int = 1, dealer_streak: int = 0):
+        """準備下一局：沿用同一副 Deck 與四個 Player，只清空內容。"""
+        self.deck.reset()
+        for player in self.players:
+            player.reset()
+        self.dealer = dealer
+        self.dealer_streak = dealer_streak
+        self.current_player = dealer
+        self.current_wind = current_wind
+        self._winner = None
+        self._discarder = None
+        self._winning_tile = None
+        self._kong_replacement = False
+        self._last_discard_info = ""
+
     def start_game(self):
         self.deck.shuffle()
         for _ in range(16):
@@ -32,6 +65,48 @@ class Game:
         for player in self.players:
             player.order_hand()
 
+    # ── 結果（與 flow.HandState 同名的公開欄位，GameState 經由這些欄位存取）──
+
+    @property
+    def winner(self) -> int | None:
+        return self._winner
+
+    @winner.setter
+    def winner(self, value: int | None):
+        self._winner = value
+
+    @property
+    def discarder(self) -> int | None:
+        return self._discarder
+
+    @discarder.setter
+    def discarder(self, value: int | None):
+        self._discarder = value
+
+    @property
+    def winning_tile(self) -> Tile | None:
+        return self._winning_tile
+
+    @winning_tile.setter
+    def winning_tile(self, value: Tile | None):
+        self._winning_tile = value
+
+    @property
+    def kong_replacement(self) -> bool:
+        return self._kong_replacement
+
+    @kong_replacement.setter
+    def kong_replacement(self, value: bool):
+        self._kong_replacement = value
+
+    def snapshot(self) -> bytes:
+        """把目前牌局（不含畫面）序列化成 bytes。"""
+        return GameState.capture(self).to_bytes()
+
+    def restore(self, data: bytes):
+        """由 snapshot() 的結果還原牌局。"""
+        GameState.from_bytes(data).apply_to(self)
+
     def _end_game(self):
         self._show_msg("遊戲結束！", pause=True)
 
@@ -53,6 +128,9 @@ class Game:
 
             if len(player.flower_tiles) >= 8:
                 player.is_winner = True
+                self._winner = player_idx
+                self._discarder = None
+                self._winning_tile = None
                 self._show_msg(f"玩家 {player_idx} 集齊八花，花胡！", pause=True)
                 return True, last_drawn
         return False, last_drawn
@@ -66,13 +144,6 @@ class Game:
 
     # ── 暗槓 ──────────────────────────────────────────
 
-    def _apply_concealed_kong(self, player_idx: int, current_tile: Tile | None) -> tuple[bool, Tile | None]:
-        """執行暗槓（可能連續多次）並更新 current_tile（若有摸進新牌就覆蓋）。"""
-        is_over, drawn = self._handle_concealed_kong(player_idx, newly_drawn=current_tile)
-        if drawn is not None:
-            current_tile = drawn
-        return is_over, current_tile
-
     def _do_concealed_kong(self, player_idx: int, tile: Tile, actor_tag: str) -> tuple[bool, Tile | None]:
         """執行一次暗槓流程（宣告→補槓牌→補花），回傳 (是否結束遊戲, 最後摸進的牌)。"""
         player = self.players[player_idx]
@@ -159,27 +230,24 @@ class Game:
             self.stdscr.refresh()
             return tile
 
-        # 聽牌建議
-        advice = RuleEngine.get_tenpai_advice(player.hand_tiles) if self._show_advice else None
+        # 聽牌建議：摸牌時已開始在背景計算，這裡拿到的多半已經算好
+        idx = ui.select_from_hand(
+            self.stdscr,
+            self.players,
+            player_idx,
+            self.ai_players,
+            self.deck.get_remaining_tiles_count(),
+            advice=self.advisor.request(player.hand_tiles),
+            newly_drawn=newly_drawn,
+            msg=f"玩家 {player_idx}，請選擇要打出的牌",
+            sub_msg=self._last_discard_info,
+            show_advice=self._show_advice,
+            on_toggle_advice=self._set_show_advice,
+        )
+        return player.hand_tiles[idx]
 
-        while True:
-            idx = ui.select_from_hand(
-                self.stdscr,
-                self.players,
-                player_idx,
-                self.ai_players,
-                self.deck.get_remaining_tiles_count(),
-                advice=advice,
-                newly_drawn=newly_drawn,
-                msg=f"玩家 {player_idx}，請選擇要打出的牌",
-                sub_msg=self._last_discard_info,
-            )
-            if idx == -1:
-                # 玩家按了 ? — 切換聽牌建議
-                self._show_advice = not self._show_advice
-                advice = RuleEngine.get_tenpai_advice(player.hand_tiles) if self._show_advice else None
-            else:
-                return player.hand_tiles[idx]
+    def _set_show_advice(self, show: bool):
+        self._show_advice = show
 
     # ── 其他玩家對棄牌的反應 ───────────────────────────
 
@@ -197,7 +265,7 @@ class Game:
             player = self.players[idx]
             actions: list[tuple[str, object]] = []
 
-            if RuleEngine.is_hu(player.hand_tiles, tile):
+            if player.can_win_with(tile):
                 actions.append(("胡", None))
             if RuleEngine.can_pong(player.hand_tiles, tile):
                 actions.append(("碰", None))
@@ -340,15 +408,26 @@ class Game:
         if is_over:
             return True
 
-        # 3. 暗槓（摸進來的暗槓）
-        is_over, tile = self._apply_concealed_kong(idx, tile)
+        # 3. 暗槓（摸進來的暗槓）；之後自摸的是槓後補進的牌
+        is_over, drawn = self._handle_concealed_kong(idx, newly_drawn=tile)
+        if drawn is not None:
+            tile = drawn
         if is_over:
             return True
+        from_kong = drawn is not None
+
+        # 補花、暗槓之後手牌才確定（也不會有花牌），這時才開始在背景算聽牌建議
+        if idx not in self.ai_players:
+            self.advisor.prefetch(player.hand_tiles)
 
         # 4. 自摸判斷
-        if RuleEngine.is_hu(player.hand_tiles, None):
+        if player.can_win_self_drawn(tile):
             if idx in self.ai_players:
                 player.declare_hu(None)
+                self._winner = idx
+                self._discarder = None
+                self._winning_tile = tile
+                self._kong_replacement = from_kong
                 self._show_msg(f"*** 玩家 {idx} 自摸胡牌！ ***", pause=True)
                 return True
             confirmed = ui.prompt_yn(
@@ -365,7 +444,8 @@ class Game:
                 player.declare_hu(None)
                 self._winner = idx
                 self._discarder = None
-                self._winning_tile = None
+                self._winning_tile = tile
+                self._kong_replacement = from_kong
                 self._show_msg(f"*** 玩家 {idx} 自摸胡牌！ ***", pause=True)
                 return True
 
@@ -376,6 +456,128 @@ class Game:
         self._show_msg(f"玩家 {idx} 打出：{discard}", pause=False)
         return self._after_discard(idx, discard)
 
+    # ── asyncio 驅動 ──────────────────────────────────
+
+    async def play_hand_async(self, turn_timeout: float | None = None):
+        """
+        同 play_hand，但由 aioflow.run_hand_async 驅動：人類玩家在背景執行緒等鍵盤，
+        事件迴圈不會被卡住；每個決策限時 turn_timeout 秒，逾時由 SimpleAI 代打。
+        """
+        state = HandState()
+        state.deck, state.players = self.deck, self.players
+        state.reset(self.dealer, self.current_wind)
+        state.deal()
+        human = self._human_agent()
+        agents = [aioflow.ai() if i in self.ai_players else human for i in range(4)]
+        await aioflow.run_hand_async(state, agents, timeouts=turn_timeout, observer=self._observe)
+
+        self.current_player = state.current_player
+        self._winner = state.winner
+        self._discarder = state.discarder
+        self._winning_tile = state.winning_tile
+        self._kong_replacement = state.kong_replacement
+        if state.winner is None:
+            msg = "牌已剩 8 墩，流局！"
+        elif state.discarder is None:
+            msg = f"*** 玩家 {state.winner} 自摸胡牌！ ***"
+        else:
+            msg = f"*** 玩家 {state.winner} 胡牌！玩家 {state.discarder} 放槍（{state.winning_tile}） ***"
+        await asyncio.to_thread(self._show_msg, msg, True)
+
+    def _human_agent(self) -> aioflow.AsyncAgent:
+        """本機玩家的 AsyncAgent：ui 的輸入函式在背景執行緒執行，回合逾時就取消畫面。"""
+        async def agent(state: HandState, decision: Decision) -> object:
+            cancel = threading.Event()
+            task = asyncio.ensure_future(asyncio.to_thread(self._ask_human, decision, cancel.is_set))
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # 逾時：讓畫面函式結束（不再讀鍵盤）之後才交給代打，避免兩邊同時畫
+                cancel.set()
+                await task
+                raise
+        return agent
+
+    def _ask_human(self, decision: Decision, cancelled) -> object:
+        idx = decision.player_idx
+        player = self.players[idx]
+        remaining = self.deck.get_remaining_tiles_count()
+        self.current_player = idx
+
+        if decision.kind == Decision.DISCARD:
+            sel = ui.select_from_hand(
+                self.stdscr, self.players, idx, self.ai_players, remaining,
+                advice=self.advisor.request(player.hand_tiles),
+                newly_drawn=decision.tile,
+                msg=f"玩家 {idx}，請選擇要打出的牌",
+                sub_msg=self._last_discard_info,
+                show_advice=self._show_advice,
+                on_toggle_advice=self._set_show_advice,
+                cancelled=cancelled,
+            )
+            return None if sel is None else player.hand_tiles[sel]
+
+        if decision.kind == Decision.SELF_DRAW:
+            return ui.prompt_yn(
+                self.stdscr, self.players, idx, self.ai_players, remaining,
+                question=f"玩家 {idx} 可以自摸！要胡嗎？(y/n)",
+                newly_drawn=decision.tile,
+                sub_msg=self._last_discard_info,
+                cancelled=cancelled,
+            )
+
+        if decision.kind == Decision.REACTION:
+            labels = [_reaction_label(action, extra) for action, extra in decision.options]
+            msg = f"玩家 {idx} 可以 —（{self._last_discard_info.removeprefix('上一手：')}）"
+        else:
+            labels = [f"暗槓 {t}" for t in decision.options]
+            msg = f"玩家 {idx} 可以暗槓"
+        sel = ui.select_from_options(
+            self.stdscr, self.players, idx, self.ai_players, remaining,
+            labels + ["略過"], msg=msg, sub_msg=self._last_discard_info, cancelled=cancelled,
+        )
+        if sel is None or sel == len(labels):
+            return None
+        return decision.options[sel]
+
+    async def _observe(self, state: HandState, decision: Decision, answer: object, substituted: str | None):
+        """每個答案送進流程前顯示在狀態列（與同步版 _show_msg 的訊息相同）。"""
+        idx = decision.player_idx
+        self.current_player = idx
+        tag = "[AI] " if idx in self.ai_players else ""
+        note = f"（{_SUBSTITUTED[substituted]}，由 AI 代打）" if substituted else ""
+        if decision.kind == Decision.DISCARD:
+            self._last_discard_info = f"上一手：玩家 {idx} 打出 {answer}"
+            msg = f"{tag}玩家 {idx} 打出：{answer}"
+        elif answer is None or answer is False:
+            if not note:
+                return
+            msg = f"{tag}玩家 {idx} 略過"
+        elif decision.kind == Decision.REACTION:
+            msg = f"{tag}玩家 {idx}：{_reaction_label(*answer)}"
+        elif decision.kind == Decision.SELF_DRAW:
+            msg = f"{tag}玩家 {idx} 自摸"
+        else:
+            msg = f"{tag}玩家 {idx} 暗槓：{answer}"
+        self._show_msg(msg + note)
+
+    async def _run_async(self, turn_timeout: float | None, session: Session | None):
+        if session is None:
+            await self.play_hand_async(turn_timeout)
+            await asyncio.to_thread(self._show_result, "按任意鍵退出")
+            return
+        while not session.finished:
+            self.reset_hand(session.dealer, session.prevailing_wind, session.dealer_streak)
+            self._last_discard_info = f"{session.round_name}（莊家：玩家 {session.dealer}）"
+            await self.play_hand_async(turn_timeout)
+            result = self._score()
+            session.record(self._winner, self._discarder, result.tai if result else 0)
+            await asyncio.to_thread(
+                self._show_result,
+                "按任意鍵進入下一局" if not session.finished else "按任意鍵查看總成績",
+                result, session)
+        await asyncio.to_thread(self._show_standings, session)
+
     # ── 主迴圈 ────────────────────────────────────────
 
     def run(self):
@@ -385,23 +587,80 @@ class Game:
         # 開局設定
         self.ai_players = ui.setup_screen(self.stdscr)
 
+        self.play_hand()
+        self._show_result("按任意鍵退出")
+        self.advisor.close()
+
+    def run_session(self, session: Session | None = None):
+        """連續打完一將（預設四圈），每局之間顯示結算與累計分數。"""
+        ui.init_colors()
+        curses.curs_set(0)
+
+        self.ai_players = ui.setup_screen(self.stdscr)
+        session = session or Session()
+
+        while not session.finished:
+            self.reset_hand(session.dealer, session.prevailing_wind, session.dealer_streak)
+            self._last_discard_info = f"{session.round_name}（莊家：玩家 {session.dealer}）"
+            self.play_hand()
+            result = self._score()
+            session.record(self._winner, self._discarder, result.tai if result else 0)
+            self._show_result("按任意鍵進入下一局" if not session.finished else "按任意鍵查看總成績",
+                              result, session)
+
+        self._show_standings(session)
+        self.advisor.close()
+
+    def run_async(self, turn_timeout: float | None = None, session: Session | None = None):
+        """同 run（給 session 時同 run_session），但以 asyncio 驅動；見 play_hand_async。"""
+        ui.init_colors()
+        curses.curs_set(0)
+
+        self.ai_players = ui.setup_screen(self.stdscr)
+        asyncio.run(self._run_async(turn_timeout, session))
+        self.advisor.close()
+
+    def play_hand(self):
+        """發牌並打完一局（結果寫在 _winner / _discarder / _winning_tile）。"""
         self.start_game()
 
-        # 發牌後補花 + 暗槓（初始手牌）
+        # 發牌後補花 + 暗槓（初始手牌），從莊家開始
         for i in range(4):
-            if self._handle_flowers(i)[0]:
+            idx = (self.dealer + i) % 4
+            if self._handle_flowers(idx)[0]:
                 self._end_game()
                 return
-            self.players[i].order_hand()
-            if self._handle_concealed_kong(i)[0]:
+            self.players[idx].order_hand()
+            if self._handle_concealed_kong(idx)[0]:
                 self._end_game()
                 return
-            self.players[i].order_hand()
+            self.players[idx].order_hand()
 
         while True:
             if self.play_turn():
                 break
 
+    def _score(self) -> ScoreResult | None:
+        """與 scoring.score_state 相同的計台（海底：胡牌時牌庫只剩 8 墩）。"""
+        if self._winner is None:
+            return None
+        return score_hand(
+            self.players[self._winner],
+            self._winning_tile,
+            seat=self._winner,
+            dealer=self.dealer,
+            prevailing_wind=self.current_wind,
+            self_drawn=self._discarder is None,
+            dealer_streak=self.dealer_streak,
+            last_tile=self.deck.get_remaining_tiles_count() <= 16,
+            kong_replacement=self._kong_replacement,
+        )
+
+    def _show_result(self, hint: str, result: ScoreResult | None = None, session: Session | None = None):
+        """結果畫面：勝負、台數、各家最終手牌；session 模式另外顯示這局輸贏與累計分數。"""
+        if result is None:
+            result = self._score()
+
         # 結果畫面
         self.stdscr.clear()
         ui._safe_addstr(self.stdscr, 0, 0, "遊戲結束！",
@@ -417,9 +676,16 @@ class Game:
                 summary = (f"玩家 {self._winner}{winner_ai} 胡牌{tile_str}  "
                            f"玩家 {self._discarder}{discarder_ai} 放槍")
             else:
-                summary = f"玩家 {self._winner}{winner_ai} 自摸胡牌"
+                tile_str = f"（{self._winning_tile}）" if self._winning_tile else ""
+                summary = f"玩家 {self._winner}{winner_ai} 自摸胡牌{tile_str}"
             ui._safe_addstr(self.stdscr, row, 0, summary,
                             curses.color_pair(ui.COLOR_WIN) | curses.A_BOLD)
+            row += 1
+
+            # 台數
+            patterns = "、".join(f"{name} {tai}" for name, tai in result.patterns)
+            ui._safe_addstr(self.stdscr, row, 0, f"{result.tai} 台：{patterns}",
+                            curses.color_pair(ui.COLOR_ADVICE))
         row += 2
 
         for i, p in enumerate(self.players):
@@ -447,6 +713,33 @@ class Game:
                 self.stdscr, p.hand_tiles, "手: ", row, col=2, attr=attr)
             row += 1   # 空一行分隔
 
+        if session is not None:
+            entry = session.history[-1]
+            ui._safe_addstr(self.stdscr, row, 0, "本局輸贏：" + "  ".join(
+                f"玩家 {i} {d:+d}" for i, d in enumerate(entry.deltas)))
+            ui._safe_addstr(self.stdscr, row + 1, 0, "累計分數：" + "  ".join(
+                f"玩家 {i} {score:+d}" for i, score in enumerate(session.scores)))
+
+        ui.draw_hint_bar(self.stdscr, hint)
+        self.stdscr.refresh()
+        self.stdscr.getch()
+
+    def _show_standings(self, session: Session):
+        """整將結束：依累計分數排名，列出每局結果。"""
+        self.stdscr.clear()
+        ui._safe_addstr(self.stdscr, 0, 0, f"一將結束！共 {len(session.history)} 局",
+                        curses.color_pair(ui.COLOR_TITLE) | curses.A_BOLD)
+        row = 2
+        ranking = sorted(range(4), key=lambda i: session.scores[i], reverse=True)
+        for rank, i in enumerate(ranking, 1):
+            attr = curses.color_pair(ui.COLOR_WIN) | curses.A_BOLD if rank == 1 else 0
+            ui._safe_addstr(self.stdscr, row, 0, f"第 {rank} 名  玩家 {i}  {session.scores[i]:+d}", attr)
+            row += 1
+        row += 1
+        for entry in session.history:
+            ui._safe_addstr(self.stdscr, row, 0, repr(entry))
+            row += 1
+
         ui.draw_hint_bar(self.stdscr, "按任意鍵退出")
         self.stdscr.refresh()
         self.stdscr.getch()
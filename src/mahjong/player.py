@@ -1,5 +1,6 @@
 from __future__ import annotations
 from .tile import Tile
+from .rule_engine import RuleEngine
 
 
 class Player:
@@ -8,6 +9,7 @@ class Player:
     name: str
     hand_tiles: list[Tile]
     melded_tiles: list[Tile]
+    melds: list[tuple[str, int]]
     discarded_tiles: list[Tile]
     flower_tiles: list[Tile]
     is_winner: bool
@@ -15,19 +17,41 @@ class Player:
     def __init__(self):
         self.hand_tiles = []
         self.melded_tiles = []   # 已亮出的面子（碰/槓/吃）
+        self.melds = []          # 面子結構：(種類, code)，種類為 pong/kong/concealed_kong/chow，吃記最小張
         self.discarded_tiles = []
         self.flower_tiles = []   # 補進來的花牌
         self.is_winner = False
+        # 聽牌快取：只有手牌內容變了才重算
+        self._hand_version = 0                      # 每次改動手牌就 +1
+        self._waits_version = -1                    # _waits 對應的 _hand_version
+        self._waits_key: tuple[int, ...] | None = None   # _waits 對應的 3n+1 張手牌（排序後 code）
+        self._waits: frozenset[int] = frozenset()
 
     def __str__(self) -> str:
         return " ".join([str(tile) for tile in self.hand_tiles])
 
+    def reset(self):
+        """清空所有牌，準備下一局（就地清空，沿用原本的串列）。"""
+        self.hand_tiles.clear()
+        self.melded_tiles.clear()
+        self.melds.clear()
+        self.discarded_tiles.clear()
+        self.flower_tiles.clear()
+        self.is_winner = False
+        self._hand_version += 1
+
+    def hand_changed(self):
+        """手牌被直接改動（不經由下列方法）時呼叫，讓聽牌快取失效。"""
+        self._hand_version += 1
+
     def add_tile_to_hand(self, tile: Tile):
         self.hand_tiles.append(tile)
+        self._hand_version += 1
 
     def discard_tile(self, tile: Tile):
         self.hand_tiles.remove(tile)
         self.discarded_tiles.append(tile)
+        self._hand_version += 1
 
     def order_hand(self):
         self.hand_tiles.sort(key=lambda tile: tile.code)
@@ -37,18 +61,24 @@ class Player:
         for _ in range(2):
             self.hand_tiles.remove(tile)
         self.melded_tiles.extend([tile, tile, tile])
+        self.melds.append(("pong", tile.code))
+        self._hand_version += 1
 
     def declare_kong(self, tile: Tile):
         """槓牌：從手牌移除 3 張，將 4 張（含棄牌）加入 melded_tiles"""
         for _ in range(3):
             self.hand_tiles.remove(tile)
         self.melded_tiles.extend([tile, tile, tile, tile])
+        self.melds.append(("kong", tile.code))
+        self._hand_version += 1
 
     def declare_concealed_kong(self, tile: Tile):
         """暗槓：從手牌移除 4 張，將 4 張加入 melded_tiles"""
         for _ in range(4):
             self.hand_tiles.remove(tile)
         self.melded_tiles.extend([tile, tile, tile, tile])
+        self.melds.append(("concealed_kong", tile.code))
+        self._hand_version += 1
 
 
     def declare_chow(self, tile: Tile, option: tuple[int, int]):
@@ -60,14 +90,53 @@ class Player:
         self.hand_tiles.remove(tile_b)
         self.melded_tiles.extend([tile_a, tile, tile_b])
         self.melded_tiles.sort(key=lambda t: t.code)
+        self.melds.append(("chow", min(code_a, tile.code, code_b)))
+        self._hand_version += 1
 
     def declare_replace_flower(self, tile: Tile):
         """補花：將花牌從手牌移至 flower_tiles（補牌由 Game 層負責）"""
         self.hand_tiles.remove(tile)
         self.flower_tiles.append(tile)
+        self._hand_version += 1
 
     def declare_hu(self, tile: Tile | None):
         """胡牌：若 tile 不為 None（別人打的牌），加入手牌，標記勝利"""
         if tile:
             self.hand_tiles.append(tile)
+            self._hand_version += 1
         self.is_winner = True
+
+    # ── 聽牌快取 ──────────────────────────────────────
+
+    def get_waits(self) -> frozenset[int]:
+        """目前 3n+1 張手牌聽的牌（code 集合）；張數不對時為空集合。"""
+        if self._waits_version != self._hand_version:
+            if len(self.hand_tiles) % 3 != 1:
+                return frozenset()
+            self._refresh_waits(tuple(sorted(t.code for t in self.hand_tiles)))
+            self._waits_version = self._hand_version
+        return self._waits
+
+    def _refresh_waits(self, key: tuple[int, ...]):
+        # 手牌改動後內容可能其實沒變（例如摸什麼打什麼、補花），比對內容再決定要不要重算
+        if key != self._waits_key:
+            self._waits_key = key
+            self._waits = frozenset(
+                t.code for t in RuleEngine.get_ting_tiles([Tile(c) for c in key])
+            )
+
+    def can_win_with(self, tile: Tile) -> bool:
+        """別人打出 tile 時能否胡（等同 RuleEngine.is_hu(hand_tiles, tile)）。"""
+        return tile.code in self.get_waits()
+
+    def can_win_self_drawn(self, tile: Tile | None) -> bool:
+        """
+        剛摸進 tile（已在手牌中）後能否自摸（等同 RuleEngine.is_hu(hand_tiles, None)）。
+        扣掉 tile 的手牌通常就是摸牌前的手牌，聽牌集合已在快取中。
+        """
+        if tile is None or len(self.hand_tiles) % 3 != 2 or tile not in self.hand_tiles:
+            return RuleEngine.is_hu(self.hand_tiles, None)
+        codes = sorted(t.code for t in self.hand_tiles)
+        codes.remove(tile.code)
+        self._refresh_waits(tuple(codes))
+        return tile.code in self._waits
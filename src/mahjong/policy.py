@@ -0,0 +1,254 @@
+"""
+policy.py — 打牌決策的查表快取
+
+SimpleAI.choose_discard 的保留價值只看同一花色的張數（加上花色交界的兩張：
+SimpleAI 以 code 算相鄰，19 與 21、29 與 31、39 與東也差 2），所以一個花色的
+「張數組合 + 左右交界各一個 bit」就決定了該花色每一張牌的保留價值。
+DiscardPolicy 以這個正規化的花色型（pattern）為鍵，存每個位置的保留價值；
+打牌時只要算出四個花色的鍵、查四次表，再在手牌中取最小值（同分取手牌中較前面的一張，
+與 SimpleAI 相同）。
+
+查表檔離線產生（mahjong build-policy），預設列舉每個花色不超過 --max-tiles 張的所有型，
+保留價值由評估函式計算：預設為 simple_suit_values（與 SimpleAI 相同），
+也可以換成更強的評估函式（簽名與 simple_suit_values 相同）。評估函式須先以
+register_evaluator 登記名稱，檔頭只記這個名稱；讀檔時只在登記表中查找，
+不會依檔案內容匯入任何模組，找不到時丟出 LookupError（也可以由呼叫端直接傳入 evaluator）。
+查不到的型即時以同一個評估函式計算並記住，所以沒有查表檔也能用，只是第一次較慢。
+
+檔案位置：環境變數 MAHJONG_POLICY，否則為 ~/.cache/mahjong/discard-policy-v{版本}.bin。
+
+    mahjong build-policy                              # 約數秒
+    python scripts/tournament.py -c cached            # CachedSimpleAI
+"""
+from __future__ import annotations
+import itertools
+import os
+import struct
+import warnings
+from array import array
+from functools import lru_cache
+from typing import Callable
+
+from .ai import SimpleAI
+from .tile import Tile
+
+FORMAT_VERSION = 2
+_MAGIC = b"MJDP"
+# magic, 版本, 列舉的最多張數, 型的數量, 評估函式名稱的長度
+_HEADER = struct.Struct("<4sHHIH")
+_SLOTS = 9                       # 每個型存 9 個位置（字牌只用前 7 個）
+_POW5 = tuple(5 ** i for i in range(9))
+_HAS_NINE = _POW5[8]             # 花色鍵 >= 5⁸ 表示有 9
+MAX_CACHED = 1 << 20             # 即時算出的型最多記住幾個
+
+# 評估函式：(該花色 9 或 7 格的張數, 左交界有牌, 右交界有牌, 是否字牌) -> 每格的保留價值
+Evaluator = Callable[[tuple[int, ...], bool, bool, bool], tuple[int, ...]]
+
+
+def simple_suit_values(counts: tuple[int, ...], left: bool, right: bool, honor: bool) -> tuple[int, ...]:
+    """
+    SimpleAI.choose_discard 的 keep_value，以花色為單位計算。
+    left：前一個花色的 9 是否在手牌（影響本花色 1 的 c-2）；
+    right：下一個花色的 1（條子之後是東）是否在手牌（影響本花色 9 的 c+2）。
+    """
+    n = len(counts)
+    values = []
+    for i, c in enumerate(counts):
+        value = 8 if c >= 3 else 5 if c == 2 else 0
+        if honor:
+            value -= 2
+        else:
+            for d, weight in ((-2, 1), (-1, 2), (1, 2), (2, 1)):
+                j = i + d
+                if 0 <= j < n:
+                    present = counts[j] > 0
+                elif j == -2:
+                    present = left
+                elif j == n + 1:
+                    present = right
+                else:
+                    present = False         # code 為 x0 的位置沒有牌
+                if present:
+                    value += weight
+        values.append(value)
+    return tuple(values)
+
+
+def _pattern_key(suit_key: int, left: bool, right: bool, honor: bool) -> int:
+    return ((suit_key * 2 + left) * 2 + right) * 2 + honor
+
+
+def _counts_of(suit_key: int, honor: bool) -> tuple[int, ...]:
+    return tuple(suit_key // _POW5[i] % 5 for i in range(7 if honor else 9))
+
+
+# ── 評估函式登記表 ────────────────────────────────────
+
+EVALUATORS: dict[str, Evaluator] = {"simple": simple_suit_values}
+
+
+def register_evaluator(name: str, evaluator: Evaluator) -> None:
+    """登記評估函式；建表時檔頭記下 name，讀檔時依 name 在登記表中找回函式。"""
+    if not name or len(name.encode()) > 0xFFFF:
+        raise ValueError(f"評估函式名稱不合法：{name!r}")
+    EVALUATORS[name] = evaluator
+
+
+def resolve_evaluator(name: str) -> Evaluator:
+    """依名稱取得已登記的評估函式；未登記時丟出 LookupError。"""
+    try:
+        return EVALUATORS[name]
+    except KeyError:
+        raise LookupError(f"評估函式 {name!r} 未登記（已登記：{', '.join(sorted(EVALUATORS))}）") from None
+
+
+def _evaluator_name(evaluator: Evaluator) -> str:
+    for name, registered in EVALUATORS.items():
+        if registered is evaluator:
+            return name
+    raise LookupError(f"評估函式 {evaluator!r} 未登記，請先呼叫 register_evaluator")
+
+
+def default_path() -> str:
+    path = os.environ.get("MAHJONG_POLICY")
+    if path:
+        return path
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "mahjong", f"discard-policy-v{FORMAT_VERSION}.bin")
+
+
+# ── 查表 ──────────────────────────────────────────────
+
+class DiscardPolicy:
+    """花色型 -> 保留價值的快取，查不到時即時計算"""
+
+    def __init__(self, values: dict[int, tuple[int, ...]] | None = None,
+                 evaluator: Evaluator = simple_suit_values, path: str | None = None):
+        self.values = values if values is not None else {}
+        self.evaluator = evaluator
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str | None = None, evaluator: Evaluator | None = None) -> DiscardPolicy:
+        """
+        讀入查表檔；格式或版本不符時丟出 ValueError。
+        evaluator 省略時依檔頭的名稱在登記表中查找，未登記則丟出 LookupError。
+        """
+        path = path or default_path()
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path}：檔案太短")
+        magic, version, _, n, name_len = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}：不是打牌查表檔")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}：版本 {version} 與程式的版本 {FORMAT_VERSION} 不符，請重新建表")
+        offset = _HEADER.size
+        name = data[offset:offset + name_len].decode()
+        offset += name_len
+        if len(data) != offset + n * 4 + n * _SLOTS:
+            raise ValueError(f"{path}：檔案不完整")
+        keys = array("I")
+        keys.frombytes(data[offset:offset + n * 4])
+        flat = array("b")
+        flat.frombytes(data[offset + n * 4:])
+        values = {key: tuple(flat[i * _SLOTS:(i + 1) * _SLOTS]) for i, key in enumerate(keys)}
+        return cls(values, evaluator or resolve_evaluator(name), path)
+
+    def suit_values(self, suit_key: int, left: bool, right: bool, honor: bool) -> tuple[int, ...]:
+        key = _pattern_key(suit_key, left, right, honor)
+        values = self.values.get(key)
+        if values is not None:
+            self.hits += 1
+            return values
+        self.misses += 1
+        values = self.evaluator(_counts_of(suit_key, honor), left, right, honor)
+        if len(self.values) < MAX_CACHED:
+            self.values[key] = values
+        return values
+
+    def keep_values(self, hand: list[Tile]) -> list[int]:
+        """手牌每一張的保留價值（與 SimpleAI.choose_discard 的 keep_value 相同）。"""
+        rows = self._rows(hand)
+        return [rows[t.code // 10 - 1][t.code % 10 - 1] for t in hand]
+
+    def choose_discard(self, hand: list[Tile]) -> Tile:
+        """保留價值最低的一張（同分取手牌中較前面的一張）。"""
+        rows = self._rows(hand)
+        return min(hand, key=lambda t: rows[t.code // 10 - 1][t.code % 10 - 1])
+
+    def _rows(self, hand: list[Tile]) -> tuple:
+        """四個花色（萬筒條字）各自的保留價值列；沒有牌的花色為 None。"""
+        keys = [0, 0, 0, 0]
+        for t in hand:
+            keys[t.code // 10 - 1] += _POW5[t.code % 10 - 1]
+        m, p, s, z = keys
+        lookup = self.suit_values
+        return (
+            lookup(m, False, p % 5 > 0, False) if m else None,
+            lookup(p, m >= _HAS_NINE, s % 5 > 0, False) if p else None,
+            lookup(s, p >= _HAS_NINE, z % 5 > 0, False) if s else None,
+            lookup(z, False, False, True) if z else None,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_policy() -> DiscardPolicy:
+    """
+    行程內共用的 DiscardPolicy；沒有查表檔時從空的快取開始。
+    檔案損壞或版本過舊時警告並改用即時計算；檔頭的評估函式未登記（LookupError）
+    表示設定有誤，直接丟出，不會默默改用預設的評估函式。
+    """
+    path = default_path()
+    if os.path.exists(path):
+        try:
+            return DiscardPolicy.load(path)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"無法載入打牌查表，改用即時計算：{e}", RuntimeWarning, stacklevel=2)
+    return DiscardPolicy()
+
+
+class CachedSimpleAI(SimpleAI):
+    """打牌改用 DiscardPolicy 查表的 SimpleAI（查表檔以 SimpleAI 的評估函式建立時，決策完全相同）"""
+
+    @staticmethod
+    def choose_discard(hand: list[Tile]) -> Tile:
+        return get_policy().choose_discard(hand)
+
+
+# ── 建表 ──────────────────────────────────────────────
+
+def _patterns(n_slots: int, max_tiles: int):
+    """張數總和不超過 max_tiles 的所有花色鍵。"""
+    for counts in itertools.product(range(5), repeat=n_slots):
+        if 0 < sum(counts) <= max_tiles:
+            yield sum(c * _POW5[i] for i, c in enumerate(counts))
+
+
+def build(path: str | None = None, max_tiles: int = 8, evaluator: Evaluator = simple_suit_values) -> tuple[str, int]:
+    """列舉花色型、以 evaluator（須已登記）計算保留價值並寫入 path。回傳 (路徑, 型的數量)。"""
+    path = path or default_path()
+    name = _evaluator_name(evaluator).encode()
+    keys = array("I")
+    flat = array("b")
+    for honor, n_slots in ((False, 9), (True, 7)):
+        bits = ((False, False),) if honor else tuple(itertools.product((False, True), repeat=2))
+        for suit_key in _patterns(n_slots, max_tiles):
+            counts = _counts_of(suit_key, honor)
+            for left, right in bits:
+                values = evaluator(counts, left, right, honor)
+                keys.append(_pattern_key(suit_key, left, right, honor))
+                flat.extend(values + (0,) * (_SLOTS - len(values)))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, max_tiles, len(keys), len(name)))
+        f.write(name)
+        f.write(keys.tobytes())
+        f.write(flat.tobytes())
+    os.replace(tmp, path)
+    return path, len(keys)
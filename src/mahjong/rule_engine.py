@@ -64,8 +64,8 @@ class RuleEngine:
                             return True
                         c_dict[i] += 3
 
-                    # 檢查順子
-                    if i % 10 <= 7 and c_dict[i+1] > 0 and c_dict[i+2] > 0:
+                    # 檢查順子（只有萬筒條，字牌不能成順）
+                    if i < 40 and i % 10 <= 7 and c_dict[i+1] > 0 and c_dict[i+2] > 0:
                         c_dict[i] -= 1
                         c_dict[i+1] -= 1
                         c_dict[i+2] -= 1
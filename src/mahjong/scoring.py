@@ -0,0 +1,366 @@
+"""
+scoring.py — 台灣麻將計台
+
+decompose() 列出一手胡牌所有「面子 + 對眼」的拆法；score_hand() 對每一種拆法
+（以及胡的那張牌落在哪個面子）套用台數規則，取最高分。
+
+拆牌以花色為單位：萬/筒/條/字各自的 9 格（字為 7 格）張數組合只會拆一次，
+結果以 lru_cache 記住。一副手牌的總張數決定對眼落在哪個花色（該花色張數 ≡ 2 mod 3），
+所以整手的拆法就是四個花色拆法的笛卡兒積，批次模擬時計台的成本與胡牌判斷相當。
+"""
+from __future__ import annotations
+from functools import lru_cache
+from itertools import product
+
+from .tile import Tile
+from .tables import get_tables
+
+# 面子：(種類, code)。種類 pair/pung/chow；chow 記最小張
+Meld = tuple[str, int]
+
+_SUIT_BASES = (10, 20, 30, 40)   # 萬筒條字：code = base + (索引 + 1)
+_DRAGONS = (45, 46, 47)          # 中發白
+_WINDS = (41, 42, 43, 44)        # 東南西北
+
+
+@lru_cache(maxsize=None)
+def _suit_decompositions(counts: tuple[int, ...], with_pair: bool, honor: bool) -> tuple[tuple[Meld, ...], ...]:
+    """
+    單一花色的所有拆法（code 以 1 起算的索引表示）。
+    counts[i] 為索引 i+1 的張數；honor=True 時不能組順子。
+    """
+    i = next((k for k, c in enumerate(counts) if c), None)
+    if i is None:
+        return () if with_pair else ((),)
+
+    results: list[tuple[Meld, ...]] = []
+    c = list(counts)
+    if with_pair and c[i] >= 2:
+        c[i] -= 2
+        for rest in _suit_decompositions(tuple(c), False, honor):
+            results.append((("pair", i + 1),) + rest)
+        c[i] += 2
+    if c[i] >= 3:
+        c[i] -= 3
+        for rest in _suit_decompositions(tuple(c), with_pair, honor):
+            results.append((("pung", i + 1),) + rest)
+        c[i] += 3
+    if not honor and i <= 6 and c[i + 1] and c[i + 2]:
+        c[i] -= 1
+        c[i + 1] -= 1
+        c[i + 2] -= 1
+        for rest in _suit_decompositions(tuple(c), with_pair, honor):
+            results.append((("chow", i + 1),) + rest)
+    # 先取對眼或先取順子可能得到同一組面子，去除重複
+    return tuple(dict.fromkeys(tuple(sorted(r)) for r in results))
+
+
+def _suit_counts(codes: list[int]) -> list[tuple[int, ...]]:
+    counts = [[0] * 9, [0] * 9, [0] * 9, [0] * 7]
+    for code in codes:
+        counts[code // 10 - 1][code % 10 - 1] += 1
+    return [tuple(c) for c in counts]
+
+
+def _pair_suit(suits: list[tuple[int, ...]]) -> int | None:
+    """對眼所在的花色：恰好一個花色張數 ≡ 2 (mod 3)、其餘 ≡ 0 時回傳該花色，否則 None。"""
+    rems = [sum(counts) % 3 for counts in suits]
+    if sorted(rems) != [0, 0, 0, 2]:
+        return None
+    return rems.index(2)
+
+
+def decompose(codes: list[int]) -> list[tuple[Meld, ...]]:
+    """
+    列出暗手牌（3n+2 張，不含花）所有「n 個面子 + 1 對眼」的拆法。
+    不是胡牌型時回傳空串列。
+    """
+    suits = _suit_counts(codes)
+    pair_suit = _pair_suit(suits)
+    if pair_suit is None:
+        return []
+    per_suit = []
+    for suit, counts in enumerate(suits):
+        options = _suit_decompositions(counts, suit == pair_suit, suit == 3)
+        if not options:
+            return []
+        base = _SUIT_BASES[suit]
+        per_suit.append([tuple((kind, base + v) for kind, v in d) for d in options])
+    return [sum(combo, ()) for combo in product(*per_suit)]
+
+
+def is_complete(codes: list[int]) -> bool:
+    """與 RuleEngine.is_hu 相同的判斷，但使用記憶化的分花色拆牌（有查表檔時直接查表）。"""
+    tables = get_tables()
+    if tables is not None and (result := tables.is_complete(codes)) is not None:
+        return result
+    suits = _suit_counts(codes)
+    pair_suit = _pair_suit(suits)
+    if pair_suit is None:
+        return False
+    return all(_suit_decompositions(counts, suit == pair_suit, suit == 3)
+               for suit, counts in enumerate(suits))
+
+
+def waits(codes: list[int]) -> list[int]:
+    """
+    3n+1 張暗手牌聽的牌（code）。
+    加一張牌只改變一個花色：其餘花色必須已經能拆完，只需在那個花色裡逐一試。
+    """
+    tables = get_tables()
+    if tables is not None and (result := tables.waits(codes)) is not None:
+        return result
+    suits = _suit_counts(codes)
+    rems = [sum(counts) % 3 for counts in suits]
+    result = []
+    for suit, counts in enumerate(suits):
+        new_rems = list(rems)
+        new_rems[suit] = (rems[suit] + 1) % 3
+        if sorted(new_rems) != [0, 0, 0, 2]:
+            continue
+        if not all(_suit_decompositions(suits[t], rems[t] == 2, t == 3) for t in range(4) if t != suit):
+            continue
+        with_pair = new_rems[suit] == 2
+        c = list(counts)
+        for i in range(len(c)):
+            if c[i] >= 4:
+                continue
+            c[i] += 1
+            if _suit_decompositions(tuple(c), with_pair, suit == 3):
+                result.append(_SUIT_BASES[suit] + i + 1)
+            c[i] -= 1
+    return result
+
+
+class ScoreResult:
+    """計台結果"""
+
+    tai: int
+    patterns: list[tuple[str, int]]   # [(台型名稱, 台數), ...]
+    decomposition: tuple[Meld, ...] | None
+
+    def __init__(self, patterns: list[tuple[str, int]], decomposition: tuple[Meld, ...] | None):
+        self.patterns = patterns
+        self.tai = sum(t for _, t in patterns)
+        self.decomposition = decomposition
+
+    def __repr__(self) -> str:
+        desc = "、".join(f"{name} {t}" for name, t in self.patterns)
+        return f"ScoreResult({self.tai} 台：{desc})"
+
+
+def seat_wind(seat: int, dealer: int) -> int:
+    """門風：莊家為東（1），依下家順序為南西北。"""
+    return (seat - dealer) % 4 + 1
+
+
+def score_hand(
+    player,
+    winning_tile: Tile | None,
+    *,
+    seat: int,
+    dealer: int,
+    prevailing_wind: int = 1,
+    self_drawn: bool,
+    dealer_streak: int = 0,
+    last_tile: bool = False,
+    kong_replacement: bool = False,
+) -> ScoreResult:
+    """
+    計算胡牌玩家的台數。player.hand_tiles 需已包含胡的那張牌（declare_hu 之後）。
+    winning_tile 為 None（例如花胡）時不計與聽牌相關的台型。
+    """
+    own_wind = seat_wind(seat, dealer)
+    base = _base_patterns(player, seat, dealer, own_wind, dealer_streak)
+
+    # 八仙過海：不需要胡牌型
+    if len(player.flower_tiles) >= 8:
+        return ScoreResult(base + [("八仙過海", 8)], None)
+
+    codes = [t.code for t in player.hand_tiles]
+    best: ScoreResult | None = None
+    win_code = winning_tile.code if winning_tile else None
+    single_wait = False
+    if win_code is not None:
+        rest = list(codes)
+        rest.remove(win_code)
+        single_wait = len(waits(rest)) == 1
+
+    for decomposition in decompose(codes):
+        # 胡的那張牌可能落在不同的面子裡，各自計分
+        placements = [None] if win_code is None else \
+            [i for i, m in enumerate(decomposition) if _contains(m, win_code)]
+        for placement in dict.fromkeys(placements):
+            patterns = base + _hand_patterns(
+                player, decomposition, placement, win_code,
+                own_wind=own_wind, prevailing_wind=prevailing_wind,
+                self_drawn=self_drawn, single_wait=single_wait,
+                last_tile=last_tile, kong_replacement=kong_replacement,
+            )
+            result = ScoreResult(patterns, decomposition)
+            if best is None or result.tai > best.tai:
+                best = result
+
+    if best is None:
+        raise ValueError("不是胡牌型，無法計台")
+    return best
+
+
+def score_state(state, dealer_streak: int = 0) -> ScoreResult | None:
+    """計算 flow.HandState 這一局勝者的台數；流局回傳 None。"""
+    if state.winner is None:
+        return None
+    return score_hand(
+        state.players[state.winner],
+        state.winning_tile,
+        seat=state.winner,
+        dealer=state.dealer,
+        prevailing_wind=state.current_wind,
+        self_drawn=state.self_drawn,
+        dealer_streak=dealer_streak,
+        last_tile=state.deck.get_remaining_tiles_count() <= 16,
+        kong_replacement=state.kong_replacement,
+    )
+
+
+# ── 台型 ──────────────────────────────────────────────
+
+def _contains(meld: Meld, code: int) -> bool:
+    kind, c = meld
+    if kind == "chow":
+        return c <= code <= c + 2
+    return c == code
+
+
+def _base_patterns(player, seat: int, dealer: int, own_wind: int, dealer_streak: int) -> list[tuple[str, int]]:
+    """與拆牌無關的台型：莊家、連莊、花牌。"""
+    patterns = []
+    if seat == dealer:
+        patterns.append(("莊家", 1))
+        if dealer_streak:
+            patterns.append((f"連{dealer_streak}拉{dealer_streak}", 2 * dealer_streak))
+
+    flower_values = {t.get_value() for t in player.flower_tiles}
+    if len(player.flower_tiles) < 8:
+        for start, name in ((1, "梅蘭竹菊"), (5, "春夏秋冬")):
+            if all(v in flower_values for v in range(start, start + 4)):
+                patterns.append((f"花槓（{name}）", 2))
+            elif own_wind + start - 1 in flower_values:
+                patterns.append(("正花", 1))
+    return patterns
+
+
+def _hand_patterns(
+    player,
+    decomposition: tuple[Meld, ...],
+    placement: int | None,
+    win_code: int | None,
+    *,
+    own_wind: int,
+    prevailing_wind: int,
+    self_drawn: bool,
+    single_wait: bool,
+    last_tile: bool,
+    kong_replacement: bool,
+) -> list[tuple[str, int]]:
+    patterns: list[tuple[str, int]] = []
+    exposed = [(kind, code) for kind, code in player.melds if kind != "concealed_kong"]
+    concealed_kongs = [code for kind, code in player.melds if kind == "concealed_kong"]
+    concealed_hand = not exposed
+
+    # 所有面子（含亮出的）：(種類, code, 是否暗)
+    melds: list[tuple[str, int, bool]] = []
+    for i, (kind, code) in enumerate(decomposition):
+        if kind == "pair":
+            continue
+        # 放槍胡時，胡的那張牌所在的刻子不算暗刻
+        concealed = not (kind == "pung" and i == placement and not self_drawn)
+        melds.append((kind, code, concealed))
+    for kind, code in player.melds:
+        melds.append(("chow" if kind == "chow" else "pung", code, kind == "concealed_kong"))
+    pair = next(code for kind, code in decomposition if kind == "pair")
+
+    # 門清 / 自摸
+    if concealed_hand and self_drawn:
+        patterns.append(("門清自摸", 3))
+    elif concealed_hand:
+        patterns.append(("門清", 1))
+    elif self_drawn:
+        patterns.append(("自摸", 1))
+
+    if single_wait:
+        patterns.append(("獨聽", 1))
+    if kong_replacement:
+        patterns.append(("槓上開花", 1))
+    if last_tile:
+        patterns.append(("海底撈月" if self_drawn else "河底撈魚", 1))
+
+    pungs = [code for kind, code, _ in melds if kind == "pung"]
+    chows = [code for kind, code, _ in melds if kind == "chow"]
+
+    # 全求人：五個面子都亮出、單吊放槍
+    if len(exposed) == 5 and not concealed_kongs and not self_drawn:
+        patterns.append(("全求人", 2))
+
+    # 碰碰胡 / 平胡
+    if not chows:
+        patterns.append(("碰碰胡", 4))
+    all_codes = [t.code for t in player.hand_tiles] + [t.code for t in player.melded_tiles]
+    if (not pungs and not player.flower_tiles and not self_drawn
+            and all(c < 40 for c in all_codes) and not single_wait
+            and placement is not None and _is_two_sided(decomposition[placement], win_code)):
+        patterns.append(("平胡", 2))
+
+    # 暗刻
+    concealed_pungs = sum(1 for kind, _, concealed in melds if kind == "pung" and concealed)
+    if concealed_pungs >= 5:
+        patterns.append(("五暗刻", 8))
+    elif concealed_pungs == 4:
+        patterns.append(("四暗刻", 5))
+    elif concealed_pungs == 3:
+        patterns.append(("三暗刻", 2))
+
+    # 三元牌
+    dragon_pungs = [c for c in pungs if c in _DRAGONS]
+    if len(dragon_pungs) == 3:
+        patterns.append(("大三元", 8))
+    elif len(dragon_pungs) == 2 and pair in _DRAGONS:
+        patterns.append(("小三元", 4))
+    else:
+        patterns.extend(("三元刻", 1) for _ in dragon_pungs)
+
+    # 風牌
+    wind_pungs = [c for c in pungs if c in _WINDS]
+    if len(wind_pungs) == 4:
+        patterns.append(("大四喜", 16))
+    elif len(wind_pungs) == 3 and pair in _WINDS:
+        patterns.append(("小四喜", 8))
+    else:
+        if 40 + prevailing_wind in wind_pungs:
+            patterns.append(("圈風刻", 1))
+        if 40 + own_wind in wind_pungs:
+            patterns.append(("門風刻", 1))
+
+    # 一色
+    suits = {c // 10 for c in all_codes}
+    if suits == {4}:
+        patterns.append(("字一色", 16))
+    elif len(suits) == 1:
+        patterns.append(("清一色", 8))
+    elif len(suits) == 2 and 4 in suits:
+        patterns.append(("混一色", 4))
+
+    return patterns
+
+
+def _is_two_sided(meld: Meld, code: int | None) -> bool:
+    """胡的牌在順子的兩端且不是邊張（12 胡 3、89 胡 7）。"""
+    kind, low = meld
+    if kind != "chow" or code is None:
+        return False
+    v = low % 10
+    if code == low:
+        return v != 7      # 胡 7 的 789 是邊張
+    if code == low + 2:
+        return v != 1      # 胡 3 的 123 是邊張
+    return False
@@ -0,0 +1,230 @@
+"""
+selfplay.py — 自我對戰的訓練資料匯出（需要 numpy）
+
+以 flow.play_hand 跑牌局，每個決策點（打牌、反應、自摸、暗槓，四家都記）存成一列固定寬度的資料，
+整批寫成分片的 .npz（每個欄位一個陣列，欄位見 COLUMNS）。觀察值與動作編號和
+env.MahjongEnv 相同，訓練出的策略可以直接放回環境裡用。
+
+  觀察    hand / melds / discards / concealed_kongs / flowers / wall / decision / tile（同 env.observe）
+          visible（所有人的亮牌 + 棄牌）、seat、dealer（莊家相對於 seat 的位置）、legal（合法動作）
+  動作    action（env 的動作編號）
+  結果    reward（同 env：胡 +1、放槍 -1、別家自摸 -1/3）、winner（相對位置，流局 -1）、
+          tai（胡牌者的台數）、self_drawn
+  索引    hand_id、step（這局的第幾個決策）
+
+一局的結果要打完才知道，所以每局的列先放在暫存區，結束時填好結果再整批複製進分片緩衝區。
+緩衝區滿了就交給背景執行緒寫檔（先寫暫存檔再改名），模擬同時換一塊空的緩衝區繼續；
+緩衝區總數固定（max_pending + 1），寫檔跟不上時模擬會等待，記憶體用量有上限。
+"""
+from __future__ import annotations
+import glob
+import os
+import queue
+import re
+import threading
+from typing import Iterator
+
+import numpy as np
+
+from .env import N_ACTIONS, N_TILE_TYPES, action_of, legal_actions, observe, reward
+from .flow import Agent, Decision, HandState, play_hand, simple_ai_agent
+from .scoring import score_state
+
+# 欄位名稱 -> (每列的形狀, dtype)
+COLUMNS: dict[str, tuple[tuple[int, ...], type]] = {
+    "hand": ((N_TILE_TYPES,), np.int8),
+    "visible": ((N_TILE_TYPES,), np.int8),
+    "melds": ((4, N_TILE_TYPES), np.int8),
+    "discards": ((4, N_TILE_TYPES), np.int8),
+    "concealed_kongs": ((4,), np.int8),
+    "flowers": ((4,), np.int8),
+    "seat": ((), np.int8),
+    "dealer": ((), np.int8),
+    "wall": ((), np.int16),
+    "decision": ((), np.int8),
+    "tile": ((), np.int8),
+    "legal": ((N_ACTIONS,), np.bool_),
+    "action": ((), np.int8),
+    "hand_id": ((), np.int64),
+    "step": ((), np.int16),
+    "reward": ((), np.float32),
+    "winner": ((), np.int8),
+    "tai": ((), np.int16),
+    "self_drawn": ((), np.bool_),
+}
+
+
+def _allocate(rows: int) -> dict[str, np.ndarray]:
+    return {name: np.zeros((rows, *shape), dtype=dtype) for name, (shape, dtype) in COLUMNS.items()}
+
+
+# ── 寫檔 ──────────────────────────────────────────────
+
+class ShardWriter:
+    """
+    把列累積到固定大小的緩衝區，滿了交給背景執行緒寫成
+    {directory}/{prefix}-{序號:05d}.npz。目錄裡已有同 prefix 的分片時接著編號。
+    """
+
+    def __init__(self, directory: str, rows_per_shard: int = 32768, prefix: str = "shard",
+                 compress: bool = False, max_pending: int = 2):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rows_per_shard = rows_per_shard
+        self.prefix = prefix
+        self.compress = compress
+        self.shards: list[str] = []      # 已寫完的分片路徑
+        self.rows_written = 0
+        self._index = _next_index(directory, prefix)
+        # 緩衝區輪流使用：一塊在填，其餘在排隊寫檔或閒置
+        self._free: queue.Queue = queue.Queue()
+        for _ in range(max_pending):
+            self._free.put(_allocate(rows_per_shard))
+        self._buffer = _allocate(rows_per_shard)
+        self._count = 0
+        self._jobs: queue.Queue = queue.Queue()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name="shard-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, columns: dict[str, np.ndarray], n: int):
+        """把 columns 的前 n 列加進緩衝區（必要時跨兩個分片）。"""
+        start = 0
+        while start < n:
+            take = min(n - start, self.rows_per_shard - self._count)
+            end = self._count + take
+            for name, array in columns.items():
+                self._buffer[name][self._count:end] = array[start:start + take]
+            self._count = end
+            start += take
+            if self._count == self.rows_per_shard:
+                self.flush()
+
+    def flush(self):
+        """把目前的緩衝區交給背景執行緒；沒有空的緩衝區時等待（背壓）。"""
+        self._raise_error()
+        if self._count == 0:
+            return
+        path = os.path.join(self.directory, f"{self.prefix}-{self._index:05d}.npz")
+        self._index += 1
+        self._jobs.put((path, self._buffer, self._count))
+        self._buffer = self._free.get()
+        self._count = 0
+
+    def close(self):
+        """寫出剩下的列並等背景執行緒結束。"""
+        try:
+            self.flush()
+        finally:
+            self._jobs.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self) -> ShardWriter:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        save = np.savez_compressed if self.compress else np.savez
+        while (job := self._jobs.get()) is not None:
+            path, buffer, count = job
+            try:
+                if self._error is None:
+                    tmp = f"{path}.tmp"
+                    with open(tmp, "wb") as f:
+                        save(f, **{name: array[:count] for name, array in buffer.items()})
+                    os.replace(tmp, path)
+                    self.shards.append(path)
+                    self.rows_written += count
+            except BaseException as e:      # 交給主執行緒在下一次 flush/close 時丟出
+                self._error = e
+            finally:
+                self._free.put(buffer)
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"寫入分片失敗：{self._error}") from self._error
+
+
+def _next_index(directory: str, prefix: str) -> int:
+    pattern = re.compile(rf"{re.escape(prefix)}-(\d+)\.npz$")
+    indices = [int(m.group(1)) for name in os.listdir(directory) if (m := pattern.match(name))]
+    return max(indices, default=-1) + 1
+
+
+def iter_shards(directory: str, prefix: str = "*") -> Iterator[dict[str, np.ndarray]]:
+    """依檔名順序讀回分片，每次產生一個 {欄位: 陣列}。"""
+    for path in sorted(glob.glob(os.path.join(directory, f"{prefix}-*.npz"))):
+        with np.load(path) as data:
+            yield {name: data[name] for name in data.files}
+
+
+# ── 記錄 ──────────────────────────────────────────────
+
+class SelfPlayExporter:
+    """跑牌局並把每個決策點交給 ShardWriter"""
+
+    def __init__(self, writer: ShardWriter, agents: list[Agent] | None = None, first_hand_id: int = 0):
+        self.writer = writer
+        self.agents = agents or [simple_ai_agent] * 4
+        self.first_hand_id = first_hand_id      # 多個行程各自匯出時用來錯開 hand_id
+        self.hands = 0
+        self._stage = _allocate(256)      # 這一局的列，打完才知道結果
+
+    def record_hand(self, state: HandState) -> int:
+        """跑完一局（需先 deal()），回傳記錄的列數。"""
+        stage = self._stage
+        hand_id = self.first_hand_id + self.hands
+        n = 0
+        flow = play_hand(state)
+        try:
+            decision = next(flow)
+            while True:
+                seat = decision.player_idx
+                answer = self.agents[seat](state, decision)
+                if n == len(stage["step"]):
+                    stage = self._stage = _grow(stage)
+                self._encode(stage, n, state, seat, decision, answer)
+                stage["hand_id"][n] = hand_id
+                stage["step"][n] = n
+                n += 1
+                decision = flow.send(answer)
+        except StopIteration:
+            pass
+
+        if n:
+            self._outcome(stage, n, state)
+            self.writer.append(stage, n)
+        self.hands += 1
+        return n
+
+    @staticmethod
+    def _encode(stage: dict, row: int, state: HandState, seat: int, decision: Decision, answer: object):
+        obs = observe(state, seat, decision)
+        for name, value in obs.items():
+            stage[name][row] = value
+        stage["visible"][row] = obs["melds"].sum(axis=0) + obs["discards"].sum(axis=0)
+        stage["seat"][row] = seat
+        stage["dealer"][row] = (state.dealer - seat) % 4
+        legal = stage["legal"][row]
+        legal[:] = False
+        legal[legal_actions(decision)] = True
+        stage["action"][row] = action_of(decision, answer)
+
+    @staticmethod
+    def _outcome(stage: dict, n: int, state: HandState):
+        seats = stage["seat"][:n].astype(np.intp)
+        result = score_state(state)
+        stage["reward"][:n] = np.array([reward(state, s) for s in range(4)], dtype=np.float32)[seats]
+        stage["winner"][:n] = -1 if state.winner is None else (state.winner - seats) % 4
+        stage["tai"][:n] = result.tai if result else 0
+        stage["self_drawn"][:n] = state.self_drawn
+
+
+def _grow(stage: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    bigger = _allocate(2 * len(stage["step"]))
+    for name, array in stage.items():
+        bigger[name][:len(array)] = array
+    return bigger
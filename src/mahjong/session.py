@@ -0,0 +1,172 @@
+"""
+session.py — 多局連打（一將）：圈風、莊家輪替、連莊與累計分數
+
+Session 只負責記帳，不碰牌：每局結束後用 record() 告訴它誰胡、誰放槍、幾台，
+它算出各家輸贏並決定下一局的莊家與圈風。規則：
+
+  - 第一局由玩家 0 坐莊、東風圈。
+  - 莊家胡牌或流局 → 連莊（dealer_streak + 1）；否則莊家交給下家、連莊數歸零。
+  - 莊家輪回到玩家 0 時圈風前進一圈；北風圈打完整將結束。
+  - 每位付錢的人付 底 + 台數 × 每台；自摸三家都付，放槍只有放槍者付。
+    莊家輸給閒家時，莊家多付莊家 1 台與連莊的 2N 台。
+
+play_session() 以 flow.run_hand 跑完整將，整將共用同一個 HandState
+（同一副 Deck、同四個 Player），每局開始時 reset() 而不是重建。
+"""
+from __future__ import annotations
+import random
+
+from .flow import Agent, HandState, run_hand
+from .scoring import ScoreResult, score_state
+
+WIND_NAMES = {1: "東", 2: "南", 3: "西", 4: "北"}
+
+
+class HandRecord:
+    """一局的結果"""
+
+    __slots__ = ("number", "prevailing_wind", "dealer", "dealer_streak",
+                 "winner", "discarder", "tai", "deltas")
+
+    number: int                 # 第幾局（從 1 開始）
+    prevailing_wind: int
+    dealer: int
+    dealer_streak: int
+    winner: int | None          # 流局為 None
+    discarder: int | None       # 自摸或流局為 None
+    tai: int
+    deltas: list[int]           # 各家這局的輸贏
+
+    def __init__(self, number, prevailing_wind, dealer, dealer_streak, winner, discarder, tai, deltas):
+        self.number = number
+        self.prevailing_wind = prevailing_wind
+        self.dealer = dealer
+        self.dealer_streak = dealer_streak
+        self.winner = winner
+        self.discarder = discarder
+        self.tai = tai
+        self.deltas = deltas
+
+    def __repr__(self) -> str:
+        if self.winner is None:
+            result = "流局"
+        elif self.discarder is None:
+            result = f"玩家 {self.winner} 自摸 {self.tai} 台"
+        else:
+            result = f"玩家 {self.winner} 胡 玩家 {self.discarder} {self.tai} 台"
+        return f"HandRecord(#{self.number} {round_name(self.prevailing_wind, self.dealer)}：{result}，{self.deltas})"
+
+
+def round_name(prevailing_wind: int, dealer: int) -> str:
+    """例如「東風圈 南局」（莊家為玩家 1）。"""
+    return f"{WIND_NAMES[prevailing_wind]}風圈 {WIND_NAMES[dealer + 1]}局"
+
+
+def payments(
+    winner: int,
+    discarder: int | None,
+    tai: int,
+    *,
+    dealer: int,
+    dealer_streak: int = 0,
+    base: int = 100,
+    per_tai: int = 20,
+) -> list[int]:
+    """一局的各家輸贏（總和為 0）：每位付錢的人付 底 + 台數 × 每台。"""
+    deltas = [0, 0, 0, 0]
+    payers = [discarder] if discarder is not None else [i for i in range(4) if i != winner]
+    for payer in payers:
+        payer_tai = tai
+        if payer == dealer:
+            # 閒家胡莊家：莊家的台數算在付錢的莊家身上
+            payer_tai += 1 + 2 * dealer_streak
+        amount = base + payer_tai * per_tai
+        deltas[payer] -= amount
+        deltas[winner] += amount
+    return deltas
+
+
+class Session:
+    """一將的記帳：目前的莊家、圈風、連莊數與各家累計分數"""
+
+    base: int                   # 底
+    per_tai: int                # 每台
+    rounds: int                 # 打幾圈（1–4）
+    prevailing_wind: int
+    dealer: int
+    dealer_streak: int
+    scores: list[int]
+    history: list[HandRecord]
+    finished: bool
+
+    def __init__(self, base: int = 100, per_tai: int = 20, rounds: int = 4):
+        if not 1 <= rounds <= 4:
+            raise ValueError("rounds 必須介於 1 到 4")
+        self.base = base
+        self.per_tai = per_tai
+        self.rounds = rounds
+        self.prevailing_wind = 1
+        self.dealer = 0
+        self.dealer_streak = 0
+        self.scores = [0, 0, 0, 0]
+        self.history = []
+        self.finished = False
+
+    @property
+    def round_name(self) -> str:
+        return round_name(self.prevailing_wind, self.dealer)
+
+    def payments(self, winner: int, discarder: int | None, tai: int) -> list[int]:
+        """依目前的莊家與連莊數算出各家這局的輸贏（總和為 0）。"""
+        return payments(winner, discarder, tai, dealer=self.dealer, dealer_streak=self.dealer_streak,
+                        base=self.base, per_tai=self.per_tai)
+
+    def record(self, winner: int | None, discarder: int | None = None, tai: int = 0) -> HandRecord:
+        """
+        記下一局的結果並輪莊。tai 為 score_hand 算出的台數
+        （莊家胡牌時已含莊家與連莊台）。
+        """
+        if self.finished:
+            raise RuntimeError("這一將已經打完了")
+
+        deltas = self.payments(winner, discarder, tai) if winner is not None else [0, 0, 0, 0]
+        for i, d in enumerate(deltas):
+            self.scores[i] += d
+        entry = HandRecord(len(self.history) + 1, self.prevailing_wind, self.dealer,
+                           self.dealer_streak, winner, discarder, tai, deltas)
+        self.history.append(entry)
+
+        if winner is None or winner == self.dealer:
+            self.dealer_streak += 1
+        else:
+            self.dealer_streak = 0
+            self.dealer = (self.dealer + 1) % 4
+            if self.dealer == 0:
+                self.prevailing_wind += 1
+                self.finished = self.prevailing_wind > self.rounds
+        return entry
+
+    def record_state(self, state: HandState) -> tuple[HandRecord, ScoreResult | None]:
+        """計算 flow.HandState 的台數並 record()。"""
+        result = score_state(state, dealer_streak=self.dealer_streak)
+        entry = self.record(state.winner, state.discarder, result.tai if result else 0)
+        return entry, result
+
+
+def play_session(
+    session: Session | None = None,
+    agents: list[Agent] | None = None,
+    rng: random.Random | None = None,
+    max_hands: int | None = None,
+) -> Session:
+    """以同步 agent 打完整將（或 max_hands 局）；所有局共用同一個 HandState。"""
+    session = session or Session()
+    state = HandState()
+    played = 0
+    while not session.finished and (max_hands is None or played < max_hands):
+        state.reset(session.dealer, session.prevailing_wind)
+        state.deal(rng)
+        run_hand(state, agents)
+        session.record_state(state)
+        played += 1
+    return session
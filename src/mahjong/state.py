@@ -0,0 +1,224 @@
+from __future__ import annotations
+import struct
+
+from .tile import Tile
+from .player import Player
+from .flow import HandState
+
+
+_MAGIC = b"MJ"
+_VERSION = 3
+# Player.melds 的種類 <-> 1 byte
+_MELD_KINDS = ("pong", "kong", "concealed_kong", "chow")
+# magic, version, current_player, current_wind, front, back, winner+1, discarder+1, winning_tile, winners bitmask,
+# dealer, dealer_streak, flags
+_HEADER = struct.Struct("<2sBBBHHBBBBBBB")
+_KONG_REPLACEMENT = 0x01
+
+
+def _codes(tiles: list[Tile]) -> bytes:
+    return bytes(t.code for t in tiles)
+
+
+def _tiles(codes: bytes) -> list[Tile]:
+    return [Tile(c) for c in codes]
+
+
+def _meld_codes(melds: list[tuple[str, int]]) -> bytes:
+    return bytes(b for kind, code in melds for b in (_MELD_KINDS.index(kind), code))
+
+
+def _melds(data: bytes) -> list[tuple[str, int]]:
+    return [(_MELD_KINDS[data[i]], data[i + 1]) for i in range(0, len(data), 2)]
+
+
+class GameState:
+    """
+    一局牌的完整狀態（不含 curses 畫面與 AI 設定）。
+    capture() / apply_to() 可用於 Game 與 flow.HandState，只經由兩者共同的公開欄位。
+
+    每一串牌都存成 bytes（每張牌一個 byte 的 code），所有欄位皆不可變，
+    因此 clone() 只複製外殼、共用底下的 bytes；只改一位玩家時用 replace()
+    換掉那一欄，其餘三位玩家與 144 張的牌牆照樣共用。
+    """
+
+    __slots__ = (
+        "wall", "front_index", "back_index",
+        "hands", "melds", "meld_sets", "discards", "flowers", "winners",
+        "current_player", "current_wind", "dealer", "dealer_streak",
+        "winner", "discarder", "winning_tile", "kong_replacement",
+    )
+
+    wall: bytes                 # 洗好的牌牆（依摸牌順序）
+    front_index: int
+    back_index: int
+    hands: tuple[bytes, ...]    # 每位玩家的手牌
+    melds: tuple[bytes, ...]    # 已亮出的牌（melded_tiles）
+    meld_sets: tuple[bytes, ...]  # 面子結構（Player.melds），每個面子 2 bytes：種類、code
+    discards: tuple[bytes, ...]
+    flowers: tuple[bytes, ...]
+    winners: int                # is_winner 的位元遮罩
+    current_player: int
+    current_wind: int
+    dealer: int
+    dealer_streak: int          # 連莊數（HandState 沒有連莊數，視為 0）
+    winner: int | None
+    discarder: int | None
+    winning_tile: int | None    # 胡的那張牌的 code
+    kong_replacement: bool      # 自摸的是槓後補進的牌
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState 不可修改，請用 replace()")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GameState):
+            return False
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, n) for n in self.__slots__))
+
+    # ── 複製 ──────────────────────────────────────────
+
+    def clone(self) -> GameState:
+        """淺複製：所有欄位都是不可變物件，直接共用。"""
+        return self.replace()
+
+    def replace(self, **changes) -> GameState:
+        """回傳換掉指定欄位的新狀態，其餘欄位共用。"""
+        fields = {n: getattr(self, n) for n in self.__slots__}
+        fields.update(changes)
+        return GameState(**fields)
+
+    # ── 與 Game / HandState 互轉 ──────────────────────
+
+    @classmethod
+    def capture(cls, source) -> GameState:
+        """由 Game 或 flow.HandState 建立狀態。"""
+        players: list[Player] = source.players
+        winning_tile = source.winning_tile
+        return cls(
+            wall=_codes(source.deck.tiles),
+            front_index=source.deck.front_index,
+            back_index=source.deck.back_index,
+            hands=tuple(_codes(p.hand_tiles) for p in players),
+            melds=tuple(_codes(p.melded_tiles) for p in players),
+            meld_sets=tuple(_meld_codes(p.melds) for p in players),
+            discards=tuple(_codes(p.discarded_tiles) for p in players),
+            flowers=tuple(_codes(p.flower_tiles) for p in players),
+            winners=sum(1 << i for i, p in enumerate(players) if p.is_winner),
+            current_player=source.current_player,
+            current_wind=source.current_wind,
+            dealer=source.dealer,
+            dealer_streak=getattr(source, "dealer_streak", 0),
+            winner=source.winner,
+            discarder=source.discarder,
+            winning_tile=winning_tile.code if winning_tile else None,
+            kong_replacement=source.kong_replacement,
+        )
+
+    from_game = capture
+
+    def apply_to(self, target):
+        """把狀態寫回 Game 或 flow.HandState（沿用 target 既有的 Deck / Player 物件）。"""
+        target.deck.tiles = _tiles(self.wall)
+        target.deck.front_index = self.front_index
+        target.deck.back_index = self.back_index
+
+        for i, p in enumerate(target.players):
+            p.hand_tiles = _tiles(self.hands[i])
+            p.melded_tiles = _tiles(self.melds[i])
+            p.melds = _melds(self.meld_sets[i])
+            p.discarded_tiles = _tiles(self.discards[i])
+            p.flower_tiles = _tiles(self.flowers[i])
+            p.is_winner = bool(self.winners >> i & 1)
+            p.hand_changed()
+
+        target.current_player = self.current_player
+        target.current_wind = self.current_wind
+        target.dealer = self.dealer
+        target.winner = self.winner
+        target.discarder = self.discarder
+        target.winning_tile = Tile(self.winning_tile) if self.winning_tile else None
+        target.kong_replacement = self.kong_replacement
+        if isinstance(target, HandState):
+            # 其餘欄位都能由狀態推回；trackers 不在狀態裡，需要的話以 rebuild(players) 重建
+            target.self_drawn = self.winner is not None and self.discarder is None
+            target.flower_win = target.self_drawn and self.winning_tile is None
+            target.turns = sum(len(d) for d in self.discards)
+        else:
+            target.dealer_streak = self.dealer_streak
+
+    # ── 序列化 ────────────────────────────────────────
+
+    def to_bytes(self) -> bytes:
+        """
+        緊湊的二進位格式：固定長度的表頭，接著牌牆（2-byte 長度）與
+        每位玩家的手牌/亮牌/面子結構/棄牌/花牌（各 1-byte 長度）。
+        """
+        parts = [
+            _HEADER.pack(
+                _MAGIC, _VERSION,
+                self.current_player, self.current_wind,
+                self.front_index, self.back_index & 0xFFFF,
+                0 if self.winner is None else self.winner + 1,
+                0 if self.discarder is None else self.discarder + 1,
+                self.winning_tile or 0,
+                self.winners,
+                self.dealer, self.dealer_streak,
+                _KONG_REPLACEMENT if self.kong_replacement else 0,
+            ),
+            struct.pack("<H", len(self.wall)),
+            self.wall,
+        ]
+        for i in range(len(self.hands)):
+            for seq in (self.hands[i], self.melds[i], self.meld_sets[i], self.discards[i], self.flowers[i]):
+                parts.append(bytes((len(seq),)))
+                parts.append(seq)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> GameState:
+        (magic, version, current_player, current_wind, front, back,
+         winner, discarder, winning_tile, winners,
+         dealer, dealer_streak, flags) = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不支援的狀態格式：{magic!r} v{version}")
+
+        pos = _HEADER.size
+        (wall_len,) = struct.unpack_from("<H", data, pos)
+        pos += 2
+        wall = data[pos:pos + wall_len]
+        pos += wall_len
+
+        columns: list[list[bytes]] = [[], [], [], [], []]
+        while pos < len(data):
+            for col in columns:
+                n = data[pos]
+                col.append(data[pos + 1:pos + 1 + n])
+                pos += 1 + n
+
+        return cls(
+            wall=bytes(wall),
+            front_index=front,
+            # 牌牆摸完時 back_index 會是 front_index - 1，可能為 -1
+            back_index=back if back != 0xFFFF else -1,
+            hands=tuple(columns[0]),
+            melds=tuple(columns[1]),
+            meld_sets=tuple(columns[2]),
+            discards=tuple(columns[3]),
+            flowers=tuple(columns[4]),
+            winners=winners,
+            current_player=current_player,
+            current_wind=current_wind,
+            dealer=dealer,
+            dealer_streak=dealer_streak,
+            winner=winner - 1 if winner else None,
+            discarder=discarder - 1 if discarder else None,
+            winning_tile=winning_tile or None,
+            kong_replacement=bool(flags & _KONG_REPLACEMENT),
+        )
@@ -0,0 +1,314 @@
+"""
+tables.py — 預先計算的分花色查表（寫成檔案、以 mmap 唯讀載入）
+
+胡牌、聽牌與向聽數都可以拆成「每個花色各自查表，再合併」：
+一個花色的張數組合以 5 進位編碼成索引（萬筒條 5⁹、字牌 5⁷ 種），
+每個索引存兩種資料：
+
+  flags   1 byte   bit0：全部拆成面子；bit1：拆成面子 + 一組對眼
+  blocks  12 bytes 對眼數 p（0/1）× 面子數 m（0–5）時最多幾個搭子，255 表示拆不出來
+                   （analysis.shanten 的 Pareto 組合只需要每個 (p, m) 的最大搭子數）
+
+build() 用 NumPy 依總張數由少到多整批遞推產生（需要 numpy，只在建表時需要），
+寫成帶版本號的二進位檔；load() 以 mmap 唯讀開啟，不複製到行程記憶體，
+同一台機器上的所有工作行程共用作業系統 page cache 裡的同一份，開啟幾乎不花時間。
+查表只用標準函式庫（memoryview 取 byte），沒有安裝 numpy 也能使用。
+
+檔案位置：環境變數 MAHJONG_TABLES，否則為 ~/.cache/mahjong/suit-tables-v{版本}.bin。
+找不到檔案時 get_tables() 回傳 None，呼叫端改用記憶化遞迴（scoring / analysis）。
+
+    mahjong build-tables            # 建表（約數秒）
+"""
+from __future__ import annotations
+import mmap
+import os
+import struct
+import warnings
+from functools import lru_cache
+
+FORMAT_VERSION = 1
+MAX_SUIT_TILES = 17          # 暗手最多 17 張，單一花色也不會超過
+_MAGIC = b"MJTB"
+# magic, 版本, 單一花色最多張數, 數牌索引數, 字牌索引數
+_HEADER = struct.Struct("<4sHHII")
+_ALIGN = 64
+
+_P = 2                       # 對眼數 0/1
+_M = MAX_SUIT_TILES // 3 + 1 # 面子數 0–5
+BLOCK_SIZE = _P * _M         # 每個索引的 blocks 位元組數
+NONE = 255                   # blocks 中「拆不出來」
+
+_SUIT_LEN = (9, 9, 9, 7)
+_POW5 = tuple(5 ** i for i in range(9))
+_SUIT_BASES = (10, 20, 30, 40)
+
+
+def default_path() -> str:
+    path = os.environ.get("MAHJONG_TABLES")
+    if path:
+        return path
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "mahjong", f"suit-tables-v{FORMAT_VERSION}.bin")
+
+
+def _suit_keys(codes: list[int]) -> tuple[list[int], list[int]] | None:
+    """四個花色的 5 進位索引與張數；同一種牌超過 4 張（無法編碼）時回傳 None。"""
+    keys = [0, 0, 0, 0]
+    totals = [0, 0, 0, 0]
+    seen = bytearray(48)
+    for code in codes:
+        suit = code // 10 - 1
+        keys[suit] += _POW5[code % 10 - 1]
+        totals[suit] += 1
+        seen[code] += 1
+    if max(seen) > 4:
+        return None
+    return keys, totals
+
+
+# ── 查表 ──────────────────────────────────────────────
+
+class SuitTables:
+    """以 mmap 開啟的查表檔"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            spans = self._check(path)
+        except ValueError:
+            self._mmap.close()
+            raise
+        # 驗證通過才建立 memoryview（有 memoryview 存在時 mmap 不能關閉）
+        self._view = memoryview(self._mmap)
+        suit_flags, suit_blocks, honor_flags, honor_blocks = (self._view[a:b] for a, b in spans)
+        self.path = path
+        # 依花色（萬筒條字）排好，查表時不用判斷是不是字牌
+        self.flags = (suit_flags, suit_flags, suit_flags, honor_flags)
+        self.blocks = (suit_blocks, suit_blocks, suit_blocks, honor_blocks)
+
+    def _check(self, path: str) -> list[tuple[int, int]]:
+        """驗證檔頭與檔案大小，回傳四個區段的 (起點, 終點)。"""
+        size = len(self._mmap)
+        if size < _HEADER.size:
+            raise ValueError(f"{path}：檔案太短")
+        magic, version, max_tiles, n_suit, n_honor = _HEADER.unpack(self._mmap[:_HEADER.size])
+        if magic != _MAGIC:
+            raise ValueError(f"{path}：不是查表檔")
+        if version != FORMAT_VERSION or max_tiles != MAX_SUIT_TILES:
+            raise ValueError(f"{path}：版本 {version} 與程式的版本 {FORMAT_VERSION} 不符，請重新建表")
+        if n_suit != 5 ** 9 or n_honor != 5 ** 7:
+            raise ValueError(f"{path}：索引數不符")
+
+        spans = []
+        offset = _aligned(_HEADER.size)
+        for n in (n_suit, n_suit * BLOCK_SIZE, n_honor, n_honor * BLOCK_SIZE):
+            if offset + n > size:
+                raise ValueError(f"{path}：檔案不完整")
+            spans.append((offset, offset + n))
+            offset = _aligned(offset + n)
+        return spans
+
+    def close(self):
+        for view in set(self.flags + self.blocks):
+            view.release()
+        self.flags = self.blocks = ()
+        self._view.release()
+        self._mmap.close()
+
+    # ── 判斷 ──────────────────────────────────────────
+    # 同一種牌超過 4 張的手牌不在表裡：以下都回傳 None，由呼叫端改用遞迴計算
+
+    def is_complete(self, codes: list[int]) -> bool | None:
+        """與 scoring.is_complete 相同。"""
+        suits = _suit_keys(codes)
+        if suits is None:
+            return None
+        keys, totals = suits
+        pairs = 0
+        for suit, key in enumerate(keys):
+            rem = totals[suit] % 3
+            if rem == 1:
+                return False
+            pairs += rem == 2
+            if not self.flags[suit][key] & (2 if rem == 2 else 1):
+                return False
+        return pairs == 1
+
+    def waits(self, codes: list[int]) -> list[int] | None:
+        """與 scoring.waits 相同：3n+1 張聽的牌。"""
+        suits = _suit_keys(codes)
+        if suits is None:
+            return None
+        keys, totals = suits
+        rems = [n % 3 for n in totals]
+        ok = [bool(self.flags[s][keys[s]] & (2 if rems[s] == 2 else 1)) if rems[s] != 1 else False
+              for s in range(4)]
+        result = []
+        for suit in range(4):
+            new_rem = (rems[suit] + 1) % 3
+            others = [rems[t] for t in range(4) if t != suit]
+            if new_rem == 1 or sorted(others + [new_rem]) != [0, 0, 0, 2]:
+                continue
+            if not all(ok[t] for t in range(4) if t != suit):
+                continue
+            bit = 2 if new_rem == 2 else 1
+            flags = self.flags[suit]
+            key = keys[suit]
+            for i in range(_SUIT_LEN[suit]):
+                if key // _POW5[i] % 5 < 4 and flags[key + _POW5[i]] & bit:
+                    result.append(_SUIT_BASES[suit] + i + 1)
+        return result
+
+    def shanten(self, codes: list[int]) -> int | None:
+        """與 analysis.shanten 相同：3n+1 張聽牌為 0，3n+2 張胡牌為 -1。"""
+        suits = _suit_keys(codes)
+        if suits is None:
+            return None
+        need = len(codes) // 3
+        # acc[p * _M + m]：目前為止 p 對眼、m 面子時最多幾個搭子（-1 為不可能）
+        acc = [0] + [-1] * (BLOCK_SIZE - 1)
+        for suit, key in enumerate(suits[0]):
+            if not key:
+                continue
+            blocks = self.blocks[suit]
+            base = key * BLOCK_SIZE
+            row = blocks[base:base + BLOCK_SIZE]
+            merged = [-1] * BLOCK_SIZE
+            for a in range(BLOCK_SIZE):
+                ta = acc[a]
+                if ta < 0:
+                    continue
+                pa, ma = divmod(a, _M)
+                for b in range(BLOCK_SIZE):
+                    tb = row[b]
+                    if tb == NONE:
+                        continue
+                    pb, mb = divmod(b, _M)
+                    if pa + pb > 1 or ma + mb >= _M:
+                        continue
+                    c = (pa + pb) * _M + ma + mb
+                    if ta + tb > merged[c]:
+                        merged[c] = ta + tb
+            acc = merged
+        best = 2 * need
+        for c, t in enumerate(acc):
+            if t < 0:
+                continue
+            p, m = divmod(c, _M)
+            m = min(m, need)
+            best = min(best, 2 * (need - m) - min(t, need - m) - p)
+        return best
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def load(path: str | None = None) -> SuitTables:
+    """以 mmap 開啟查表檔；格式或版本不符時丟出 ValueError。"""
+    return SuitTables(path or default_path())
+
+
+@lru_cache(maxsize=None)
+def get_tables() -> SuitTables | None:
+    """行程內共用的查表；檔案不存在時回傳 None（版本不符時另外發出警告）。"""
+    path = default_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        return SuitTables(path)
+    except (OSError, ValueError) as e:
+        warnings.warn(f"無法載入查表，改用即時計算：{e}", RuntimeWarning, stacklevel=2)
+        return None
+
+
+# ── 建表 ──────────────────────────────────────────────
+
+def _build_suit(n_digits: int, honor: bool):
+    """回傳 (flags, blocks)：單一花色所有索引的查表（NumPy 陣列）。"""
+    import numpy as np
+
+    size = 5 ** n_digits
+    pow5 = np.array(_POW5[:n_digits], dtype=np.int64)
+    keys = np.arange(size, dtype=np.int64)
+    digits = (keys[:, None] // pow5) % 5                       # (size, n_digits)
+    totals = digits.sum(axis=1)
+    first = np.where(totals > 0, (digits > 0).argmax(axis=1), 0)
+
+    blocks = np.full((size, _P, _M), -1, dtype=np.int16)
+    blocks[0, 0, 0] = 0
+
+    # 與 analysis._suit_blocks 相同的取法：只動第一張有牌的位置 i
+    #   (移除的相對位置, 面子, 搭子, 對眼, 需要 i 的張數)
+    takes = [
+        ((0,), 0, 0, 0, 1),         # 孤張
+        ((0, 0, 0), 1, 0, 0, 3),    # 刻子
+        ((0, 0), 0, 0, 1, 2),       # 對眼
+        ((0, 0), 0, 1, 0, 2),       # 對子當搭子
+    ]
+    if not honor:
+        takes += [
+            ((0, 1, 2), 1, 0, 0, 1),  # 順子
+            ((0, 1), 0, 1, 0, 1),     # 兩面/邊張
+            ((0, 2), 0, 1, 0, 1),     # 嵌張
+        ]
+
+    for total in range(1, MAX_SUIT_TILES + 1):
+        idx = np.nonzero(totals == total)[0]
+        i = first[idx]
+        d = digits[idx]
+        out = np.full((len(idx), _P, _M), -1, dtype=np.int16)
+        for offsets, dm, dt, dp, min_first in takes:
+            span = max(offsets)
+            ok = (d[np.arange(len(idx)), i] >= min_first) & (i + span < n_digits)
+            delta = np.zeros(len(idx), dtype=np.int64)
+            for off in offsets:
+                pos = np.minimum(i + off, n_digits - 1)
+                if off:
+                    ok &= d[np.arange(len(idx)), pos] >= 1
+                delta += pow5[pos]
+            if not ok.any():
+                continue
+            rows = np.nonzero(ok)[0]
+            sub = blocks[idx[rows] - delta[rows]]               # (k, _P, _M)
+            shifted = np.full_like(sub, -1)
+            shifted[:, dp:, dm:] = sub[:, :_P - dp, :_M - dm]
+            shifted = np.where(shifted >= 0, shifted + dt, -1)
+            out[rows] = np.maximum(out[rows], shifted)
+        blocks[idx] = out
+
+    flags = np.zeros(size, dtype=np.uint8)
+    melds_only = (totals % 3 == 0) & (totals <= MAX_SUIT_TILES)
+    with_pair = (totals % 3 == 2) & (totals <= MAX_SUIT_TILES)
+    m = np.minimum(totals // 3, _M - 1)
+    flags[melds_only & (blocks[keys, 0, m] >= 0)] |= 1
+    m = np.minimum(np.maximum(totals - 2, 0) // 3, _M - 1)
+    flags[with_pair & (blocks[keys, 1, m] >= 0)] |= 2
+    flags[0] = 1
+    blocks = np.where(blocks >= 0, blocks, NONE).astype(np.uint8).reshape(size, BLOCK_SIZE)
+    return flags, blocks
+
+
+def build(path: str | None = None) -> str:
+    """產生查表並寫入 path（先寫暫存檔再改名，寫到一半不會留下壞檔）。回傳路徑。"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        raise RuntimeError("建表需要 numpy（pip install 'mahjong[sim]'）") from None
+
+    path = path or default_path()
+    suit_flags, suit_blocks = _build_suit(9, honor=False)
+    honor_flags, honor_blocks = _build_suit(7, honor=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, MAX_SUIT_TILES, 5 ** 9, 5 ** 7))
+        for array in (suit_flags, suit_blocks, honor_flags, honor_blocks):
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
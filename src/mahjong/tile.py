@@ -1,5 +1,13 @@
 from __future__ import annotations
 
+# 34 種可打出的牌（不含花），依 code 排序；陣列化的表示法都以這個順序為索引
+TILE_CODES: tuple[int, ...] = (
+    tuple(range(11, 20)) + tuple(range(21, 30)) +
+    tuple(range(31, 40)) + tuple(range(41, 48))
+)
+# code -> 0..33 的索引
+TILE_INDEX: dict[int, int] = {code: i for i, code in enumerate(TILE_CODES)}
+
 
 class Tile:
     """麻將牌"""
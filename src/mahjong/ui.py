@@ -12,7 +12,8 @@ ui.py — curses 全屏 TUI 工具模組
 """
 from __future__ import annotations
 import curses
-from typing import TYPE_CHECKING
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable
 
 if TYPE_CHECKING:
     from .tile import Tile
@@ -63,19 +64,20 @@ def draw_table(
     players: list,
     current_player: int,
     ai_players: set[int],
-    deck_remaining: int,
+    deck_remaining: int | None,
     highlight_player: int = -1,
     msg: str = "",
     sub_msg: str = "",          # 常駐資訊列（上一手出牌）
 ):
-    """繪製整個桌面（對手區 + 狀態列）。"""
+    """繪製整個桌面（對手區 + 狀態列）。deck_remaining 為 None 時不顯示牌庫張數。"""
     stdscr.clear()
 
     # 標題
     title = "  麻將"
-    deck_info = f"  牌庫剩 {deck_remaining} 張"
     _safe_addstr(stdscr, 0, 0, title, curses.color_pair(COLOR_TITLE) | curses.A_BOLD)
-    _safe_addstr(stdscr, 0, len(title) + 2, deck_info)
+    if deck_remaining is not None:
+        deck_info = f"  牌庫剩 {deck_remaining} 張"
+        _safe_addstr(stdscr, 0, len(title) + 2, deck_info)
 
     row = 2
     for i, p in enumerate(players):
@@ -253,6 +255,25 @@ def draw_hint_bar(stdscr, hint: str):
 
 
 # ── 互動輸入 ────────────────────────────────────────────────
+#
+# cancelled：由 asyncio 驅動時（Game.run_async）這些函式在背景執行緒執行，
+# 回合逾時後主執行緒讓 cancelled() 回傳 True，等待中的函式就回傳 None。
+
+def _read_key(stdscr, cancelled: "Callable[[], bool] | None") -> int | None:
+    """等一個按鍵；有 cancelled 時每 50ms 檢查一次，被取消回傳 None。"""
+    if cancelled is None:
+        return stdscr.getch()
+    stdscr.timeout(50)
+    try:
+        while True:
+            key = stdscr.getch()
+            if key != -1:
+                return key
+            if cancelled():
+                return None
+    finally:
+        stdscr.timeout(-1)
+
 
 def select_from_hand(
     stdscr,
@@ -260,14 +281,20 @@ def select_from_hand(
     player_idx: int,
     ai_players: set[int],
     deck_remaining: int,
-    advice: dict[int, list] | None = None,
+    advice: "dict[int, list] | Future | None" = None,
     newly_drawn: "Tile | None" = None,
     msg: str = "",
     sub_msg: str = "",
-) -> int:
+    show_advice: bool = True,
+    on_toggle_advice: "Callable[[bool], None] | None" = None,
+    cancelled: "Callable[[], bool] | None" = None,
+) -> int | None:
     """
     阻塞等待玩家用 ← → 選牌，Enter 確認。
-    回傳選中的手牌索引。
+    回傳選中的手牌索引（被 cancelled 取消時為 None）。
+
+    advice 可以是還在背景計算的 Future：算好之前照常接受按鍵，
+    每 50ms 檢查一次，算好就重畫。? 只切換顯示（並通知 on_toggle_advice），不重算。
     """
     player = players[player_idx]
     # 游標起始位置 = 摸進來的牌的實際索引（排序後不一定在最右）
@@ -279,26 +306,47 @@ def select_from_hand(
     else:
         cursor = len(player.hand_tiles) - 1
 
-    while True:
-        row = draw_table(stdscr, players, player_idx, ai_players,
-                         deck_remaining, msg=msg, sub_msg=sub_msg)
-        draw_hand(stdscr, player, player_idx, cursor, advice,
-                  newly_drawn, start_row=row)
-        draw_hint_bar(stdscr, "← → 移動    Enter 打出    ? 顯示/隱藏聽牌建議")
-        stdscr.refresh()
-
-        key = stdscr.getch()
-
-        if key == curses.KEY_LEFT:
-            cursor = max(0, cursor - 1)
-        elif key == curses.KEY_RIGHT:
-            cursor = min(len(player.hand_tiles) - 1, cursor + 1)
-        elif key in (curses.KEY_ENTER, ord('\n'), ord('\r')):
-            return cursor
-        elif key == ord('?'):
-            # 切換建議顯示：由呼叫者重算 advice 傳入，此處 toggle 邏輯在 game.py
-            # 這裡只回傳特殊值 -1 告知 game.py 使用者按了 ?
-            return -1
+    try:
+        while True:
+            pending = isinstance(advice, Future) and not advice.done()
+            if isinstance(advice, Future) and not pending:
+                # 背景計算失敗就當作沒有建議
+                advice = advice.result() if advice.exception() is None else None
+            visible = advice if show_advice and not pending else None
+
+            row = draw_table(stdscr, players, player_idx, ai_players,
+                             deck_remaining, msg=msg, sub_msg=sub_msg)
+            row = draw_hand(stdscr, player, player_idx, cursor, visible,
+                            newly_drawn, start_row=row)
+            if show_advice and pending:
+                _safe_addstr(stdscr, row, 0, "聽牌建議計算中…",
+                             curses.color_pair(COLOR_ADVICE))
+            draw_hint_bar(stdscr, "← → 移動    Enter 打出    ? 顯示/隱藏聽牌建議")
+            stdscr.refresh()
+
+            # 建議還沒算好時不要一直卡在 getch，逾時就回來檢查
+            if show_advice and pending:
+                stdscr.timeout(50)
+                key = stdscr.getch()
+                if key == -1 and cancelled is not None and cancelled():
+                    return None
+            else:
+                key = _read_key(stdscr, cancelled)
+                if key is None:
+                    return None
+
+            if key == curses.KEY_LEFT:
+                cursor = max(0, cursor - 1)
+            elif key == curses.KEY_RIGHT:
+                cursor = min(len(player.hand_tiles) - 1, cursor + 1)
+            elif key in (curses.KEY_ENTER, ord('\n'), ord('\r')):
+                return cursor
+            elif key == ord('?'):
+                show_advice = not show_advice
+                if on_toggle_advice is not None:
+                    on_toggle_advice(show_advice)
+    finally:
+        stdscr.timeout(-1)
 
 
 def select_from_options(
@@ -310,9 +358,11 @@ def select_from_options(
     options: list[str],
     msg: str = "",
     sub_msg: str = "",
-) -> int:
+    cancelled: "Callable[[], bool] | None" = None,
+) -> int | None:
     """
     阻塞等待玩家用 ↑ ↓ 選擇動作，Enter 確認，Esc 略過。
+    被 cancelled 取消時回傳 None。
     """
     player = players[player_idx]
     cursor = 0
@@ -342,7 +392,9 @@ def select_from_options(
         draw_hint_bar(stdscr, "↑ ↓ 移動    Enter 確認    Esc 略過")
         stdscr.refresh()
 
-        key = stdscr.getch()
+        key = _read_key(stdscr, cancelled)
+        if key is None:
+            return None
 
         if key == curses.KEY_UP:
             cursor = max(0, cursor - 1)
@@ -363,9 +415,10 @@ def prompt_yn(
     question: str,
     newly_drawn: "Tile | None" = None,
     sub_msg: str = "",
-) -> bool:
+    cancelled: "Callable[[], bool] | None" = None,
+) -> bool | None:
     """
-    展示手牌，並在底部問 y/n。
+    展示手牌，並在底部問 y/n。被 cancelled 取消時回傳 None。
     """
     player = players[player_idx]
 
@@ -377,7 +430,9 @@ def prompt_yn(
         draw_hint_bar(stdscr, "y 是    n 否")
         stdscr.refresh()
 
-        key = stdscr.getch()
+        key = _read_key(stdscr, cancelled)
+        if key is None:
+            return None
         if key in (ord('y'), ord('Y')):
             return True
         elif key in (ord('n'), ord('N')):
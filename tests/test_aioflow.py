@@ -0,0 +1,48 @@
+from __future__ import annotations
+import asyncio
+import random
+
+import pytest
+
+from mahjong.aioflow import TIMEOUT, RemoteAgent, ai, run_hand_async
+from mahjong.flow import Decision, HandState, encode_answer
+
+
+def _state(seed: int) -> HandState:
+    state = HandState()
+    state.deal(random.Random(seed))
+    return state
+
+
+@pytest.mark.parametrize('ticket,value', [(1, '0'), (1, 1.0), (1, True), (1, None), (1, [0]),
+                                          (2, 0), (True, 0), ('1', 0), (1, 99)])
+def test_remote_agent_rejects_bad_answers(ticket, value):
+    async def main():
+        prompts = []
+        agent = RemoteAgent(prompts.append)
+        state = _state(0)
+        decision = Decision(Decision.SELF_DRAW, 0)
+        if value == 99:
+            decision = Decision(Decision.REACTION, 0, options=[("碰", None)])
+        task = asyncio.create_task(agent(state, decision))
+        await asyncio.sleep(0)
+        assert prompts[0]['ticket'] == 1
+        assert not agent.submit(ticket, value)
+        assert agent.submit(1, 0)
+        assert encode_answer(decision, await task) == 0
+    asyncio.run(main())
+
+
+def test_silent_remote_seats_time_out_to_the_fallback():
+    async def main():
+        state = _state(5)
+        reasons = []
+
+        async def observer(st, decision, answer, substituted):
+            reasons.append(substituted)
+
+        silent = RemoteAgent(lambda prompt: None)
+        await run_hand_async(state, [silent, ai(), ai(), ai()], timeouts=0.001, observer=observer)
+        assert TIMEOUT in reasons
+        assert state.winner is not None or state.deck.get_remaining_tiles_count() <= 16
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import analysis_service
+from analysis_service import AnalysisService
+from mahjong.analysis import normalize_request
+
+HAND = {"hand": "11 12 13 14 15 16 17 18 19 21 22 23 31 32 33 45", "queries": ["waits"]}
+
+
+def test_analyze_answers_and_caches():
+    async def main():
+        service = AnalysisService(workers=1)
+        await service.start()
+        try:
+            query = normalize_request(HAND)
+            first, second = await asyncio.gather(service.analyze(query), service.analyze(query))
+            assert first == second and first["waits"] == [45]
+            assert service.coalesced == 1
+            assert await service.analyze(query) == first and service.hits == 1
+        finally:
+            await service.close()
+        assert not service._batches
+    asyncio.run(main())
+
+
+def test_close_cancels_running_batches(monkeypatch):
+    def slow(queries):
+        time.sleep(0.3)
+        return [{} for _ in queries]
+
+    monkeypatch.setattr(analysis_service, "evaluate_batch", slow)
+
+    async def main():
+        service = AnalysisService(workers=1, batch_window=0)
+        await service.start()
+        service.pool.shutdown()
+        service.pool = ThreadPoolExecutor(1)
+        pending = asyncio.create_task(service.analyze(normalize_request(HAND)))
+        while not service._batches:
+            await asyncio.sleep(0.01)
+        batch = next(iter(service._batches))
+        await service.close()
+        assert batch.cancelled() and not service._batches
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+    asyncio.run(main())
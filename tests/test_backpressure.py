@@ -0,0 +1,78 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+import socketio
+
+from backpressure import DISCONNECT, OutboundRouter
+
+
+class FakeManager:
+    def eio_sid_from_sid(self, sid, namespace):
+        return f"eio-{sid}"
+
+
+class FakeEngine:
+    """engineio 的替身：send 記下送出的訊息，sockets 裡沒有任何連線"""
+
+    def __init__(self):
+        self.sent = []
+        self.sockets = {}
+
+    async def send(self, eio_sid, data):
+        self.sent.append((eio_sid, data))
+
+
+class FakeServer:
+    def __init__(self):
+        real = socketio.AsyncServer()
+        self.packet_class = real.packet_class
+        self.manager = FakeManager()
+        self.eio = FakeEngine()
+        self.emitted = []
+        self.disconnected = []
+        self.release = asyncio.Event()
+
+    async def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+    async def disconnect(self, sid):
+        await self.release.wait()
+        self.disconnected.append(sid)
+
+
+def test_frames_go_through_the_public_send_api():
+    async def main():
+        sio = FakeServer()
+        router = OutboundRouter(sio)
+        router.open('a')
+        router.broadcast(['a'], 'table_event', {'seq': 1})
+        await asyncio.sleep(0.01)
+        assert sio.eio.sent == [('eio-a', '2["table_event",{"seq":1}]')]
+        router.close('a')
+    asyncio.run(main())
+
+
+def test_missing_engine_internals_warn_once():
+    sio = FakeServer()
+    del sio.eio.sockets
+    router = OutboundRouter(sio)
+    with pytest.warns(RuntimeWarning):
+        assert router.transport_backlog('a') == 0
+    assert not router.backlog_supported
+    assert router.transport_backlog('a') == 0
+
+
+def test_kick_keeps_the_disconnect_task():
+    async def main():
+        sio = FakeServer()
+        router = OutboundRouter(sio, maxlen=1, policy=DISCONNECT)
+        router.open('a')
+        router.send('a', 'x', {})
+        router.send('a', 'x', {})       # 佇列已滿 -> 斷線
+        assert router.overflows == 1 and 'a' not in router.outboxes
+        assert len(router._kicks) == 1
+        sio.release.set()
+        await asyncio.gather(*router._kicks)
+        assert sio.disconnected == ['a'] and not router._kicks
+    asyncio.run(main())
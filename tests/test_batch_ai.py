@@ -0,0 +1,68 @@
+from __future__ import annotations
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mahjong import batch_ai
+from mahjong.ai import SimpleAI
+from mahjong.env import CHOW_HIGH, CHOW_LOW, CHOW_MID, HU, KONG, PASS, PONG
+from mahjong.flow import legal_reactions
+from mahjong.player import Player
+from mahjong.tile import TILE_CODES, TILE_INDEX, Tile
+
+
+def _hands(n: int, size: int, seed: int) -> list[list[Tile]]:
+    """n 副依 code 排序的手牌（與 Player.order_hand 之後相同）。"""
+    rng = random.Random(seed)
+    wall = [code for code in TILE_CODES for _ in range(4)]
+    return [[Tile(c) for c in sorted(rng.sample(wall, size))] for _ in range(n)]
+
+
+def _action(answer, tile: Tile) -> int:
+    """SimpleAI.choose_reaction 的答案 -> env 的動作編號。"""
+    if answer is None:
+        return PASS
+    action, extra = answer
+    if action == "吃":
+        low = extra[0]
+        return CHOW_LOW if low == tile.code - 2 else CHOW_MID if low == tile.code - 1 else CHOW_HIGH
+    return {"胡": HU, "槓": KONG, "碰": PONG}[action]
+
+
+@pytest.mark.parametrize("size", [2, 5, 14, 17])
+def test_discard_matches_simple_ai(size):
+    hands = _hands(300, size, seed=size)
+    chosen = batch_ai.discard_batch(batch_ai.counts_of(hands))
+    expected = [TILE_INDEX[SimpleAI.choose_discard(hand).code] for hand in hands]
+    assert list(chosen) == expected
+
+
+def test_pong_matches_simple_ai():
+    rng = random.Random(1)
+    hands = _hands(500, 16, seed=1)
+    # 一半的題目從手牌裡挑，才會有夠多能碰的情況
+    tiles = [rng.choice(hand) if i % 2 else Tile(rng.choice(TILE_CODES)) for i, hand in enumerate(hands)]
+    got = batch_ai.pong_batch(batch_ai.counts_of(hands), [TILE_INDEX[t.code] for t in tiles])
+    assert list(got) == [SimpleAI.choose_pong(h, t) for h, t in zip(hands, tiles)]
+
+
+def test_reaction_matches_simple_ai():
+    rng = random.Random(2)
+    hands = _hands(500, 16, seed=2)
+    tiles, can_hu, is_next, expected = [], [], [], []
+    for i, hand in enumerate(hands):
+        tile = rng.choice(hand) if i % 2 else Tile(rng.choice(TILE_CODES))
+        player = Player()
+        for t in hand:
+            player.add_tile_to_hand(t)
+        nxt = i % 3 == 0
+        actions = legal_reactions(player, tile, nxt)
+        tiles.append(TILE_INDEX[tile.code])
+        can_hu.append(player.can_win_with(tile))
+        is_next.append(nxt)
+        expected.append(_action(SimpleAI.choose_reaction(hand, tile, actions), tile))
+    got = batch_ai.reaction_batch(batch_ai.counts_of(hands), tiles, can_hu, np.array(is_next))
+    assert list(got) == expected
+    assert {PASS, PONG, KONG, CHOW_LOW, CHOW_MID, CHOW_HIGH}.issubset(expected)
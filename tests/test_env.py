@@ -0,0 +1,68 @@
+from __future__ import annotations
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mahjong.env import MahjongEnv, VectorEnv, observe
+from mahjong.flow import HandState, run_hand
+from mahjong.tile import TILE_INDEX, Tile
+
+
+def _with_concealed_kong(seat: int) -> HandState:
+    state = HandState()
+    state.deal(random.Random(0))
+    player = state.players[seat]
+    for _ in range(4):
+        player.add_tile_to_hand(Tile(47))
+    player.declare_concealed_kong(Tile(47))
+    return state
+
+
+def test_opponent_concealed_kong_is_hidden():
+    state = _with_concealed_kong(2)
+    obs = observe(state, 0, None)
+    assert obs["melds"][2].sum() == 0
+    assert list(obs["concealed_kongs"]) == [0, 0, 1, 0]
+
+
+def test_own_concealed_kong_is_visible():
+    state = _with_concealed_kong(2)
+    obs = observe(state, 2, None)
+    assert obs["melds"][0][TILE_INDEX[47]] == 4
+    assert list(obs["concealed_kongs"]) == [1, 0, 0, 0]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_meld_planes_match_exposed_tiles(seed):
+    state = HandState()
+    state.deal(random.Random(seed))
+    run_hand(state)
+    obs = observe(state, 1, None)
+    for row in range(4):
+        p = state.players[(1 + row) % 4]
+        hidden = 4 * sum(1 for kind, _ in p.melds if kind == "concealed_kong") if row else 0
+        assert obs["melds"][row].sum() == len(p.melded_tiles) - hidden
+
+
+def test_env_plays_to_the_end_with_legal_actions():
+    env = MahjongEnv(seat=0)
+    obs, info = env.reset(seed=3)
+    done = False
+    while not done:
+        assert info["action_mask"].any()
+        action = int(np.flatnonzero(info["action_mask"])[0])
+        obs, reward, done, truncated, info = env.step(action)
+        assert not truncated
+    assert reward in (1.0, -1.0, -1.0 / 3, 0.0)
+
+
+def test_vector_env_batches_observations():
+    env = VectorEnv(3)
+    obs, infos = env.reset(seed=0)
+    assert obs["melds"].shape == (3, 4, 34)
+    assert obs["concealed_kongs"].shape == (3, 4)
+    actions = [int(np.flatnonzero(m)[0]) for m in env.action_masks()]
+    obs, rewards, terminated, truncated, infos = env.step(actions)
+    assert rewards.shape == (3,) and not truncated.any()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+import random
+
+import pytest
+
+from mahjong.flow import Decision, HandState, ai_agent, decode_answer, encode_answer, is_legal, run_hand
+from mahjong.rule_engine import RuleEngine
+
+
+def _checked_agent(log: list[Decision]):
+    """SimpleAI 的 agent，外加檢查每個答案都合法、編碼後能解回同一個答案。"""
+    base = ai_agent()
+
+    def agent(state: HandState, decision: Decision) -> object:
+        answer = base(state, decision)
+        assert is_legal(decision, answer), (decision, answer)
+        assert decode_answer(decision, encode_answer(decision, answer)) == answer
+        log.append(decision)
+        return answer
+    return agent
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_hand_ends_in_a_legal_win_or_a_draw(seed):
+    state = HandState(dealer=seed % 4)
+    state.deal(random.Random(seed))
+    log: list[Decision] = []
+    run_hand(state, [_checked_agent(log)] * 4)
+    # 發牌後的暗槓可以是任何人，第一張打牌一定是莊家
+    discards = [d for d in log if d.kind == Decision.DISCARD]
+    assert not discards or discards[0].player_idx == seed % 4
+
+    if state.winner is None:
+        # 流局：牌牆只剩留給槓的 16 張（或更少）
+        assert state.deck.get_remaining_tiles_count() <= 16
+        assert state.discarder is None
+        return
+    winner = state.players[state.winner]
+    assert winner.is_winner and sum(p.is_winner for p in state.players) == 1
+    if not state.flower_win:
+        assert RuleEngine.is_hu(winner.hand_tiles, None)
+        assert state.winning_tile in winner.hand_tiles
+    if state.discarder is not None:
+        assert state.discarder != state.winner and not state.self_drawn
+
+
+def test_same_seed_same_hand():
+    a, b = HandState(), HandState()
+    a.deal(random.Random(7))
+    b.deal(random.Random(7))
+    run_hand(a)
+    run_hand(b)
+    assert (a.winner, a.discarder, a.winning_tile) == (b.winner, b.discarder, b.winning_tile)
+    assert [p.discarded_tiles for p in a.players] == [p.discarded_tiles for p in b.players]
+
+
+def test_reset_reuses_deck_and_players():
+    state = HandState()
+    deck, players = state.deck, list(state.players)
+    state.deal(random.Random(1))
+    run_hand(state)
+    state.reset(dealer=2, current_wind=3)
+    assert state.deck is deck and state.players == players
+    assert state.winner is None and all(not p.hand_tiles and not p.melds for p in players)
+    assert (state.dealer, state.current_wind) == (2, 3)
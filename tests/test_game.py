@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from mahjong.game import Game
+from mahjong.tile import Tile
+
+# 11 12 邊張聽 13；其餘為順子與 29 對眼
+SINGLE_WAIT = [11, 12, 14, 15, 16, 21, 22, 23, 31, 32, 33, 37, 38, 39, 29, 29]
+
+
+def _game(hand: list[int], front: list[int], back: list[int] = (), remaining: int = 100) -> Game:
+    """四家都是 AI、不畫畫面的 Game；玩家 0 的手牌為 hand，牌庫前端依序摸到 front、後端摸到 back。"""
+    game = Game(None, ai_players={0, 1, 2, 3})
+    game._show_msg = lambda msg, pause=False: None
+    for code in hand:
+        game.players[0].add_tile_to_hand(Tile(code))
+    deck = game.deck
+    deck.front_index = 0
+    deck.back_index = remaining - 1
+    for i, code in enumerate(front):
+        deck.tiles[i] = Tile(code)
+    for i, code in enumerate(back):
+        deck.tiles[deck.back_index - i] = Tile(code)
+    return game
+
+
+def _names(result) -> list[str]:
+    return [name for name, _ in result.patterns]
+
+
+def test_self_draw_scores_single_wait():
+    game = _game(SINGLE_WAIT, front=[13])
+    assert game.play_turn()
+    assert game._winner == 0 and game._discarder is None
+    assert game._winning_tile == Tile(13)
+    assert _names(game._score()) == ["莊家", "門清自摸", "獨聽"]
+
+
+def test_self_draw_on_the_last_tile():
+    game = _game(SINGLE_WAIT, front=[13], remaining=17)
+    assert game.play_turn()
+    assert "海底撈月" in _names(game._score())
+
+
+def test_self_draw_after_concealed_kong():
+    hand = [19, 19, 19, 11, 12, 14, 15, 16, 21, 22, 23, 31, 32, 33, 29, 29]
+    game = _game(hand, front=[19], back=[13])
+    assert game.play_turn()
+    assert game.players[0].melds == [("concealed_kong", 19)]
+    assert game._kong_replacement
+    assert _names(game._score()) == ["莊家", "門清自摸", "獨聽", "槓上開花"]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from loadtest import LoadStats
+
+
+def test_record_forgets_after_the_last_receiver():
+    stats = LoadStats()
+    action = stats.new_action("t", seat=0, receivers=2)
+    stats.record(action)
+    assert action in stats.sent_at
+    stats.record(action)
+    assert not stats.sent_at and not stats.waiting and not stats.sender_of
+    assert len(stats.latencies) == 2 and stats.missed == 0
+
+
+def test_receiver_disconnect_drops_pending_broadcasts():
+    stats = LoadStats()
+    mine = stats.new_action("t", seat=1, receivers=1)
+    theirs = stats.new_action("t", seat=0, receivers=1)
+    other_table = stats.new_action("u", seat=0, receivers=1)
+    stats.receiver_left("t", seat=1)
+    # 斷線的人自己送出的廣播本來就不會送給自己
+    assert mine in stats.sent_at and theirs not in stats.sent_at
+    assert other_table in stats.sent_at and stats.missed == 1
+
+
+def test_expire_drops_old_entries():
+    stats = LoadStats()
+    stats.new_action("t", seat=0, receivers=3)
+    assert stats.expire(60) == 0
+    assert stats.expire(0) == 1
+    assert not stats.sent_at and not stats.sender_of and stats.missed == 3
+    assert stats.new_action("t", seat=0, receivers=0) not in stats.sent_at
@@ -0,0 +1,50 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from metrics import Metrics
+
+
+def _types(text: str) -> dict[str, str]:
+    return {line.split()[2]: line.split()[3] for line in text.splitlines() if line.startswith("# TYPE")}
+
+
+def test_prometheus_types():
+    metrics = Metrics()
+    metrics.gauge("live_hands", lambda: 2)
+    metrics.counter("rate_limited_total", lambda: 5)
+
+    @metrics.timed
+    async def play_tile():
+        return None
+
+    asyncio.run(play_tile())
+    metrics.loop_lag.observe(0.002)
+    text = metrics.to_prometheus()
+    assert _types(text) == {
+        "mahjong_live_hands": "gauge",
+        "mahjong_rate_limited_total": "counter",
+        "mahjong_events_per_second": "gauge",
+        "mahjong_loop_lag_seconds": "histogram",
+        "mahjong_handler_seconds": "histogram",
+    }
+    assert "mahjong_rate_limited_total 5" in text.splitlines()
+    assert 'mahjong_loop_lag_seconds_bucket{le="0.0025"} 1' in text
+    assert 'mahjong_loop_lag_seconds_bucket{le="+Inf"} 1' in text
+    assert 'mahjong_handler_seconds_count{handler="play_tile"} 1' in text
+
+
+def test_names_match_the_kind():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        metrics.gauge("dropped_total", lambda: 0)
+    with pytest.raises(ValueError):
+        metrics.counter("dropped", lambda: 0)
+
+
+def test_server_exports_totals_as_counters():
+    import server
+    types = _types(server.metrics.to_prometheus())
+    totals = [name for name in types if name.endswith("_total")]
+    assert totals and all(types[name] == "counter" for name in totals)
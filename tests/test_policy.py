@@ -0,0 +1,73 @@
+from __future__ import annotations
+import random
+
+import pytest
+
+from mahjong import policy
+from mahjong.ai import SimpleAI
+from mahjong.deck import Deck
+
+
+@pytest.fixture
+def registry():
+    saved = dict(policy.EVALUATORS)
+    yield policy.EVALUATORS
+    policy.EVALUATORS.clear()
+    policy.EVALUATORS.update(saved)
+
+
+def test_matches_simple_ai(tmp_path):
+    path, _ = policy.build(str(tmp_path / "p.bin"), max_tiles=4)
+    cached = policy.DiscardPolicy.load(path)
+    rng = random.Random(0)
+    for _ in range(300):
+        deck = Deck()
+        rng.shuffle(deck.tiles)
+        hand = [t for t in deck.tiles if t.code < 50][:rng.choice((14, 17))]
+        assert cached.choose_discard(hand) == SimpleAI.choose_discard(hand)
+    assert cached.hits and cached.misses
+
+
+def test_header_name_is_never_imported(tmp_path):
+    path, _ = policy.build(str(tmp_path / "p.bin"), max_tiles=2)
+    data = bytearray(open(path, "rb").read())
+    magic, version, max_tiles, n, name_len = policy._HEADER.unpack_from(data)
+    name = b"os:system"
+    forged = (policy._HEADER.pack(magic, version, max_tiles, n, len(name)) + name
+              + data[policy._HEADER.size + name_len:])
+    (tmp_path / "forged.bin").write_bytes(forged)
+    with pytest.raises(LookupError):
+        policy.DiscardPolicy.load(str(tmp_path / "forged.bin"))
+    # 呼叫端直接給 evaluator 時不看檔頭的名稱
+    loaded = policy.DiscardPolicy.load(str(tmp_path / "forged.bin"), policy.simple_suit_values)
+    assert loaded.evaluator is policy.simple_suit_values
+
+
+def test_registered_evaluator_round_trip(tmp_path, registry):
+    def flat(counts, left, right, honor):
+        return (0,) * len(counts)
+
+    with pytest.raises(LookupError):
+        policy.build(str(tmp_path / "p.bin"), max_tiles=2, evaluator=flat)
+    policy.register_evaluator("flat", flat)
+    path, _ = policy.build(str(tmp_path / "p.bin"), max_tiles=2, evaluator=flat)
+    assert policy.DiscardPolicy.load(path).evaluator is flat
+    del registry["flat"]
+    with pytest.raises(LookupError):
+        policy.DiscardPolicy.load(path)
+
+
+def test_get_policy_warns_only_for_bad_files(tmp_path, monkeypatch):
+    path = tmp_path / "p.bin"
+    monkeypatch.setenv("MAHJONG_POLICY", str(path))
+    path.write_bytes(b"junk")
+    policy.get_policy.cache_clear()
+    try:
+        with pytest.warns(RuntimeWarning):
+            assert policy.get_policy().values == {}
+        policy.get_policy.cache_clear()
+        path.write_bytes(policy._HEADER.pack(policy._MAGIC, policy.FORMAT_VERSION, 0, 0, 3) + b"bad")
+        with pytest.raises(LookupError):
+            policy.get_policy()
+    finally:
+        policy.get_policy.cache_clear()
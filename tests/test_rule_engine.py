@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from mahjong.rule_engine import RuleEngine
+from mahjong.tile import Tile
+
+
+def _tiles(*codes: int) -> list[Tile]:
+    return [Tile(c) for c in codes]
+
+
+def test_is_hu_basic_hand():
+    hand = _tiles(11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 23, 31, 32, 33, 45)
+    assert RuleEngine.is_hu(hand, Tile(45))
+    assert not RuleEngine.is_hu(hand, Tile(44))
+
+
+def test_is_hu_rejects_honor_sequences():
+    # 西北中、東南西都不是順子：字牌只能成刻子或對眼
+    assert not RuleEngine.is_hu(_tiles(43, 44, 45, 11), Tile(11))
+    assert not RuleEngine.is_hu(_tiles(41, 42, 43, 11, 12, 13, 21, 21), None)
+    assert not RuleEngine.is_hu(_tiles(41, 42, 43, 44, 45, 46, 47, 47), None)
+
+
+def test_is_hu_honor_pungs_and_pair():
+    assert RuleEngine.is_hu(_tiles(41, 41, 41, 45, 45, 45, 47), Tile(47))
+
+
+def test_ting_tiles_ignore_honor_sequences():
+    # 東南 + 一對：以前會誤判聽西（東南西當順子）
+    hand = _tiles(41, 42, 11, 11)
+    assert RuleEngine.get_ting_tiles(hand) == []
+    assert RuleEngine.get_ting_tiles(_tiles(11, 12, 21, 21)) == _tiles(13)
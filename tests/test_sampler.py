@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mahjong.rule_engine import RuleEngine
+from mahjong.sampler import HandSampler, to_tiles
+from mahjong.tile import TILE_CODES
+
+
+@pytest.mark.parametrize("kind", ["winning", "tenpai"])
+def test_zero_hands_keep_the_shape(kind):
+    sampler = HandSampler(seed=0)
+    empty = getattr(sampler, kind)(0)
+    full = getattr(sampler, kind)(2)
+    assert empty.keys() == full.keys()
+    for key, value in full.items():
+        assert empty[key].shape == (0,) + value.shape[1:]
+        assert empty[key].dtype == value.dtype
+
+
+def test_negative_count_is_rejected():
+    with pytest.raises(ValueError):
+        HandSampler(seed=0).winning(-1)
+
+
+def test_samples_agree_with_rule_engine():
+    sampler = HandSampler(seed=1)
+    for hand in sampler.winning(50)["hand"]:
+        assert RuleEngine.is_hu(to_tiles(hand), None)
+    sample = sampler.tenpai(50)
+    for hand, wait in zip(sample["hand"], sample["wait"]):
+        waits = [t.code for t in RuleEngine.get_ting_tiles(to_tiles(hand))]
+        assert TILE_CODES[wait] in waits
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import pytest
+
+from mahjong.player import Player
+from mahjong.scoring import decompose, is_complete, score_hand, waits
+from mahjong.tile import Tile
+
+# 五組順子 + 29 對眼；胡 13 只能是 11 12 的邊張（獨聽），胡 16 是 14 15 的兩面
+CHOWS = [11, 12, 13, 14, 15, 16, 21, 22, 23, 31, 32, 33, 37, 38, 39, 29, 29]
+
+
+def _player(hand: list[int], pongs: tuple[int, ...] = (), flowers: tuple[int, ...] = ()) -> Player:
+    """hand 為胡牌後的暗手（含胡的那張）；pongs 為亮出的碰。"""
+    p = Player()
+    for code in hand:
+        p.add_tile_to_hand(Tile(code))
+    for code in pongs:
+        for _ in range(2):
+            p.add_tile_to_hand(Tile(code))
+        p.declare_pong(Tile(code))
+    p.flower_tiles = [Tile(code) for code in flowers]
+    return p
+
+
+def _score(player: Player, win: int, *, seat: int = 1, dealer: int = 0, **kwargs):
+    return score_hand(player, Tile(win), seat=seat, dealer=dealer, **kwargs)
+
+
+def test_concealed_self_draw_with_single_wait():
+    result = _score(_player(CHOWS), 13, self_drawn=True)
+    assert result.patterns == [("門清自摸", 3), ("獨聽", 1)]
+    assert result.tai == 4
+
+
+def test_all_pungs():
+    # 亮出東（圈風）；11/22/33 暗刻，19 放槍胡不算暗刻，45 對眼（雙碰不是獨聽）
+    hand = [11, 11, 11, 22, 22, 22, 45, 45, 33, 33, 33, 19, 19, 19]
+    result = _score(_player(hand, pongs=(41,)), 19, self_drawn=False)
+    assert result.patterns == [("碰碰胡", 4), ("三暗刻", 2), ("圈風刻", 1)]
+    assert result.tai == 7
+
+
+def test_pinghu():
+    hand = [12, 13, 14, 15, 16, 17, 21, 22, 23, 34, 35, 36, 37, 38, 39, 29, 29]
+    result = _score(_player(hand), 14, self_drawn=False)
+    assert result.patterns == [("門清", 1), ("平胡", 2)]
+    assert result.tai == 3
+
+
+def test_pair_wait_is_single_wait_and_not_pinghu():
+    result = _score(_player(CHOWS), 29, self_drawn=False)
+    assert result.patterns == [("門清", 1), ("獨聽", 1)]
+
+
+def test_big_three_dragons():
+    hand = [45, 45, 45, 46, 46, 46, 47, 47, 47, 11, 12, 13, 21, 21]
+    result = _score(_player(hand, pongs=(31,)), 47, self_drawn=False)
+    assert result.patterns == [("大三元", 8)]
+    assert result.tai == 8
+
+
+def test_seat_flower():
+    # 座位 1、莊家 0：門風南，蘭（52）是正花
+    result = _score(_player(CHOWS, flowers=(52,)), 16, self_drawn=True)
+    assert result.patterns == [("正花", 1), ("門清自摸", 3)]
+
+
+def test_flower_kong_for_dealer():
+    result = _score(_player(CHOWS, flowers=(51, 52, 53, 54, 55)), 16, seat=0, self_drawn=True)
+    assert result.patterns == [("莊家", 1), ("花槓（梅蘭竹菊）", 2), ("正花", 1), ("門清自摸", 3)]
+    assert result.tai == 7
+
+
+def test_kong_replacement_and_last_tile_flags():
+    result = _score(_player(CHOWS), 16, self_drawn=True, kong_replacement=True)
+    assert result.patterns == [("門清自摸", 3), ("槓上開花", 1)]
+    result = _score(_player(CHOWS), 16, self_drawn=True, last_tile=True)
+    assert result.patterns == [("門清自摸", 3), ("海底撈月", 1)]
+    result = _score(_player(CHOWS), 16, self_drawn=False, last_tile=True)
+    assert result.patterns == [("門清", 1), ("河底撈魚", 1), ("平胡", 2)]
+
+
+def test_non_winning_hand_raises():
+    hand = CHOWS[:-1] + [28]
+    with pytest.raises(ValueError):
+        _score(_player(hand), 28, self_drawn=False)
+
+
+def test_pairs_in_several_suits_are_not_complete():
+    # 四個花色各一對：8 張 ≡ 2 (mod 3)，但不是胡牌型
+    codes = [11, 11, 21, 21, 31, 31, 41, 41]
+    assert not is_complete(codes)
+    assert decompose(codes) == []
+
+
+def test_honor_sequences_are_not_melds():
+    assert not is_complete([41, 42, 43, 11, 11])
+    assert waits([41, 42, 11, 11]) == []
+    assert waits([11, 12, 21, 21]) == [13]
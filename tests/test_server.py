@@ -0,0 +1,266 @@
+from __future__ import annotations
+import asyncio
+import itertools
+
+import pytest
+
+import server
+
+_eio_ids = itertools.count()
+
+
+@pytest.fixture(autouse=True)
+def clean_server():
+    server.verbose = False
+    yield
+    for hand in server.live_hands.values():
+        if hand.task is not None:
+            hand.task.cancel()
+    for timer in server.pending_release.values():
+        timer.cancel()
+    server.tables.clear()
+    server.live_hands.clear()
+    server.seat_of.clear()
+    server.room_members.clear()
+    server.pending_release.clear()
+    server.router.outboxes.clear()
+    server.limiter.buckets.clear()
+    server.wal = None
+    server.spectators.audiences.clear()
+    server.spectators.watching.clear()
+
+
+async def _connect() -> str:
+    """在 Socket.IO manager 上登記一條假連線（沒有真的 engineio 傳輸層）並觸發 connect。"""
+    sid = await server.sio.manager.connect(f"eio-{next(_eio_ids)}", '/')
+    await server.connect(sid, {})
+    return sid
+
+
+async def _seated(table_id: str = 't1', token: str = 'tok') -> str:
+    sid = await _connect()
+    reply = await server.join_table(sid, {'table_id': table_id, 'token': token})
+    assert reply['seat'] >= 0
+    return sid
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# ── join_table ───────────────────────────────────────
+
+@pytest.mark.parametrize('data', [None, 'x', 5, [], {'table_id': None, 'token': 5},
+                                  {'table_id': ['a']}, {'table_id': ''}, {'table_id': 'x' * 65},
+                                  {'table_id': 't1', 'token': {'a': 1}}])
+def test_join_table_rejects_bad_payloads(data):
+    async def main():
+        sid = await _connect()
+        reply = await server.join_table(sid, data)
+        assert 'error' in reply
+        assert not server.tables and sid not in server.seat_of
+    run(main())
+
+
+def test_join_table_defaults():
+    async def main():
+        sid = await _connect()
+        reply = await server.join_table(sid, {})
+        assert reply['table_id'] == 'lobby' and reply['seat'] == 0
+        assert server.tables['lobby'].seats[0] == sid
+    run(main())
+
+
+def test_fifth_player_gets_no_seat():
+    async def main():
+        for i in range(4):
+            await _seated('t1', f'p{i}')
+        reply = await server.join_table(await _connect(), {'table_id': 't1', 'token': 'p4'})
+        assert reply['seat'] == -1
+    run(main())
+
+
+# ── resync ───────────────────────────────────────────
+
+@pytest.mark.parametrize('data', [None, 'x', [], {}, {'table_id': 't1'}, {'token': 'tok'},
+                                  {'table_id': 5, 'token': 'tok'}, {'table_id': 't1', 'token': None},
+                                  {'table_id': 't1', 'token': ['tok']}])
+def test_resync_rejects_bad_payloads(data):
+    async def main():
+        await _seated()
+        sid = await _connect()
+        reply = await server.resync(sid, data)
+        assert 'error' in reply and sid not in server.seat_of
+    run(main())
+
+
+def test_resync_with_unknown_token_gets_no_seat():
+    async def main():
+        await _seated()
+        reply = await server.resync(await _connect(), {'table_id': 't1', 'token': 'other'})
+        assert reply == {'seat': -1}
+    run(main())
+
+
+@pytest.mark.parametrize('last_seq', ['x', None, -3, True, 1.5])
+def test_resync_with_a_bad_sequence_replays_everything(last_seq):
+    async def main():
+        sid = await _seated()
+        await server.play_tile(sid, {'tile': 11})
+        await server.play_tile(sid, {'tile': 12})
+        again = await _connect()
+        reply = await server.resync(again, {'table_id': 't1', 'token': 'tok', 'last_seq': last_seq})
+        assert reply['seat'] == 0 and [e['seq'] for e in reply['events']] == [1, 2]
+        assert server.seat_of[again] == ('t1', 0) and sid not in server.seat_of
+    run(main())
+
+
+def test_resync_returns_only_missed_events():
+    async def main():
+        sid = await _seated()
+        for tile in (11, 12, 13):
+            await server.play_tile(sid, {'tile': tile})
+        reply = await server.resync(await _connect(), {'table_id': 't1', 'token': 'tok', 'last_seq': 2})
+        assert [e['tile'] for e in reply['events']] == [13]
+    run(main())
+
+
+# ── play_tile ────────────────────────────────────────
+
+@pytest.mark.parametrize('data', [None, 'x', 11, [11]])
+def test_play_tile_rejects_non_objects(data):
+    async def main():
+        sid = await _seated()
+        assert 'error' in await server.play_tile(sid, data)
+        assert server.tables['t1'].seq == 0
+    run(main())
+
+
+@pytest.mark.parametrize('tile', ['x', None, 99, 51, 10, 11.0, [11], True])
+def test_play_tile_rejects_bad_codes(tile):
+    async def main():
+        sid = await _seated()
+        reply = await server.play_tile(sid, {'tile': tile})
+        assert 'error' in reply
+        assert server.tables['t1'].seq == 0
+        assert server.tables['t1'].discards == [[], [], [], []]
+    run(main())
+
+
+def test_play_tile_records_a_valid_discard():
+    async def main():
+        sid = await _seated()
+        event = await server.play_tile(sid, {'tile': 11})
+        assert event['seq'] == 1 and event['tile'] == 11 and event['seat'] == 0
+        assert server.tables['t1'].discards[0] == [11]
+    run(main())
+
+
+def test_play_tile_rejected_while_a_hand_is_live():
+    async def main():
+        sid = await _seated()
+        server.live_hands['t1'] = server.LiveHand(server.tables['t1'])
+        reply = await server.play_tile(sid, {'tile': 11})
+        assert 'error' in reply
+        assert server.tables['t1'].discards == [[], [], [], []]
+    run(main())
+
+
+# ── start_hand ───────────────────────────────────────
+
+@pytest.mark.parametrize('data', [{'dealer': 'x'}, {'dealer': 4}, {'dealer': -1},
+                                  {'dealer': 1.5}, {'dealer': True}, {'dealer': [0]}, 'x'])
+def test_start_hand_rejects_bad_dealer(data):
+    async def main():
+        sid = await _seated()
+        reply = await server.start_hand(sid, data)
+        assert 'error' in reply
+        assert 't1' not in server.live_hands
+    run(main())
+
+
+@pytest.mark.parametrize('data', [None, {}, {'dealer': None}, {'dealer': 3}])
+def test_start_hand_accepts_dealer(data):
+    async def main():
+        sid = await _seated()
+        assert await server.start_hand(sid, data) == {'running': True}
+        assert 't1' in server.live_hands
+    run(main())
+
+
+# ── watch_table ──────────────────────────────────────
+
+@pytest.mark.parametrize('data', ['x', 5, [], {'table_id': 5}, {'table_id': ''},
+                                  {'table_id': 't1', 'seat': 4}, {'table_id': 't1', 'seat': -2},
+                                  {'table_id': 't1', 'seat': '0'}, {'table_id': 't1', 'seat': True},
+                                  {'table_id': 't1', 'seat': 1.0}])
+def test_watch_table_rejects_bad_payloads(data):
+    async def main():
+        sid = await _connect()
+        assert 'error' in await server.watch_table(sid, data)
+        assert sid not in server.spectators.watching
+    run(main())
+
+
+@pytest.mark.parametrize('data', [None, {}, {'table_id': 't1'}, {'table_id': 't1', 'seat': -1}])
+def test_watch_table_public_view(data):
+    async def main():
+        sid = await _connect()
+        reply = await server.watch_table(sid, data)
+        assert reply['perspective'] == server.PUBLIC
+        assert server.spectators.watching[sid] == (reply['table_id'], server.PUBLIC)
+    run(main())
+
+
+def test_seated_player_cannot_follow_another_seat():
+    async def main():
+        sid = await _seated()
+        assert 'error' in await server.watch_table(sid, {'table_id': 't1', 'seat': 1})
+        assert (await server.watch_table(sid, {'table_id': 't1', 'seat': 0}))['perspective'] == 0
+    run(main())
+
+
+# ── WAL 復原 ─────────────────────────────────────────
+
+def test_tables_survive_a_restart(tmp_path):
+    async def main():
+        server.wal = server.WriteAheadLog(str(tmp_path), commit_interval=0.001)
+        await server._start_wal(None)
+        a = await _seated('t1', 'alice')
+        b = await _seated('t1', 'bob')
+        await server.play_tile(a, {'tile': 11})
+        await server.play_tile(b, {'tile': 47})
+        await server.play_tile(b, {'tile': 'x'})       # 被拒絕的不寫進日誌
+        before = server.tables['t1'].dump()
+        await server._close_wal(None)
+
+        # 模擬重啟：行程內的狀態全部消失，只剩資料目錄
+        server.tables.clear()
+        server.seat_of.clear()
+        server.room_members.clear()
+        server.wal = server.WriteAheadLog(str(tmp_path), commit_interval=0.001)
+        await server._start_wal(None)
+        assert server.tables['t1'].dump() == before
+        assert server.tables['t1'].discards == [[11], [47], [], []]
+        assert set(server.pending_release) == {'alice', 'bob'}
+
+        # 用同一個 token 重連回到原座位，序號接續
+        c = await _connect()
+        reply = await server.join_table(c, {'table_id': 't1', 'token': 'bob'})
+        assert reply['seat'] == 1 and 'bob' not in server.pending_release
+        event = await server.play_tile(c, {'tile': 12})
+        assert event['seq'] == before['seq'] + 1
+        await server._close_wal(None)
+    run(main())
+
+
+# ── answer ───────────────────────────────────────────
+
+@pytest.mark.parametrize('data', [None, 'x', 5, [], {}, {'ticket': 1, 'value': '0'}])
+def test_answer_rejects_bad_payloads(data):
+    async def main():
+        sid = await _seated()
+        server.live_hands['t1'] = server.LiveHand(server.tables['t1'])
+        assert await server.answer(sid, data) == {'ok': False}
+        assert await server.answer(await _connect(), data) == {'ok': False}
+    run(main())
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import itertools
+import random
+
+import pytest
+
+from mahjong.session import Session, payments, play_session
+
+
+@pytest.mark.parametrize("winner,discarder,dealer", [
+    (w, d, dealer)
+    for w, d, dealer in itertools.product(range(4), [None, 0, 1, 2, 3], range(4))
+    if d != w
+])
+def test_payments_are_zero_sum(winner, discarder, dealer):
+    for tai, streak in ((0, 0), (5, 0), (3, 2)):
+        deltas = payments(winner, discarder, tai, dealer=dealer, dealer_streak=streak)
+        assert sum(deltas) == 0
+        assert deltas[winner] > 0
+        payers = {discarder} if discarder is not None else set(range(4)) - {winner}
+        assert {i for i, d in enumerate(deltas) if d < 0} == payers
+
+
+def test_dealer_pays_dealer_and_streak_tai():
+    # 閒家 1 自摸 2 台，莊家 0 連 1：莊家多付 1 + 2 台
+    assert payments(1, None, 2, dealer=0, dealer_streak=1) == [-200, 480, -140, -140]
+
+
+def test_dealer_rotation_and_wind():
+    session = Session(rounds=1)
+    session.record(None)                        # 流局連莊
+    assert (session.dealer, session.dealer_streak) == (0, 1)
+    session.record(0, 2, tai=3)                 # 莊家胡，連莊
+    assert (session.dealer, session.dealer_streak) == (0, 2)
+    for dealer in (1, 2, 3):
+        session.record((dealer + 1) % 4, None, tai=1)   # 閒家自摸，下莊
+        assert (session.dealer, session.dealer_streak, session.finished) == (dealer, 0, False)
+    session.record(1, None, tai=1)
+    assert session.finished and session.prevailing_wind == 2
+    with pytest.raises(RuntimeError):
+        session.record(None)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_played_session_is_zero_sum(seed):
+    session = play_session(Session(rounds=1), rng=random.Random(seed))
+    assert session.finished
+    assert sum(session.scores) == 0
+    for entry in session.history:
+        assert sum(entry.deltas) == 0
+        assert (entry.winner is None) == (entry.deltas == [0, 0, 0, 0])
+    assert session.scores == [sum(e.deltas[i] for e in session.history) for i in range(4)]
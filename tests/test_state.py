@@ -0,0 +1,62 @@
+from __future__ import annotations
+import random
+
+import pytest
+
+from mahjong.flow import HandState, run_hand
+from mahjong.game import Game
+from mahjong.scoring import score_state
+from mahjong.state import GameState
+
+
+def _played_hand(seed: int, dealer: int = 0) -> HandState:
+    state = HandState(dealer=dealer, current_wind=2)
+    state.deal(random.Random(seed))
+    run_hand(state)
+    return state
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_hand_state_round_trip(seed):
+    state = _played_hand(seed, dealer=seed % 4)
+    snap = GameState.capture(state)
+    assert GameState.from_bytes(snap.to_bytes()) == snap
+
+    restored = HandState()
+    GameState.from_bytes(snap.to_bytes()).apply_to(restored)
+    assert GameState.capture(restored) == snap
+    for name in ("dealer", "current_wind", "winner", "discarder", "winning_tile",
+                 "self_drawn", "kong_replacement", "flower_win", "turns"):
+        assert getattr(restored, name) == getattr(state, name), name
+    if state.winner is not None:
+        assert score_state(restored).patterns == score_state(state).patterns
+
+
+def test_game_restore_keeps_dealer_rotation():
+    game = Game(None)
+    game.reset_hand(dealer=2, current_wind=3, dealer_streak=4)
+    game.start_game()
+    data = game.snapshot()
+
+    other = Game(None)
+    other.restore(data)
+    assert (other.dealer, other.dealer_streak, other.current_wind) == (2, 4, 3)
+    assert other.current_player == 2
+    assert GameState.capture(other) == GameState.from_bytes(data)
+
+
+def test_clone_and_replace_share_fields():
+    snap = GameState.capture(_played_hand(1))
+    clone = snap.clone()
+    assert clone == snap and clone.wall is snap.wall
+    changed = snap.replace(dealer_streak=2)
+    assert changed.dealer_streak == 2 and changed.hands is snap.hands
+    with pytest.raises(AttributeError):
+        snap.dealer = 1
+
+
+def test_rejects_other_versions():
+    data = bytearray(GameState.capture(HandState()).to_bytes())
+    data[2] = 2
+    with pytest.raises(ValueError):
+        GameState.from_bytes(bytes(data))
@@ -0,0 +1,63 @@
+from __future__ import annotations
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from mahjong import analysis, tables
+from mahjong.rule_engine import RuleEngine
+from mahjong.sampler import HandSampler, to_codes
+from mahjong.tile import TILE_CODES, Tile
+
+
+@pytest.fixture(scope="module")
+def suit_tables(tmp_path_factory):
+    path = tables.build(str(tmp_path_factory.mktemp("tables") / "suit-tables.bin"))
+    loaded = tables.load(path)
+    yield loaded
+    loaded.close()
+
+
+def _random_hands(n: int, sizes: tuple[int, ...], seed: int) -> list[list[int]]:
+    rng = random.Random(seed)
+    wall = [code for code in TILE_CODES for _ in range(4)]
+    return [sorted(rng.sample(wall, rng.choice(sizes))) for _ in range(n)]
+
+
+def _ting(codes: list[int]) -> list[int]:
+    return sorted(t.code for t in RuleEngine.get_ting_tiles([Tile(c) for c in codes]))
+
+
+def test_is_complete_matches_rule_engine(suit_tables):
+    sampler = HandSampler(seed=0)
+    winning = [to_codes(h) for h in sampler.winning(200)["hand"]]
+    for codes in winning + _random_hands(300, (2, 5, 8, 11, 14, 17), seed=1):
+        assert suit_tables.is_complete(codes) == RuleEngine.is_hu([Tile(c) for c in codes], None), codes
+
+
+def test_waits_match_rule_engine(suit_tables):
+    sampler = HandSampler(seed=2)
+    tenpai = [to_codes(h) for h in sampler.tenpai(200)["hand"]]
+    for codes in tenpai + _random_hands(200, (1, 4, 7, 10, 13, 16), seed=3):
+        assert sorted(suit_tables.waits(codes)) == _ting(codes), codes
+
+
+def test_shanten_matches_recursion(suit_tables, monkeypatch):
+    monkeypatch.setattr(analysis, "get_tables", lambda: None)
+    for codes in _random_hands(300, (13, 14, 16, 17), seed=4):
+        assert suit_tables.shanten(codes) == analysis.shanten(codes), codes
+
+
+def test_five_of_a_kind_is_not_in_the_table(suit_tables):
+    codes = [11] * 5 + [12, 13]
+    assert suit_tables.is_complete(codes) is None
+    assert suit_tables.waits(codes[:-1]) is None
+    assert suit_tables.shanten(codes) is None
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"MJPOLICY" + bytes(64))
+    with pytest.raises(ValueError):
+        tables.load(str(path))
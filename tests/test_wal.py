@@ -0,0 +1,56 @@
+from __future__ import annotations
+import asyncio
+import os
+
+from wal import _SEGMENT_RE, WriteAheadLog
+
+
+def _write(directory, records, checkpoint_every=5000, pause_every=None):
+    """依序 append records；dump_state 回傳目前已 append 的筆數。"""
+    async def main():
+        wal = WriteAheadLog(str(directory), commit_interval=0.001, checkpoint_every=checkpoint_every)
+        wal.recover()
+        appended = 0
+        await wal.start(lambda: {'n': appended})
+        for i, record in enumerate(records):
+            wal.append(record)
+            appended += 1
+            if pause_every and i % pause_every == pause_every - 1:
+                await asyncio.sleep(0.02)      # 讓寫入器落盤並做檢查點
+        await wal.close()
+    asyncio.run(main())
+
+
+def test_recover_returns_records_in_order(tmp_path):
+    records = [{'t': 't1', 'op': 'event', 'i': i} for i in range(50)]
+    _write(tmp_path, records)
+    state, recovered = WriteAheadLog(str(tmp_path)).recover()
+    assert state is None and recovered == records
+
+
+def test_checkpoint_snapshot_plus_tail_covers_every_record(tmp_path):
+    records = [{'i': i} for i in range(23)]
+    _write(tmp_path, records, checkpoint_every=5, pause_every=3)
+    state, recovered = WriteAheadLog(str(tmp_path)).recover()
+    assert state is not None and state['n'] > 0
+    assert state['n'] + len(recovered) == len(records)
+    assert recovered == records[state['n']:]
+    # 快照涵蓋的舊段落與舊快照都已刪除
+    names = os.listdir(tmp_path)
+    assert sum(n.startswith('snapshot-') for n in names) == 1
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    _write(tmp_path, [{'i': 0}, {'i': 1}])
+    wal = WriteAheadLog(str(tmp_path))
+    last = wal._segment_path(wal._numbered(_SEGMENT_RE)[-1])
+    with open(last, 'ab') as f:
+        f.write(b'{"i": 2, "op"')
+    assert WriteAheadLog(str(tmp_path)).recover() == (None, [{'i': 0}, {'i': 1}])
+
+
+def test_restart_appends_to_a_new_segment(tmp_path):
+    _write(tmp_path, [{'i': 0}])
+    _write(tmp_path, [{'i': 1}])
+    assert WriteAheadLog(str(tmp_path)).recover() == (None, [{'i': 0}, {'i': 1}])
+